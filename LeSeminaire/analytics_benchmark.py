@@ -0,0 +1,114 @@
+"""
+Micro-benchmark des écouteurs du cog `analytics` (on_message, on_reaction_add),
+hors connexion: des messages factices sont envoyés au rythme demandé (10 000
+par seconde par défaut) répartis sur plusieurs serveurs et salons.
+
+    python analytics_benchmark.py --rate 10000 --duration 5
+
+Affiche le coût moyen par événement et la part d'un cœur consommée à ce rythme.
+Les événements sont journalisés comme en production (analytics_journal.py),
+dans un fichier temporaire; l'écriture du journal, faite hors de la boucle
+d'événements par le bot, n'est pas comptée. Les messages sont aussi comptés
+par le détecteur d'anomalies (sans la clôture périodique de ses fenêtres).
+"""
+import os
+import sys
+import time
+import types
+import argparse
+import tempfile
+
+from analytics_journal import AnalyticsJournal
+from anomaly_detector import AnomalyDetector
+from analytics_store import AnalyticsStore
+from cogs.analytics import ServerAnalytics
+
+# Nombre de tranches d'envoi par seconde
+TICKS_PER_SECOND = 100
+
+
+def make_cog(journal):
+    """Cog sans tâches périodiques ni base de données: seuls les écouteurs sont mesurés."""
+    cog = ServerAnalytics.__new__(ServerAnalytics)
+    cog.bot = None
+    cog.journal = journal
+    cog.detector = AnomalyDetector()
+    cog.store = AnalyticsStore(journal=journal, detector=cog.detector)
+    return cog
+
+
+def make_events(count, guilds=5, channels=20, users=2000):
+    messages, reactions = [], []
+    guild_objects = [types.SimpleNamespace(id=1000 + index) for index in range(guilds)]
+    for index in range(count):
+        guild = guild_objects[index % guilds]
+        author = types.SimpleNamespace(id=index % users, bot=False)
+        message = types.SimpleNamespace(author=author, guild=guild,
+                                        channel=types.SimpleNamespace(id=index % channels))
+        messages.append(message)
+        reactions.append((types.SimpleNamespace(message=message, emoji=('👍', '🔥', '😂')[index % 3]), author))
+    return messages, reactions
+
+
+def drive(coroutine):
+    """Exécute une coroutine qui ne se suspend pas, sans boucle d'événements."""
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        pass
+
+
+def run(listener, events, rate, duration):
+    """
+    Envoie `events` à `listener` au rythme `rate` par seconde pendant `duration`
+    secondes. Renvoie (coût par événement en µs, charge en % d'un cœur, coût p99 d'une tranche en ms).
+    """
+    per_tick = max(1, rate // TICKS_PER_SECOND)
+    ticks = int(duration * TICKS_PER_SECOND)
+    busy, tick_costs = 0.0, []
+    position = 0
+    began = time.perf_counter()
+    for tick in range(ticks):
+        started = time.perf_counter()
+        for _ in range(per_tick):
+            drive(listener(*events[position % len(events)]))
+            position += 1
+        cost = time.perf_counter() - started
+        busy += cost
+        tick_costs.append(cost * 1000)
+        # Attendre le début de la tranche suivante
+        delay = began + (tick + 1) / TICKS_PER_SECOND - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - began
+    tick_costs.sort()
+    return (round(busy / position * 1e6, 2), round(busy / elapsed * 100, 1),
+            round(tick_costs[int(len(tick_costs) * 0.99) - 1], 3))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coût des écouteurs d'analytique")
+    parser.add_argument('--rate', type=int, default=10000, help="Événements par seconde")
+    parser.add_argument('--duration', type=float, default=5.0, help="Durée de chaque mesure (secondes)")
+    args = parser.parse_args(argv)
+
+    messages, reactions = make_events(50000)
+    directory = tempfile.mkdtemp()
+    journal = AnalyticsJournal(os.path.join(directory, 'journal.log'))
+    cog = make_cog(journal)
+    scenarios = [
+        ('on_message', lambda message: cog.on_message(message), [(message,) for message in messages]),
+        ('on_reaction_add', lambda reaction, user: cog.on_reaction_add(reaction, user), reactions),
+    ]
+    for name, listener, events in scenarios:
+        per_event, load, p99 = run(listener, events, args.rate, args.duration)
+        print(f"{name:<18}{args.rate} evt/s: {per_event} µs/événement, {load}% d'un cœur, tranche p99 {p99} ms")
+        journal.discard(journal.rotate())
+    journal.close()
+    os.remove(journal.path)
+    os.rmdir(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Graphiques PNG des commandes d'analytique de LeSéminaire[BOT].
+
+Les fonctions render_* dessinent avec Pillow à partir de données simples
+(listes de nombres, noms) et renvoient l'image PNG en octets: elles ne touchent
+ni au bot ni à la base et s'exécutent dans les threads de ChartCache, en dehors
+de la boucle d'événements.
+
+ChartCache garde les images rendues par (serveur, graphique, paramètres,
+tranche de temps): une commande relancée pendant la même tranche de
+CHART_BUCKET_SECONDS secondes reçoit l'image déjà rendue, et des appels
+simultanés attendent le même rendu.
+"""
+import io
+import os
+import time
+import asyncio
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Durée d'une tranche de cache (secondes) et nombre maximal d'images gardées
+CHART_BUCKET_SECONDS = 300
+MAX_CACHED_CHARTS = 128
+# Threads de rendu
+RENDER_WORKERS = 2
+
+WIDTH = 800
+MARGIN = 24
+
+# Palette Le Séminaire (voir welcome_card.COLORS)
+COLORS = {
+    'background': "#23272A",
+    'panel': "#2C2F33",
+    'grid': "#40444B",
+    'text': "#FFFFFF",
+    'muted': "#99AAB5",
+    'messages': "#7289DA",
+    'voice': "#66CCFF",
+    'reactions': "#FF9966",
+}
+
+# Polices essayées dans l'ordre (accents compris)
+FONTS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'welcome', 'fonts', 'Poppins-Regular.ttf'),
+    'DejaVuSans.ttf',
+]
+
+WEEKDAYS = ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"]
+
+
+@functools.lru_cache(maxsize=8)
+def _font(size):
+    """Police des cartes de bienvenue si présente, sinon DejaVu Sans, sinon la police intégrée à Pillow"""
+    for font in FONTS:
+        try:
+            return ImageFont.truetype(font, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def _to_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _gradient_palette(low="#2C2F33", high="#FFD700", middle="#7289DA"):
+    """Palette de 256 couleurs: `low` (0) -> `middle` -> `high` (255)"""
+    stops = [tuple(int(color[i:i + 2], 16) for i in (1, 3, 5)) for color in (low, middle, high)]
+    palette = []
+    for index in range(256):
+        position = index / 255 * 2
+        start, end = (stops[0], stops[1]) if position <= 1 else (stops[1], stops[2])
+        ratio = position if position <= 1 else position - 1
+        palette.extend(round(a + (b - a) * ratio) for a, b in zip(start, end))
+    return palette
+
+
+_HEATMAP_PALETTE = _gradient_palette()
+
+
+def render_activity(title, labels, messages, voice, reactions):
+    """
+    Activité quotidienne: un panneau de barres par série (messages, minutes
+    vocales, réactions), chacun à sa propre échelle.
+
+    Args:
+        title: Titre du graphique
+        labels: Libellé de chaque jour (ex. '14/10')
+        messages, voice, reactions: Une valeur par jour, du plus ancien au plus récent
+    """
+    series = [("Messages", messages, COLORS['messages']),
+              ("Minutes vocales", voice, COLORS['voice']),
+              ("Réactions", reactions, COLORS['reactions'])]
+    panel_height, header, footer = 110, 48, 28
+    height = header + len(series) * (panel_height + 12) + footer
+    image = Image.new('RGB', (WIDTH, height), COLORS['background'])
+    draw = ImageDraw.Draw(image)
+    draw.text((MARGIN, 14), title, fill=COLORS['text'], font=_font(20))
+
+    days = max(1, len(labels))
+    left, right = MARGIN + 8, WIDTH - MARGIN - 8
+    step = (right - left) / days
+    bar_width = max(1, step * 0.7)
+    top = header
+    for name, values, color in series:
+        draw.rectangle((MARGIN, top, WIDTH - MARGIN, top + panel_height), fill=COLORS['panel'])
+        peak = max(values, default=0)
+        draw.text((MARGIN + 8, top + 6), f"{name} (max {round(peak):,})", fill=COLORS['muted'], font=_font(13))
+        base, usable = top + panel_height - 6, panel_height - 32
+        for index, value in enumerate(values):
+            if value <= 0 or peak <= 0:
+                continue
+            x = left + index * step + (step - bar_width) / 2
+            draw.rectangle((x, base - max(1, value / peak * usable), x + bar_width, base), fill=color)
+        top += panel_height + 12
+
+    # Une date sur `every` pour rester lisible
+    every = max(1, round(days / 10))
+    for index, label in enumerate(labels):
+        if index % every == 0 or index == days - 1:
+            x = left + index * step + step / 2
+            width = draw.textlength(label, font=_font(12))
+            draw.text((x - width / 2, top), label, fill=COLORS['muted'], font=_font(12))
+    return _to_png(image)
+
+
+def render_heatmap(title, week_hours):
+    """
+    Carte de chaleur des messages par jour de la semaine (lignes, lundi
+    d'abord) et heure UTC (colonnes).
+
+    Args:
+        title: Titre du graphique
+        week_hours: 168 valeurs, heure de la semaine (lundi 00h = 0)
+    """
+    label_width, header, footer = 48, 52, 40
+    cell_width = (WIDTH - 2 * MARGIN - label_width) // 24
+    cell_height = 36
+    grid_width, grid_height = cell_width * 24, cell_height * 7
+    height = header + grid_height + footer
+    image = Image.new('RGB', (WIDTH, height), COLORS['background'])
+    draw = ImageDraw.Draw(image)
+    draw.text((MARGIN, 14), title, fill=COLORS['text'], font=_font(20))
+
+    # Une cellule = un pixel d'une image 24x7 en palette, agrandie sans lissage
+    peak = max(week_hours, default=0)
+    levels = bytes(round(value / peak * 255) if peak else 0 for value in week_hours)
+    cells = Image.frombytes('P', (24, 7), levels)
+    cells.putpalette(_HEATMAP_PALETTE)
+    grid_left = MARGIN + label_width
+    image.paste(cells.convert('RGB').resize((grid_width, grid_height), Image.NEAREST), (grid_left, header))
+    for column in range(1, 24):
+        x = grid_left + column * cell_width
+        draw.line((x, header, x, header + grid_height), fill=COLORS['background'])
+    for row in range(1, 7):
+        y = header + row * cell_height
+        draw.line((grid_left, y, grid_left + grid_width, y), fill=COLORS['background'])
+
+    for row, name in enumerate(WEEKDAYS):
+        draw.text((MARGIN, header + row * cell_height + cell_height / 2 - 7), name,
+                  fill=COLORS['muted'], font=_font(13))
+    for hour in range(0, 24, 2):
+        label = f"{hour:02d}h"
+        width = draw.textlength(label, font=_font(12))
+        draw.text((grid_left + hour * cell_width + cell_width / 2 - width / 2, header + grid_height + 6),
+                  label, fill=COLORS['muted'], font=_font(12))
+    legend = f"Max: {peak:,} messages par heure (UTC)"
+    draw.text((MARGIN, height - 18), legend, fill=COLORS['muted'], font=_font(12))
+    return _to_png(image)
+
+
+def render_top(title, items, color=COLORS['messages'], unit="messages"):
+    """
+    Classement en barres horizontales.
+
+    Args:
+        title: Titre du graphique
+        items: Liste de (nom, valeur), du plus grand au plus petit
+    """
+    row_height, header = 30, 52
+    height = header + max(1, len(items)) * row_height + MARGIN
+    image = Image.new('RGB', (WIDTH, height), COLORS['background'])
+    draw = ImageDraw.Draw(image)
+    draw.text((MARGIN, 14), title, fill=COLORS['text'], font=_font(20))
+    if not items:
+        draw.text((MARGIN, header), "Aucune donnée", fill=COLORS['muted'], font=_font(14))
+        return _to_png(image)
+
+    name_width, value_width = 200, 120
+    left, right = MARGIN + name_width, WIDTH - MARGIN - value_width
+    peak = max(value for _, value in items) or 1
+    for index, (name, value) in enumerate(items):
+        y = header + index * row_height
+        if draw.textlength(name, font=_font(14)) > name_width - 10:
+            while name and draw.textlength(name + "…", font=_font(14)) > name_width - 10:
+                name = name[:-1]
+            name += "…"
+        draw.text((MARGIN, y + 6), name, fill=COLORS['text'], font=_font(14))
+        draw.rectangle((left, y + 4, right, y + row_height - 4), fill=COLORS['panel'])
+        draw.rectangle((left, y + 4, left + max(2, (right - left) * value / peak), y + row_height - 4), fill=color)
+        draw.text((right + 10, y + 6), f"{value:,} {unit}", fill=COLORS['muted'], font=_font(13))
+    return _to_png(image)
+
+
+class ChartCache:
+    """Images rendues par clé et tranche de temps, rendues dans un pool de threads."""
+
+    def __init__(self, bucket_seconds=CHART_BUCKET_SECONDS, max_entries=MAX_CACHED_CHARTS, workers=RENDER_WORKERS):
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self.workers = workers
+        self._entries = OrderedDict()  # {(clé, tranche): Future du PNG}
+        self._executor = None
+        self.hits = 0
+        self.renders = 0
+
+    async def render(self, key, function, *args):
+        """
+        PNG de `function(*args)` pour `key` (ex. (serveur, 'activity', 7)),
+        rendu au plus une fois par tranche de temps.
+        """
+        entry_key = (key, int(time.time() // self.bucket_seconds))
+        future = self._entries.get(entry_key)
+        if future is not None:
+            self.hits += 1
+            self._entries.move_to_end(entry_key)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analytics-charts')
+            self.renders += 1
+            future = asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+            self._entries[entry_key] = future
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # Ne pas garder un rendu en échec
+            if self._entries.get(entry_key) is future:
+                del self._entries[entry_key]
+            raise
+
+    def close(self):
+        self._entries.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,129 @@
+"""
+Journal local des événements d'analytique de LeSéminaire[BOT].
+
+Les compteurs du cog `analytics` ne sont écrits en base qu'une fois par heure.
+Pour qu'un arrêt brutal ne fasse pas perdre l'heure en cours, chaque événement
+compté (message, réaction, minutes vocales) est aussi ajouté
+à un journal: une ligne JSON par événement, dans un fichier en ajout seul.
+
+Les lignes sont accumulées en mémoire puis écrites et synchronisées sur disque
+(fsync) par lots, au plus toutes les FLUSH_INTERVAL secondes, en dehors de la
+boucle d'événements.
+
+Au moment où la sauvegarde horaire relève les compteurs, rotate() clôt le
+fichier en cours en un segment numéroté (`<chemin>.<n>`) et en ouvre un neuf
+pour les événements suivants. Le segment n'est supprimé (discard) qu'une fois
+la sauvegarde validée en base; si elle échoue, il reste sur disque jusqu'à la
+prochaine sauvegarde réussie, qui couvre aussi ses événements. Le journal ne
+contient ainsi que des événements pas encore enregistrés en base, rejoués au
+démarrage du cog. Une ligne incomplète (arrêt pendant une écriture) est ignorée.
+"""
+import os
+import json
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.environ.get('ANALYTICS_JOURNAL_PATH',
+                              os.path.join(BASE_DIR, 'instance', 'analytics_journal.log'))
+
+# Intervalle entre deux écritures du journal (secondes): durée maximale d'événements perdus
+FLUSH_INTERVAL = 1.0
+
+
+class AnalyticsJournal:
+    """Journal en ajout seul (un seul écrivain: le bot)."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._pending = deque()  # append() depuis la boucle, vidée par flush() dans un thread
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._segment = max(self.segments(), default=0)
+
+    def append(self, record):
+        """Ajoute un événement (liste JSON), écrit au prochain flush()."""
+        self._pending.append(record)
+
+    def segments(self):
+        """Numéros des segments clos encore présents, du plus ancien au plus récent"""
+        directory, prefix = os.path.split(self.path)
+        numbers = []
+        for filename in os.listdir(directory or '.'):
+            suffix = filename[len(prefix) + 1:]
+            if filename.startswith(prefix + '.') and suffix.isdigit():
+                numbers.append(int(suffix))
+        return sorted(numbers)
+
+    def _segment_path(self, number):
+        return f"{self.path}.{number}"
+
+    def _write_pending(self):
+        """Écrit et synchronise les événements en attente (verrou tenu); renvoie leur nombre."""
+        records = [self._pending.popleft() for _ in range(len(self._pending))]
+        if not records or self._file.closed:
+            return 0
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                 for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return len(records)
+
+    def flush(self):
+        """Écrit et synchronise sur disque les événements en attente (appelable depuis un thread)."""
+        with self._lock:
+            return self._write_pending()
+
+    def rotate(self):
+        """
+        Clôt le fichier en cours en un segment et en ouvre un nouveau. À appeler au
+        moment où les compteurs sont relevés: le segment renvoyé contient alors
+        exactement les événements comptés jusque-là.
+
+        Returns:
+            Numéro du dernier segment clos, à passer à discard() une fois ses
+            événements enregistrés en base
+        """
+        with self._lock:
+            self._write_pending()
+            if self._file.closed or self._file.tell() == 0:
+                return self._segment
+            self._file.close()
+            self._segment += 1
+            os.replace(self.path, self._segment_path(self._segment))
+            self._file = open(self.path, 'a', encoding='utf-8')
+            return self._segment
+
+    def discard(self, upto):
+        """Supprime les segments jusqu'à `upto` inclus: leurs événements sont enregistrés en base."""
+        for number in self.segments():
+            if number > upto:
+                break
+            try:
+                os.remove(self._segment_path(number))
+            except OSError as e:
+                logger.warning(f"Segment du journal d'analytique non supprimé: {e}")
+
+    def replay(self):
+        """Événements des segments puis du fichier en cours, dans l'ordre d'écriture (à lire au démarrage)."""
+        records, skipped = [], 0
+        paths = [self._segment_path(number) for number in self.segments()] + [self.path]
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        skipped += 1
+        if skipped:
+            logger.warning(f"Journal d'analytique: {skipped} ligne(s) illisible(s) ignorée(s)")
+        return records
+
+    def close(self):
+        with self._lock:
+            self._write_pending()
+            self._file.close()
@@ -0,0 +1,480 @@
+"""
+Compteurs d'analytique de LeSéminaire[BOT], répartis par serveur Discord.
+
+Chaque serveur dispose de son propre jeu de compteurs (GuildAnalytics): les
+événements d'un serveur ne se mélangent plus à ceux des autres, et chaque
+sauvegarde horaire produit une ligne ServerStat par serveur, insérées ensemble
+en une seule requête par le cog `analytics`.
+
+L'historique (messages, minutes vocales et réactions par jour, messages par
+heure de la semaine) tient dans des tableaux `array` de taille fixe: un
+incrément est une simple écriture à un indice calculé, sans formatage de date
+ni dictionnaire qui grossit, et les totaux des commandes sont des sommes de
+tranches de ces tableaux.
+
+Les écouteurs datent leurs événements avec l'horloge partagée `clock`, qui ne
+recalcule date et cases horaires qu'au plus une fois par seconde.
+
+Les membres actifs sont comptés par des esquisses HyperLogLog (sketches.py), par
+serveur et par heure et par salon et par jour, enregistrées dans la table
+activity_sketches: leur union donne le nombre de membres distincts sur
+n'importe quelle période (« membres actifs cette semaine ») en mémoire bornée.
+De même, les salons et emojis les plus utilisés sont suivis par des résumés
+SpaceSaving de taille fixe, enregistrés avec chaque sauvegarde horaire et
+fusionnables sur plusieurs jours.
+
+Les événements passent par les méthodes d'AnalyticsStore (message, reaction,
+voice), qui les inscrivent aussi dans le journal
+local (analytics_journal.py) pour les rejouer après un redémarrage. Les
+messages alimentent aussi le détecteur d'anomalies (anomaly_detector.py).
+"""
+import json
+import time
+import datetime
+from array import array
+from collections import defaultdict, namedtuple
+
+from sketches import HyperLogLog, SpaceSaving, hash64
+
+# Jours conservés dans l'anneau de l'historique quotidien (au-delà du nettoyage à 90 jours)
+DAY_RING = 96
+
+# Cases horaires d'une semaine: jour de la semaine * 24 + heure
+HOURS_PER_WEEK = 7 * 24
+
+# Précision des esquisses de membres actifs (erreur type 1.6 % par serveur, 3.2 % par salon)
+GUILD_SKETCH_PRECISION = 12
+CHANNEL_SKETCH_PRECISION = 10
+
+# Salons et emojis suivis par serveur (résumés SpaceSaving)
+TOP_CHANNELS_CAPACITY = 50
+TOP_EMOJIS_CAPACITY = 50
+
+# Clés des résumés dans ServerStat.data
+TOP_KEYS = {'channels': ('channel_topk', TOP_CHANNELS_CAPACITY), 'emojis': ('emoji_topk', TOP_EMOJIS_CAPACITY)}
+
+
+def day_index(moment):
+    """Numéro de jour (ordinal) d'une date ou d'un datetime"""
+    return moment.toordinal()
+
+
+def hour_of_week(moment):
+    """Case horaire de la semaine d'un datetime (lundi 00h = 0)"""
+    return moment.weekday() * 24 + moment.hour
+
+
+# Durée maximale de réutilisation d'un horodatage par l'horloge partagée (secondes)
+CLOCK_REFRESH = 1.0
+
+Bucket = namedtuple('Bucket', 'moment day weekday hour week_hour')
+
+# Relevé d'une sauvegarde horaire (AnalyticsStore.hourly_rows)
+HourlyRows = namedtuple('HourlyRows', 'server_rows user_rows sketches voice_carry')
+
+
+class BucketClock:
+    """
+    Horloge des écouteurs: l'instant courant (UTC) et ses cases (jour, heure de
+    la semaine) sont recalculés au plus une fois par `refresh` secondes, et
+    toujours au passage d'une heure. Entre deux calculs, un appel se réduit à
+    une lecture de time.monotonic(), insensible aux sauts de l'horloge système.
+    """
+
+    def __init__(self, refresh=CLOCK_REFRESH):
+        self.refresh = refresh
+        self._expires = float('-inf')
+        self._bucket = None
+
+    def now(self):
+        """Bucket (instant, jour, jour de la semaine, heure, heure de la semaine) courant"""
+        tick = time.monotonic()
+        if tick >= self._expires:
+            moment = datetime.datetime.utcnow()
+            weekday, hour = moment.weekday(), moment.hour
+            self._bucket = Bucket(moment, moment.toordinal(), weekday, hour, weekday * 24 + hour)
+            until_next_hour = 3600 - (moment.minute * 60 + moment.second + moment.microsecond / 1e6)
+            self._expires = tick + min(self.refresh, until_next_hour)
+        return self._bucket
+
+
+clock = BucketClock()
+
+
+class DayRing:
+    """
+    Compteurs quotidiens (messages, minutes vocales, réactions) sur les
+    DAY_RING derniers jours. Le jour n occupe la case n % DAY_RING; une case
+    réutilisée par un jour plus récent est remise à zéro au premier incrément.
+    """
+
+    def __init__(self, size=DAY_RING):
+        self.size = size
+        self.days = array('q', [-1]) * size   # Jour occupant chaque case
+        self.messages = array('Q', [0]) * size
+        self.voice = array('d', [0.0]) * size
+        self.reactions = array('Q', [0]) * size
+
+    def _slot(self, day):
+        slot = day % self.size
+        if self.days[slot] != day:
+            if self.days[slot] > day:
+                return None  # Jour sorti de l'anneau
+            self.days[slot] = day
+            self.messages[slot] = 0
+            self.voice[slot] = 0.0
+            self.reactions[slot] = 0
+        return slot
+
+    def add(self, day, messages=0, voice=0.0, reactions=0):
+        slot = self._slot(day)
+        if slot is None:
+            return
+        if messages:
+            self.messages[slot] += messages
+        if voice:
+            self.voice[slot] += voice
+        if reactions:
+            self.reactions[slot] += reactions
+
+    def series(self, first_day, last_day):
+        """
+        Compteurs de chaque jour de `first_day` à `last_day` inclus.
+
+        Returns:
+            Tuple (messages, minutes vocales, réactions) de listes, un élément par jour
+        """
+        messages, voice, reactions = [], [], []
+        for day in range(first_day, last_day + 1):
+            slot = day % self.size
+            if self.days[slot] == day:
+                messages.append(self.messages[slot])
+                voice.append(self.voice[slot])
+                reactions.append(self.reactions[slot])
+            else:
+                messages.append(0)
+                voice.append(0.0)
+                reactions.append(0)
+        return messages, voice, reactions
+
+    def totals(self, first_day, last_day):
+        """Sommes (messages, minutes vocales, réactions) de `first_day` à `last_day` inclus"""
+        messages, voice, reactions = self.series(first_day, last_day)
+        return sum(messages), sum(voice), sum(reactions)
+
+
+class GuildAnalytics:
+    """Compteurs d'activité d'un serveur."""
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        # Compteurs de l'heure en cours, remis à zéro à chaque sauvegarde
+        self.message_count = 0
+        self.voice_activity = defaultdict(int)     # {utilisateur: minutes}
+        self.voice_carry = {}                      # {utilisateur: fraction de minute pas encore écrite dans UserStat}
+        self.reaction_activity = defaultdict(int)  # {utilisateur: réactions}
+        self.channel_activity = SpaceSaving(TOP_CHANNELS_CAPACITY)  # Salons les plus actifs
+        self.emoji_usage = SpaceSaving(TOP_EMOJIS_CAPACITY)         # Emojis les plus utilisés
+        # Historique: activité par jour et messages par heure de la semaine
+        self.daily = DayRing()
+        self.week_hours = array('Q', [0]) * HOURS_PER_WEEK
+        # Membres actifs pas encore enregistrés: {(jour, heure): HyperLogLog}, {(salon, jour): HyperLogLog}
+        self.hour_users = {}
+        self.channel_users = {}
+
+    def count_message(self, bucket, user_id, channel_id):
+        """Compte un message de `user_id` dans `channel_id` à l'instant `bucket` (clock.now())."""
+        self.message_count += 1
+        self.channel_activity.add(channel_id)
+        self.daily.add(bucket.day, messages=1)
+        self.week_hours[bucket.week_hour] += 1
+
+        hashed = hash64(user_id)
+        sketch = self.hour_users.get((bucket.day, bucket.hour))
+        if sketch is None:
+            sketch = self.hour_users[(bucket.day, bucket.hour)] = HyperLogLog(GUILD_SKETCH_PRECISION)
+        sketch.add_hash(hashed)
+        sketch = self.channel_users.get((channel_id, bucket.day))
+        if sketch is None:
+            sketch = self.channel_users[(channel_id, bucket.day)] = HyperLogLog(CHANNEL_SKETCH_PRECISION)
+        sketch.add_hash(hashed)
+
+    def count_reaction(self, bucket, user_id, emoji):
+        """Compte une réaction `emoji` de `user_id`."""
+        self.reaction_activity[user_id] += 1
+        self.emoji_usage.add(emoji)
+        self.daily.add(bucket.day, reactions=1)
+
+    def count_voice(self, bucket, user_id, minutes):
+        """Ajoute `minutes` passées en vocal par `user_id`."""
+        self.voice_activity[user_id] += minutes
+        self.daily.add(bucket.day, voice=minutes)
+
+    def voice_minutes(self):
+        """
+        Minutes vocales entières par membre pour UserStat, et fractions de minute
+        à reporter à l'heure suivante (à passer à clear_hour).
+
+        Returns:
+            Tuple ({membre: minutes}, {membre: fraction})
+        """
+        minutes_by_user, carry = {}, {}
+        for user_id, minutes in self.voice_activity.items():
+            total = minutes + self.voice_carry.get(user_id, 0.0)
+            whole = int(total)
+            if whole:
+                minutes_by_user[user_id] = whole
+            carry[user_id] = total - whole
+        return minutes_by_user, carry
+
+    def pending_users(self, channel_id=None):
+        """Esquisses des membres actifs pas encore enregistrées (du serveur ou d'un salon)"""
+        if channel_id is None:
+            return list(self.hour_users.values())
+        return [sketch for (channel, _), sketch in self.channel_users.items() if channel == channel_id]
+
+    def sketch_rows(self):
+        """Esquisses à enregistrer (format de activity_sketches)."""
+        guild_id = str(self.guild_id)
+        rows = [{
+            'guild_id': guild_id, 'channel_id': None, 'period': 'hour',
+            'start': datetime.datetime.combine(datetime.date.fromordinal(day), datetime.time(hour)),
+            'sketch': sketch,
+        } for (day, hour), sketch in self.hour_users.items()]
+        rows += [{
+            'guild_id': guild_id, 'channel_id': str(channel_id), 'period': 'day',
+            'start': datetime.datetime.combine(datetime.date.fromordinal(day), datetime.time()),
+            'sketch': sketch,
+        } for (channel_id, day), sketch in self.channel_users.items()]
+        return rows
+
+    def hour_totals(self):
+        """Messages par heure de la journée (24 valeurs, toutes semaines confondues)"""
+        return [sum(self.week_hours[hour::24]) for hour in range(24)]
+
+    def weekday_totals(self):
+        """Messages par jour de la semaine (7 valeurs, lundi d'abord)"""
+        return [sum(self.week_hours[weekday * 24:(weekday + 1) * 24]) for weekday in range(7)]
+
+    def hourly_snapshot(self):
+        """Données de l'heure écoulée (format de ServerStat.data)."""
+        data = {
+            'message_count': self.message_count,
+            'voice_minutes': sum(self.voice_activity.values()),
+            'reaction_count': sum(self.reaction_activity.values()),
+            'active_channels': {str(channel): count for channel, count, _ in self.channel_activity.top()},
+            'emoji_usage': {emoji: count for emoji, count, _ in self.emoji_usage.top(10)},
+            'channel_topk': self.channel_activity.to_list(),
+            'emoji_topk': self.emoji_usage.to_list(),
+            'active_users': HyperLogLog.merged(self.hour_users.values(), GUILD_SKETCH_PRECISION).count()
+        }
+        return data
+
+    def clear_hour(self, voice_carry):
+        """Remet à zéro les compteurs de l'heure, une fois leur sauvegarde validée."""
+        self.message_count = 0
+        self.voice_activity = defaultdict(int)
+        self.voice_carry = voice_carry
+        self.reaction_activity = defaultdict(int)
+        self.channel_activity = SpaceSaving(TOP_CHANNELS_CAPACITY)
+        self.emoji_usage = SpaceSaving(TOP_EMOJIS_CAPACITY)
+        self.hour_users = {}
+        self.channel_users = {}
+
+    def load_stat(self, timestamp, data):
+        """Reprend dans l'historique une sauvegarde horaire (au chargement du cog)."""
+        messages = data.get('message_count', 0)
+        self.daily.add(day_index(timestamp), messages=messages,
+                       voice=data.get('voice_minutes', 0), reactions=data.get('reaction_count', 0))
+        self.week_hours[hour_of_week(timestamp)] += messages
+
+
+class AnalyticsStore:
+    """Compteurs de tous les serveurs: {identifiant du serveur: GuildAnalytics}."""
+
+    def __init__(self, journal=None, detector=None):
+        self.guilds = {}
+        self.journal = journal  # AnalyticsJournal recevant chaque événement compté
+        self.detector = detector  # AnomalyDetector recevant chaque message
+
+    def shard(self, guild_id):
+        """Compteurs du serveur `guild_id` (créés au premier événement)."""
+        shard = self.guilds.get(guild_id)
+        if shard is None:
+            shard = self.guilds[guild_id] = GuildAnalytics(guild_id)
+        return shard
+
+    def message(self, guild_id, bucket, user_id, channel_id):
+        """Message de `user_id` dans `channel_id` (serveur `guild_id`) à l'instant `bucket`."""
+        self.shard(guild_id).count_message(bucket, user_id, channel_id)
+        if self.journal is not None:
+            self.journal.append(['m', guild_id, bucket.day, bucket.week_hour, user_id, channel_id])
+        if self.detector is not None:
+            self.detector.message(guild_id, channel_id)
+
+    def reaction(self, guild_id, bucket, user_id, emoji):
+        """Réaction `emoji` de `user_id`."""
+        self.shard(guild_id).count_reaction(bucket, user_id, emoji)
+        if self.journal is not None:
+            self.journal.append(['r', guild_id, bucket.day, bucket.week_hour, user_id, emoji])
+
+    def voice(self, guild_id, bucket, user_id, minutes):
+        """Minutes vocales de `user_id`."""
+        self.shard(guild_id).count_voice(bucket, user_id, minutes)
+        if self.journal is not None:
+            self.journal.append(['v', guild_id, bucket.day, bucket.week_hour, user_id, minutes])
+
+    def replay(self, records):
+        """
+        Rejoue des événements du journal (sans les y réinscrire ni les compter
+        dans la fenêtre en cours du détecteur); renvoie le nombre rejoué.
+        """
+        journal, self.journal = self.journal, None
+        detector, self.detector = self.detector, None
+        replayed = 0
+        try:
+            for record in records:
+                try:
+                    kind, guild_id, day, week_hour = record[:4]
+                    bucket = Bucket(None, day, week_hour // 24, week_hour % 24, week_hour)
+                    handler = {'m': self.message, 'r': self.reaction, 'v': self.voice}[kind]
+                    handler(guild_id, bucket, record[4], record[5])
+                    replayed += 1
+                except (IndexError, KeyError, TypeError, ValueError):
+                    continue
+        finally:
+            self.journal = journal
+            self.detector = detector
+        return replayed
+
+    def hourly_rows(self, now=None, names=None):
+        """
+        Relevé de l'heure écoulée, sans rien remettre à zéro: lignes ServerStat (une
+        par serveur) et UserStat (minutes vocales par membre) prêtes pour un insert
+        groupé, et esquisses à passer à save_sketches(). `names(serveur, membre)`
+        donne le nom affiché.
+
+        Les compteurs ne sont remis à zéro que par clear_hour(), une fois la
+        sauvegarde validée: appeler les deux sans rendre la main à la boucle
+        d'événements, pour qu'aucun événement ne soit compté entre les deux.
+
+        Returns:
+            HourlyRows
+        """
+        now = now or datetime.datetime.utcnow()
+        server_rows, user_rows, sketches, voice_carry = [], [], [], {}
+        for guild_id, shard in self.guilds.items():
+            minutes_by_user, voice_carry[guild_id] = shard.voice_minutes()
+            for user_id, minutes in minutes_by_user.items():
+                user_rows.append({
+                    'timestamp': now,
+                    'guild_id': str(guild_id),
+                    'user_id': str(user_id),
+                    'username': names(guild_id, user_id) if names else None,
+                    'message_count': 0,
+                    'voice_minutes': minutes,
+                    'reaction_count': 0,
+                })
+            server_rows.append({
+                'timestamp': now,
+                'guild_id': str(guild_id),
+                'type': 'hourly',
+                'data': json.dumps(shard.hourly_snapshot()),
+            })
+            sketches.extend(shard.sketch_rows())
+        return HourlyRows(server_rows, user_rows, sketches, voice_carry)
+
+    def clear_hour(self, hourly):
+        """Remet à zéro les compteurs relevés par hourly_rows(), enregistrés en base."""
+        for guild_id, voice_carry in hourly.voice_carry.items():
+            self.guilds[guild_id].clear_hour(voice_carry)
+
+
+def save_sketches(session, rows):
+    """
+    Enregistre des esquisses (HourlyRows.sketches) dans la transaction
+    de `session`: les esquisses horaires sont insérées, celles d'un salon sont
+    fusionnées avec la ligne déjà enregistrée pour le même jour.
+    """
+    from sqlalchemy import insert
+    from models import ActivitySketch
+
+    hourly = [row for row in rows if row['period'] == 'hour']
+    daily = {(row['guild_id'], row['channel_id'], row['start']): row['sketch']
+             for row in rows if row['period'] == 'day'}
+    if hourly:
+        session.execute(insert(ActivitySketch), [{
+            'guild_id': row['guild_id'], 'channel_id': None, 'period': 'hour',
+            'start': row['start'], 'registers': row['sketch'].to_bytes(),
+        } for row in hourly])
+    if not daily:
+        return
+
+    existing = session.query(ActivitySketch).filter(
+        ActivitySketch.period == 'day',
+        ActivitySketch.guild_id.in_({guild_id for guild_id, _, _ in daily}),
+        ActivitySketch.start.in_({start for _, _, start in daily}),
+    )
+    for stored in existing:
+        sketch = daily.pop((stored.guild_id, stored.channel_id, stored.start), None)
+        if sketch is not None:
+            stored.registers = sketch.update(HyperLogLog.from_bytes(stored.registers)).to_bytes()
+    if daily:
+        session.execute(insert(ActivitySketch), [{
+            'guild_id': guild_id, 'channel_id': channel_id, 'period': 'day',
+            'start': start, 'registers': sketch.to_bytes(),
+        } for (guild_id, channel_id, start), sketch in daily.items()])
+
+
+def unique_members(session, since, until=None, guild_id=None, channel_id=None, pending=()):
+    """
+    Nombre estimé de membres actifs distincts entre `since` et `until` (UTC),
+    d'un serveur, d'un salon (`channel_id`, au jour près) ou de tous les serveurs.
+    `pending` complète la base avec des esquisses pas encore enregistrées.
+    """
+    from models import ActivitySketch
+
+    if channel_id is not None:
+        query = session.query(ActivitySketch.registers).filter(
+            ActivitySketch.period == 'day',
+            ActivitySketch.channel_id == str(channel_id),
+            ActivitySketch.start >= datetime.datetime.combine(since.date(), datetime.time()))
+        precision = CHANNEL_SKETCH_PRECISION
+    else:
+        query = session.query(ActivitySketch.registers).filter(
+            ActivitySketch.period == 'hour',
+            ActivitySketch.start >= since.replace(minute=0, second=0, microsecond=0))
+        precision = GUILD_SKETCH_PRECISION
+    if guild_id is not None:
+        query = query.filter(ActivitySketch.guild_id == str(guild_id))
+    if until is not None:
+        query = query.filter(ActivitySketch.start < until)
+    sketches = [registers for registers, in query]
+    return HyperLogLog.merged(sketches + list(pending), precision).count()
+
+
+def top_items(session, guild_id, kind, since, pending=None, limit=None):
+    """
+    Salons (`kind` = 'channels') ou emojis ('emojis') les plus utilisés d'un
+    serveur depuis `since`: fusion des résumés horaires enregistrés et du
+    résumé en cours `pending`.
+
+    Returns:
+        Liste de (salon ou emoji, nombre, surestimation maximale)
+    """
+    from models import ServerStat
+
+    key, capacity = TOP_KEYS[kind]
+    rows = session.query(ServerStat.data).filter(
+        ServerStat.guild_id == str(guild_id),
+        ServerStat.type == 'hourly',
+        ServerStat.timestamp >= since)
+    summaries = []
+    for data, in rows:
+        try:
+            summaries.append(json.loads(data).get(key) or [])
+        except (TypeError, ValueError):
+            continue
+    if pending is not None:
+        summaries.append(pending)
+    return SpaceSaving.merged(summaries, capacity).top(limit)
@@ -0,0 +1,143 @@
+"""
+Détection en continu des variations anormales d'activité (messages, arrivées).
+
+Chaque événement incrémente un compteur de la fenêtre en cours (O(1): une
+entrée de dictionnaire par serveur, par salon et par métrique). À la fin de
+chaque fenêtre de WINDOW_SECONDS secondes, le compte de chaque série est
+comparé à sa moyenne mobile exponentielle (EWMA, demi-vie HALF_LIFE fenêtres)
+et à sa variance, mises à jour de façon incrémentale:
+
+    écart = (compte - moyenne) / sqrt(max(variance, moyenne, 1))
+
+Le plancher `moyenne` est l'écart type d'un comptage de Poisson: une série
+calme ne lève pas d'alerte pour quelques messages de plus. Une alerte est
+levée quand |écart| >= THRESHOLD, après WARMUP fenêtres d'apprentissage, si le
+compte atteint MIN_SPIKE (pics) ou si la moyenne atteint MIN_DROP_BASELINE
+(chutes; aucune pour les arrivées). Une série en alerte se tait ensuite
+COOLDOWN_WINDOWS fenêtres. La fenêtre anormale est comptée dans la moyenne
+comme les autres: une hausse durable devient la nouvelle normale.
+
+Les seuils se règlent sur l'historique avec anomaly_replay.py.
+"""
+import math
+from collections import defaultdict, namedtuple
+
+# Durée d'une fenêtre de comptage (secondes)
+WINDOW_SECONDS = 300
+# Demi-vie de la moyenne et de la variance, en fenêtres (1 h avec des fenêtres de 5 minutes)
+HALF_LIFE = 12
+# Écart (en écarts types) à partir duquel une fenêtre est anormale
+THRESHOLD = 4.0
+# Fenêtres observées avant la première alerte d'une série
+WARMUP = 12
+# Compte minimal d'une fenêtre pour signaler un pic, par métrique
+MIN_SPIKE = {'messages': 30, 'joins': 5}
+# Moyenne minimale pour signaler une chute, par métrique (None: jamais)
+MIN_DROP_BASELINE = {'messages': 50, 'joins': None}
+# Fenêtres sans nouvelle alerte pour une série qui vient d'en lever une
+COOLDOWN_WINDOWS = 12
+# Moyenne en deçà de laquelle une série inactive est oubliée (salons abandonnés)
+IDLE_MEAN = 0.01
+
+Anomaly = namedtuple('Anomaly', 'metric guild_id channel_id value expected score direction')
+
+
+class RateBaseline:
+    """Moyenne et variance exponentielles d'une série de comptes."""
+
+    __slots__ = ('mean', 'variance', 'samples', 'quiet_until')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.variance = 0.0
+        self.samples = 0
+        self.quiet_until = 0
+
+    def score(self, value):
+        """Écart de `value` à la moyenne, en écarts types (plancher de Poisson)"""
+        return (value - self.mean) / math.sqrt(max(self.variance, self.mean, 1.0))
+
+    def update(self, value, alpha):
+        if not self.samples:
+            self.mean = float(value)
+        else:
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.samples += 1
+
+
+class AnomalyDetector:
+    """Séries (métrique, serveur, salon ou None) et leurs moyennes, une fenêtre à la fois."""
+
+    def __init__(self, half_life=HALF_LIFE, threshold=THRESHOLD, warmup=WARMUP, min_spike=None,
+                 min_drop_baseline=None, cooldown=COOLDOWN_WINDOWS, registry=None):
+        self.alpha = 1 - 0.5 ** (1 / half_life)
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_spike = dict(MIN_SPIKE, **(min_spike or {}))
+        self.min_drop_baseline = dict(MIN_DROP_BASELINE, **(min_drop_baseline or {}))
+        self.cooldown = cooldown
+        self.registry = registry  # web_metrics.Registry recevant scores et alertes
+        self.current = defaultdict(int)  # {(métrique, serveur, salon): événements de la fenêtre en cours}
+        self.baselines = {}  # {(métrique, serveur, salon): RateBaseline}
+        self.window = 0
+
+    def message(self, guild_id, channel_id):
+        """Un message (appelé pour chaque message compté)."""
+        current = self.current
+        current[('messages', guild_id, None)] += 1
+        current[('messages', guild_id, channel_id)] += 1
+
+    def join(self, guild_id):
+        """Une arrivée de membre."""
+        self.current[('joins', guild_id, None)] += 1
+
+    def add(self, metric, guild_id, channel_id, count):
+        """Ajoute `count` événements d'un coup (rejeu de l'historique)."""
+        self.current[(metric, guild_id, channel_id)] += count
+
+    def close_window(self):
+        """Clôt la fenêtre en cours: met à jour chaque série et renvoie les anomalies (liste d'Anomaly)."""
+        counts, self.current = self.current, defaultdict(int)
+        self.window += 1
+        baselines = self.baselines
+        for key in counts.keys() - baselines.keys():
+            baselines[key] = RateBaseline()
+
+        anomalies = []
+        for key, baseline in list(baselines.items()):
+            value = counts.get(key, 0)
+            anomaly = self._check(key, baseline, value)
+            if anomaly is not None:
+                anomalies.append(anomaly)
+            baseline.update(value, self.alpha)
+            if not value and baseline.mean < IDLE_MEAN and baseline.samples > self.warmup:
+                del baselines[key]
+        return anomalies
+
+    def _check(self, key, baseline, value):
+        if baseline.samples < self.warmup:
+            return None
+        metric, guild_id, channel_id = key
+        score = baseline.score(value)
+        scope = 'channel' if channel_id is not None else 'guild'
+        if self.registry is not None:
+            self.registry.observe('anomaly_score', (('metric', metric), ('scope', scope)), score)
+        if abs(score) < self.threshold or self.window < baseline.quiet_until:
+            return None
+        if score > 0:
+            if value < self.min_spike.get(metric, 0):
+                return None
+            direction = 'spike'
+        else:
+            floor = self.min_drop_baseline.get(metric)
+            if floor is None or baseline.mean < floor:
+                return None
+            direction = 'drop'
+        baseline.quiet_until = self.window + self.cooldown
+        if self.registry is not None:
+            self.registry.inc('anomaly_alerts_total',
+                              (('metric', metric), ('scope', scope), ('direction', direction)))
+        return Anomaly(metric, guild_id, channel_id, value, baseline.mean, score, direction)
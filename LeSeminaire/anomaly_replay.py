@@ -0,0 +1,132 @@
+"""
+Rejoue l'historique ServerStat (sauvegardes horaires du cog `analytics`) et
+les arrivées de member_events dans le détecteur d'anomalies, pour régler ses
+seuils avant de les changer dans anomaly_detector.py.
+
+    python anomaly_replay.py --days 60 --threshold 3,4,5
+    python anomaly_replay.py --guild 123456789 --threshold 4 --channels
+
+L'historique est horaire: une fenêtre rejouée dure une heure (et non
+WINDOW_SECONDS), et --half-life et --warmup se comptent en heures. Les salons
+(--channels) sont tirés des résumés channel_topk, donc approchés. Avec un seul
+seuil, chaque alerte est affichée; avec plusieurs, seul leur nombre l'est.
+"""
+import sys
+import json
+import argparse
+import datetime
+from collections import defaultdict
+
+from anomaly_detector import AnomalyDetector, HALF_LIFE, THRESHOLD, WARMUP, MIN_SPIKE
+
+
+# Retard toléré d'une sauvegarde horaire sur l'heure pile (cogs/analytics.py, SAVE_TIMES)
+SAVE_LAG = datetime.timedelta(minutes=1)
+
+
+def _hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def load_hours(session, since, guild_id=None, channels=False, now=None):
+    """
+    Comptes horaires depuis `since`, jusqu'à la dernière heure complète avant `now`.
+    Chaque heure de l'intervalle est présente, même sans aucun compte: le
+    détecteur la voit alors comme une fenêtre à zéro, comme en direct.
+
+    Returns:
+        Liste triée de (heure, [(métrique, serveur, salon ou None, compte), ...])
+    """
+    from models import MemberEvent, ServerStat
+
+    start, end = _hour(since), _hour(now or datetime.datetime.utcnow())
+    hours = {}
+    hour = start
+    while hour < end:
+        hours[hour] = []
+        hour += datetime.timedelta(hours=1)
+
+    query = session.query(ServerStat.guild_id, ServerStat.timestamp, ServerStat.data).filter(
+        ServerStat.type == 'hourly', ServerStat.timestamp >= since)
+    if guild_id is not None:
+        query = query.filter(ServerStat.guild_id == str(guild_id))
+    for guild, timestamp, raw in query:
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw or {}
+        except ValueError:
+            continue
+        # Une ligne est datée de sa sauvegarde: faite à l'heure pile, elle porte l'heure
+        # qui vient de s'écouler; faite en cours d'heure (déchargement du cog), le
+        # début de l'heure en cours, que complète la sauvegarde de l'heure pile suivante
+        hour = _hour(timestamp - SAVE_LAG)
+        if hour not in hours:
+            continue
+        hours[hour].append(('messages', guild, None, data.get('message_count', 0)))
+        if channels:
+            for channel, count, _ in data.get('channel_topk') or ():
+                hours[hour].append(('messages', guild, str(channel), count))
+
+    query = session.query(MemberEvent.guild_id, MemberEvent.occurred_at).filter(
+        MemberEvent.kind == 'join', MemberEvent.occurred_at >= since)
+    if guild_id is not None:
+        query = query.filter(MemberEvent.guild_id == str(guild_id))
+    joins = defaultdict(int)
+    for guild, occurred_at in query:
+        joins[(_hour(occurred_at), guild)] += 1
+    for (hour, guild), count in joins.items():
+        if hour in hours:
+            hours[hour].append(('joins', guild, None, count))
+    return sorted(hours.items())
+
+
+def replay(hours, **options):
+    """Rejoue `hours` (load_hours) dans un détecteur neuf; renvoie la liste de (heure, Anomaly)."""
+    detector = AnomalyDetector(**options)
+    alerts = []
+    for hour, counts in hours:
+        for metric, guild, channel, count in counts:
+            detector.add(metric, guild, channel, count)
+        alerts.extend((hour, anomaly) for anomaly in detector.close_window())
+    return alerts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Réglage du détecteur d'anomalies sur l'historique")
+    parser.add_argument('--days', type=int, default=30, help="Jours d'historique rejoués")
+    parser.add_argument('--guild', help="Limiter au serveur d'identifiant donné")
+    parser.add_argument('--channels', action='store_true', help="Inclure les salons (résumés channel_topk)")
+    parser.add_argument('--threshold', default=str(THRESHOLD), help="Seuil(s) en écarts types, ex. 3,4,5")
+    parser.add_argument('--half-life', type=float, default=HALF_LIFE, help="Demi-vie de la moyenne (heures)")
+    parser.add_argument('--warmup', type=int, default=WARMUP, help="Heures d'apprentissage par série")
+    parser.add_argument('--min-messages', type=int, default=MIN_SPIKE['messages'], help="Messages minimum d'un pic")
+    parser.add_argument('--min-joins', type=int, default=MIN_SPIKE['joins'], help="Arrivées minimum d'un pic")
+    args = parser.parse_args(argv)
+
+    from database import DatabaseManager
+    session = DatabaseManager().get_session()
+    try:
+        since = datetime.datetime.utcnow() - datetime.timedelta(days=args.days)
+        hours = load_hours(session, since, args.guild, args.channels)
+    finally:
+        session.close()
+    print(f"{len(hours)} heure(s) d'historique depuis le {since:%d/%m/%Y}")
+
+    thresholds = [float(value) for value in args.threshold.split(',')]
+    for threshold in thresholds:
+        alerts = replay(hours, half_life=args.half_life, threshold=threshold, warmup=args.warmup,
+                        min_spike={'messages': args.min_messages, 'joins': args.min_joins})
+        by_kind = defaultdict(int)
+        for _, anomaly in alerts:
+            by_kind[(anomaly.metric, anomaly.direction)] += 1
+        summary = ", ".join(f"{metric}/{direction}: {count}" for (metric, direction), count in sorted(by_kind.items()))
+        print(f"Seuil {threshold:g}: {len(alerts)} alerte(s){' (' + summary + ')' if summary else ''}")
+        if len(thresholds) == 1:
+            for hour, anomaly in alerts:
+                scope = f"salon {anomaly.channel_id}" if anomaly.channel_id is not None else "serveur"
+                print(f"  {hour:%Y-%m-%d %H:00} {anomaly.guild_id} {scope}: {anomaly.metric} {anomaly.direction} "
+                      f"{anomaly.value} (~{anomaly.expected:.1f} attendus, écart {anomaly.score:+.1f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,27 @@
 import os
+import time
 import datetime
 import json
+import random
 from functools import wraps
 
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, abort, session
+from flask import Flask, current_app, render_template, redirect, url_for, flash, request, jsonify, abort, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from page_cache import page_cache
+from pagination import ListingParams, prefix_filter
+from rate_limit import rate_limiter
+from live_metrics import live_metrics, public_view as live_metrics_view
+import search_index as search
+from search_index import search_index
+from web_metrics import web_metrics
+import static_assets
+import command_docs
+from route_registry import RouteRegistry
 
 
 class Base(DeclarativeBase):
@@ -15,69 +29,66 @@ class Base(DeclarativeBase):
 
 
 db = SQLAlchemy(model_class=Base)
-# create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
-
-# configure the database, relative to the app instance folder
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///lebot.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
-# initialize the app with the extension, flask-sqlalchemy >= 3.0.x
-db.init_app(app)
 
 # Flask-Login setup
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'admin_login'
 login_manager.login_message = 'Veuillez vous connecter pour accéder à cette page.'
 login_manager.login_message_category = 'warning'
 
-@app.route('/')
+# Les vues sont déclarées ici et enregistrées sur l'application par create_app()
+web = RouteRegistry()
+
+# Durée de vie des agrégats de la page de statistiques en temps réel (secondes)
+REALTIME_STATS_TTL = 30
+
+@web.route('/')
+@page_cache.cached_page()
 def index():
     """Page d'accueil du site"""
     return render_template('index.html', active_page='home')
 
-@app.route('/features')
+@web.route('/features')
+@page_cache.cached_page()
 def features():
     """Page des fonctionnalités du bot"""
     return render_template('features.html', active_page='features')
 
-@app.route('/commands')
+@web.route('/commands')
+@page_cache.cached_page()
 def commands():
     """Page des commandes disponibles"""
     return render_template('commands.html', active_page='commands')
     
-@app.route('/commands/doc')
+@web.route('/commands/doc')
+@page_cache.cached_page()
 def commands_doc():
-    """Page de documentation détaillée des commandes"""
-    # Récupération de la dernière mise à jour
-    last_update = datetime.datetime.now().strftime('%d/%m/%Y')
+    """Page de documentation détaillée des commandes, générée depuis l'arbre de commandes du bot"""
+    docs = command_docs.load_command_docs()
+    last_update = None
+    if docs:
+        generated_at = datetime.datetime.fromisoformat(docs['generated_at'].rstrip('Z'))
+        last_update = generated_at.strftime('%d/%m/%Y')
     
-    # Simuler des données pour la documentation (à remplacer par des données réelles)
-    command_data = {
-        "last_update": last_update
-    }
-    
-    return render_template('commands_doc.html', active_page='commands', **command_data)
+    return render_template('commands_doc.html', active_page='commands', docs=docs, last_update=last_update)
 
-@app.route('/resources')
+@web.route('/resources')
+@page_cache.cached_page(tags=('resources', 'samples'))
 def resources():
     """Page des ressources artistiques"""
     return render_template('resources.html', active_page='resources')
 
-@app.route('/security')
+@web.route('/security')
+@page_cache.cached_page()
 def security():
     """Page des fonctionnalités de sécurité du bot"""
     return render_template('security.html', active_page='security')
 
-@app.route('/contact', methods=['GET', 'POST'])
+@web.route('/contact', methods=['GET', 'POST'])
+@rate_limiter.limit('contact')
 def contact():
     """Page de contact avec formulaire"""
     from email_validator import validate_email, EmailNotValidError
-    import random
     
     success = False
     error = None
@@ -163,6 +174,7 @@ def contact():
                     )
                     
                     db.session.add(contact_message)
+                    models.Counter.adjust(db.session, UNREAD_MESSAGES_COUNTER, 1)
                     db.session.commit()
                     
                     # Réinitialiser la question captcha pour la prochaine fois
@@ -180,18 +192,18 @@ def contact():
                           captcha_question=captcha_question['question'],
                           form_data=form_data)
 
-@app.errorhandler(404)
+@web.errorhandler(404)
 def page_not_found(e):
     """Gestionnaire d'erreur 404"""
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@web.errorhandler(500)
 def server_error(e):
     """Gestionnaire d'erreur 500"""
     return render_template('500.html'), 500
 
 # Importez les modèles et configurez la gestion des admins
-import models
+import models  # noqa: E402 - models importe `db` depuis ce module
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -211,8 +223,71 @@ def admin_required(f):
     return decorated_function
 
 
+# Statuts possibles d'un projet de collaboration (voir models.Collaboration.status)
+COLLABORATION_STATUSES = ["En cours", "Terminé", "Abandonné"]
+
+# Compteur maintenu des messages de contact non lus (table counters)
+UNREAD_MESSAGES_COUNTER = 'contact_messages_unread'
+
+BULK_MESSAGE_ACTIONS = {
+    'read': 'marqué(s) comme lu(s)',
+    'respond': 'marqué(s) comme répondu(s)',
+    'delete': 'supprimé(s)'
+}
+
+BULK_RESOURCE_ACTIONS = {
+    'approve': 'approuvée(s)',
+    'reject': 'retirée(s) de la publication',
+    'recategorize': 'déplacée(s) dans la catégorie choisie',
+    'delete': 'supprimée(s)'
+}
+
+BULK_SAMPLE_ACTIONS = {
+    'regenre': 'déplacé(s) dans le genre choisi',
+    'delete': 'supprimé(s)'
+}
+
+# Nombre maximal d'éléments traités par une action groupée (taille de la clause IN)
+MAX_BULK_IDS = 1000
+
+
+def content_changed(*tags):
+    """Invalide les pages et fragments en cache qui dépendent du contenu modifié"""
+    page_cache.invalidate(*tags)
+
+
+def search_changed(*updates):
+    """
+    Répercute sur l'index d'autocomplétion des modifications validées avec
+    search.mark_changed(): tuples (type, id, document ou None si supprimé).
+    """
+    search_index.changed(db.session, *updates)
+
+
+@web.route('/admin/cache/stats')
+@admin_required
+def admin_cache_stats():
+    """Métriques du cache des pages publiques (taux de succès par type d'entrée)"""
+    return jsonify(page_cache.metrics())
+
+
+@web.route('/admin/search/stats')
+@admin_required
+def admin_search_stats():
+    """Taille et version de l'index d'autocomplétion de ce processus"""
+    return jsonify(search_index.metrics())
+
+
+@web.route('/admin/ratelimit/stats')
+@admin_required
+def admin_rate_limit_stats():
+    """Compteurs de la limitation de débit (requêtes acceptées et rejetées par limite)"""
+    return jsonify(rate_limiter.metrics())
+
+
 # Routes d'administration
-@app.route('/admin/login', methods=['GET', 'POST'])
+@web.route('/admin/login', methods=['GET', 'POST'])
+@rate_limiter.limit('admin_login')
 def admin_login():
     """Page de connexion admin"""
     if current_user.is_authenticated:
@@ -239,7 +314,7 @@ def admin_login():
     return render_template('admin/login.html')
 
 
-@app.route('/admin/logout')
+@web.route('/admin/logout')
 @login_required
 def admin_logout():
     """Déconnexion admin"""
@@ -248,7 +323,7 @@ def admin_logout():
     return redirect(url_for('admin_login'))
 
 
-@app.route('/admin/dashboard')
+@web.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
     """Tableau de bord admin"""
@@ -257,7 +332,8 @@ def admin_dashboard():
         'resources': db.session.query(models.Resource).count(),
         'samples': db.session.query(models.MusicSample).count(),
         'collaborations': db.session.query(models.Collaboration).count(),
-        'commands': db.session.query(models.CommandStat).count()
+        'commands': db.session.query(models.CommandStat).count(),
+        'unread_messages': models.Counter.get(db.session, UNREAD_MESSAGES_COUNTER)
     }
     
     # Récupérer les ressources récentes
@@ -270,18 +346,38 @@ def admin_dashboard():
     collaborations = db.session.query(models.Collaboration).order_by(models.Collaboration.updated_at.desc()).limit(10).all()
     
     return render_template('admin/dashboard.html', stats=stats, resources=resources, 
-                           samples=samples, collaborations=collaborations)
+                           samples=samples, collaborations=collaborations,
+                           settings=_load_admin_settings())
 
 
-@app.route('/admin/resources')
+@web.route('/admin/resources')
 @admin_required
 def admin_resources():
-    """Gestion des ressources artistiques"""
-    resources = db.session.query(models.Resource).order_by(models.Resource.added_at.desc()).all()
-    return render_template('admin/resources.html', resources=resources)
+    """Gestion des ressources artistiques (liste paginée, triable et filtrable)"""
+    from sqlalchemy import func
+    Resource = models.Resource
+    
+    listing = ListingParams(request.args, {
+        'added_at': Resource.added_at,
+        'title': func.lower(Resource.title)
+    }, default_sort='added_at')
+    
+    query = db.session.query(Resource)
+    category = request.args.get('category', '')
+    if category in models.ResourceCategory.__members__:
+        query = query.filter(Resource.category == models.ResourceCategory[category])
+    approved = request.args.get('approved', '')
+    if approved in ('0', '1'):
+        query = query.filter(Resource.approved == (approved == '1'))
+    if listing.search:
+        query = query.filter(prefix_filter(func.lower(Resource.title), listing.search.lower()))
+    
+    page = listing.paginate(query, Resource.id)
+    return render_template('admin/resources.html', page=page, listing=listing,
+                           categories=models.ResourceCategory)
 
 
-@app.route('/admin/resource/new', methods=['GET', 'POST'])
+@web.route('/admin/resource/new', methods=['GET', 'POST'])
 @admin_required
 def admin_resource_new():
     """Ajout d'une nouvelle ressource"""
@@ -313,7 +409,10 @@ def admin_resource_new():
         )
         
         db.session.add(resource)
+        search.mark_changed(db.session)
         db.session.commit()
+        content_changed('resources')
+        search_changed(('resource', resource.id, search.resource_document(resource)))
         
         flash('Ressource ajoutée avec succès !', 'success')
         return redirect(url_for('admin_resources'))
@@ -321,7 +420,7 @@ def admin_resource_new():
     return render_template('admin/resource_form.html', categories=categories)
 
 
-@app.route('/admin/resource/edit/<int:resource_id>', methods=['GET', 'POST'])
+@web.route('/admin/resource/edit/<int:resource_id>', methods=['GET', 'POST'])
 @admin_required
 def admin_resource_edit(resource_id):
     """Modification d'une ressource"""
@@ -356,7 +455,10 @@ def admin_resource_edit(resource_id):
         resource.added_by = added_by
         resource.approved = approved
         
+        search.mark_changed(db.session)
         db.session.commit()
+        content_changed('resources')
+        search_changed(('resource', resource.id, search.resource_document(resource)))
         
         flash('Ressource mise à jour avec succès !', 'success')
         return redirect(url_for('admin_resources'))
@@ -364,7 +466,7 @@ def admin_resource_edit(resource_id):
     return render_template('admin/resource_form.html', resource=resource, categories=categories)
 
 
-@app.route('/admin/resource/delete/<int:resource_id>')
+@web.route('/admin/resource/delete/<int:resource_id>')
 @admin_required
 def admin_resource_delete(resource_id):
     """Suppression d'une ressource"""
@@ -375,21 +477,117 @@ def admin_resource_delete(resource_id):
         return redirect(url_for('admin_resources'))
     
     db.session.delete(resource)
+    search.mark_changed(db.session)
     db.session.commit()
+    content_changed('resources')
+    search_changed(('resource', resource_id, None))
     
     flash('Ressource supprimée avec succès !', 'success')
     return redirect(url_for('admin_resources'))
 
 
-@app.route('/admin/samples')
+def selected_ids():
+    """Identifiants cochés dans un formulaire d'action groupée (champ `ids`)"""
+    return [int(value) for value in request.form.getlist('ids') if value.isdigit()][:MAX_BULK_IDS]
+
+
+def redirect_back(endpoint):
+    """Retour à la page d'origine (champ `next`) uniquement s'il s'agit d'un chemin local"""
+    next_url = request.form.get('next', '')
+    if not next_url.startswith('/') or next_url.startswith('//'):
+        next_url = url_for(endpoint)
+    return redirect(next_url)
+
+
+def bulk_update_resources(resource_ids, action, category=None):
+    """
+    Applique une action groupée aux ressources `resource_ids` en une seule requête
+    UPDATE ou DELETE; les lignes modifiées sont renvoyées par RETURNING pour tenir
+    à jour l'index d'autocomplétion sans les relire.
+    
+    Args:
+        resource_ids: Liste d'identifiants de ressources
+        action: 'approve', 'reject', 'recategorize' ou 'delete'
+        category: Nouvelle catégorie (models.ResourceCategory) pour 'recategorize'
+    
+    Returns:
+        Le nombre de ressources concernées
+    """
+    from sqlalchemy import update, delete, or_, true
+    Resource = models.Resource
+    selected = Resource.id.in_(resource_ids)
+    columns = (Resource.id, Resource.title, Resource.url, Resource.category, Resource.tags, Resource.approved)
+    
+    if action == 'delete':
+        rows = db.session.execute(delete(Resource).where(selected).returning(Resource.id)).all()
+        updates = [('resource', row.id, None) for row in rows]
+    elif action == 'reject':
+        rows = db.session.execute(update(Resource).where(selected, Resource.approved == true())
+                                  .values(approved=False).returning(Resource.id)).all()
+        updates = [('resource', row.id, None) for row in rows]
+    else:
+        if action == 'approve':
+            statement = update(Resource).where(selected, Resource.approved.isnot(True)).values(approved=True)
+        else:
+            statement = update(Resource).where(
+                selected, or_(Resource.category.is_(None), Resource.category != category)).values(category=category)
+        rows = db.session.execute(statement.returning(*columns)).all()
+        updates = [('resource', row.id, search.resource_document(row)) for row in rows]
+    
+    if rows:
+        search.mark_changed(db.session)
+    db.session.commit()
+    if rows:
+        content_changed('resources')
+        search_changed(*updates)
+    return len(rows)
+
+
+@web.route('/admin/resources/bulk', methods=['POST'])
+@admin_required
+def admin_resources_bulk():
+    """Actions groupées sur la sélection de ressources (approbation, retrait, catégorie, suppression)"""
+    action = request.form.get('action')
+    resource_ids = selected_ids()
+    category = models.ResourceCategory.__members__.get(request.form.get('category', ''))
+    
+    if action not in BULK_RESOURCE_ACTIONS:
+        flash('Action inconnue.', 'danger')
+    elif not resource_ids:
+        flash('Aucune ressource sélectionnée.', 'warning')
+    elif action == 'recategorize' and category is None:
+        flash('Choisissez la nouvelle catégorie.', 'warning')
+    else:
+        affected = bulk_update_resources(resource_ids, action, category)
+        flash(f'{affected} ressource(s) {BULK_RESOURCE_ACTIONS[action]}.', 'success')
+    
+    return redirect_back('admin_resources')
+
+
+@web.route('/admin/samples')
 @admin_required
 def admin_samples():
-    """Gestion des samples musicaux"""
-    samples = db.session.query(models.MusicSample).order_by(models.MusicSample.added_at.desc()).all()
-    return render_template('admin/samples.html', samples=samples)
+    """Gestion des samples musicaux (liste paginée, triable et filtrable)"""
+    from sqlalchemy import func
+    MusicSample = models.MusicSample
+    
+    listing = ListingParams(request.args, {
+        'added_at': MusicSample.added_at,
+        'title': func.lower(MusicSample.title)
+    }, default_sort='added_at')
+    
+    query = db.session.query(MusicSample)
+    genre = request.args.get('genre', '').strip()
+    if genre:
+        query = query.filter(MusicSample.genre == genre)
+    if listing.search:
+        query = query.filter(prefix_filter(func.lower(MusicSample.title), listing.search.lower()))
+    
+    page = listing.paginate(query, MusicSample.id)
+    return render_template('admin/samples.html', page=page, listing=listing)
 
 
-@app.route('/admin/sample/new', methods=['GET', 'POST'])
+@web.route('/admin/sample/new', methods=['GET', 'POST'])
 @admin_required
 def admin_sample_new():
     """Ajout d'un nouveau sample"""
@@ -421,7 +619,10 @@ def admin_sample_new():
         )
         
         db.session.add(sample)
+        search.mark_changed(db.session)
         db.session.commit()
+        content_changed('samples')
+        search_changed(('sample', sample.id, search.sample_document(sample)))
         
         flash('Sample ajouté avec succès !', 'success')
         return redirect(url_for('admin_samples'))
@@ -429,7 +630,7 @@ def admin_sample_new():
     return render_template('admin/sample_form.html')
 
 
-@app.route('/admin/sample/edit/<int:sample_id>', methods=['GET', 'POST'])
+@web.route('/admin/sample/edit/<int:sample_id>', methods=['GET', 'POST'])
 @admin_required
 def admin_sample_edit(sample_id):
     """Modification d'un sample"""
@@ -464,7 +665,10 @@ def admin_sample_edit(sample_id):
         sample.duration = int(duration) if duration else None
         sample.added_by = added_by
         
+        search.mark_changed(db.session)
         db.session.commit()
+        content_changed('samples')
+        search_changed(('sample', sample.id, search.sample_document(sample)))
         
         flash('Sample mis à jour avec succès !', 'success')
         return redirect(url_for('admin_samples'))
@@ -472,7 +676,7 @@ def admin_sample_edit(sample_id):
     return render_template('admin/sample_form.html', sample=sample)
 
 
-@app.route('/admin/sample/delete/<int:sample_id>')
+@web.route('/admin/sample/delete/<int:sample_id>')
 @admin_required
 def admin_sample_delete(sample_id):
     """Suppression d'un sample"""
@@ -483,21 +687,98 @@ def admin_sample_delete(sample_id):
         return redirect(url_for('admin_samples'))
     
     db.session.delete(sample)
+    search.mark_changed(db.session)
     db.session.commit()
+    content_changed('samples')
+    search_changed(('sample', sample_id, None))
     
     flash('Sample supprimé avec succès !', 'success')
     return redirect(url_for('admin_samples'))
 
 
-@app.route('/admin/collaborations')
+def bulk_update_samples(sample_ids, action, genre=None):
+    """
+    Applique une action groupée aux samples `sample_ids` en une seule requête
+    UPDATE ou DELETE (voir bulk_update_resources).
+    
+    Args:
+        sample_ids: Liste d'identifiants de samples
+        action: 'regenre' ou 'delete'
+        genre: Nouveau genre pour 'regenre' (None pour le retirer)
+    
+    Returns:
+        Le nombre de samples concernés
+    """
+    from sqlalchemy import update, delete
+    MusicSample = models.MusicSample
+    selected = MusicSample.id.in_(sample_ids)
+    
+    if action == 'delete':
+        rows = db.session.execute(delete(MusicSample).where(selected).returning(MusicSample.id)).all()
+        updates = [('sample', row.id, None) for row in rows]
+    else:
+        unchanged = MusicSample.genre.is_(None) if genre is None else MusicSample.genre == genre
+        rows = db.session.execute(
+            update(MusicSample).where(selected, ~unchanged).values(genre=genre).returning(
+                MusicSample.id, MusicSample.title, MusicSample.url, MusicSample.genre,
+                MusicSample.bpm, MusicSample.tags)).all()
+        updates = [('sample', row.id, search.sample_document(row)) for row in rows]
+    
+    if rows:
+        search.mark_changed(db.session)
+    db.session.commit()
+    if rows:
+        content_changed('samples')
+        search_changed(*updates)
+    return len(rows)
+
+
+@web.route('/admin/samples/bulk', methods=['POST'])
+@admin_required
+def admin_samples_bulk():
+    """Actions groupées sur la sélection de samples (genre, suppression)"""
+    action = request.form.get('action')
+    sample_ids = selected_ids()
+    
+    if action not in BULK_SAMPLE_ACTIONS:
+        flash('Action inconnue.', 'danger')
+    elif not sample_ids:
+        flash('Aucun sample sélectionné.', 'warning')
+    else:
+        genre = request.form.get('genre', '').strip()[:50] or None
+        affected = bulk_update_samples(sample_ids, action, genre)
+        flash(f'{affected} sample(s) {BULK_SAMPLE_ACTIONS[action]}.', 'success')
+    
+    return redirect_back('admin_samples')
+
+
+@web.route('/admin/collaborations')
 @admin_required
 def admin_collaborations():
-    """Gestion des projets de collaboration"""
-    collaborations = db.session.query(models.Collaboration).order_by(models.Collaboration.updated_at.desc()).all()
-    return render_template('admin/collaborations.html', collaborations=collaborations)
+    """Gestion des projets de collaboration (liste paginée, triable et filtrable)"""
+    from sqlalchemy import func
+    from sqlalchemy.orm import selectinload
+    Collaboration = models.Collaboration
+    
+    listing = ListingParams(request.args, {
+        'updated_at': Collaboration.updated_at,
+        'title': func.lower(Collaboration.title)
+    }, default_sort='updated_at')
+    
+    # Les membres sont chargés en une seule requête pour toute la page
+    query = db.session.query(Collaboration).options(selectinload(Collaboration.members))
+    status = request.args.get('status', '').strip()
+    if status:
+        query = query.filter(Collaboration.status == status)
+    if listing.search:
+        query = query.filter(prefix_filter(func.lower(Collaboration.title), listing.search.lower()))
+    
+    page = listing.paginate(query, Collaboration.id)
+    return render_template('admin/collaborations.html', page=page, listing=listing,
+                           statuses=COLLABORATION_STATUSES)
 
 
-@app.route('/admin/collab/view/<int:collab_id>')
+@web.route('/admin/collab/view/<int:collab_id>')
 @admin_required
 def admin_collab_view(collab_id):
     """Détails d'un projet de collaboration"""
@@ -510,70 +791,151 @@ def admin_collab_view(collab_id):
     return render_template('admin/collab_view.html', collab=collab)
 
 
-@app.route('/admin/users')
+@web.route('/admin/users')
 @admin_required
 def admin_users():
-    """Gestion des utilisateurs (simulation)"""
-    # Dans un environnement réel, nous récupérerions les utilisateurs Discord via l'API
-    # Ici, nous simulons quelques utilisateurs pour la démonstration
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    offset = (page - 1) * per_page
-    
-    # Simulation de données utilisateurs
-    users = [
-        {
-            'id': '123456789012345678',
-            'username': 'user1',
-            'display_name': 'Utilisateur 1',
-            'avatar_url': 'https://cdn.discordapp.com/embed/avatars/0.png',
-            'status': 'online',
-            'joined_at': datetime.datetime.utcnow() - datetime.timedelta(days=30),
-            'created_at': datetime.datetime.utcnow() - datetime.timedelta(days=120),
-            'roles': [
-                {'name': 'Admin', 'color': '#FF0000'},
-                {'name': 'Artiste', 'color': '#00FF00'}
-            ],
-            'last_activity': 'Aujourd\'hui à 14:30',
-            'message_count': 125,
-            'command_count': 42,
-            'warning_count': 0,
-            'notes': None,
-            'is_verified': True
-        },
-        {
-            'id': '234567890123456789',
-            'username': 'user2',
-            'display_name': 'Utilisateur 2',
-            'avatar_url': 'https://cdn.discordapp.com/embed/avatars/1.png',
-            'status': 'idle',
-            'joined_at': datetime.datetime.utcnow() - datetime.timedelta(days=15),
-            'created_at': datetime.datetime.utcnow() - datetime.timedelta(days=90),
-            'roles': [
-                {'name': 'Modérateur', 'color': '#FFFF00'},
-                {'name': 'Musicien', 'color': '#0000FF'}
-            ],
-            'last_activity': 'Hier à 18:45',
-            'message_count': 87,
-            'command_count': 23,
-            'warning_count': 1,
-            'notes': 'A reçu un avertissement pour spam le 12/03/2025',
-            'is_verified': True
-        }
-    ]
+    """Liste des membres connus du bot, agrégée depuis les statistiques utilisateurs"""
+    from sqlalchemy import func
+    UserStat = models.UserStat
+    
+    # Le tri porte sur la clé de regroupement: la requête parcourt l'index
+    # (guild_id, user_id) ou (user_id) dans l'ordre et s'arrête après une page.
+    listing = ListingParams(request.args, {'user_id': UserStat.user_id},
+                            default_sort='user_id', default_order='asc')
+    
+    query = db.session.query(
+        UserStat.user_id.label('user_id'),
+        func.max(UserStat.username).label('username'),
+        func.count(func.distinct(UserStat.guild_id)).label('guild_count'),
+        func.sum(UserStat.message_count).label('message_count'),
+        func.sum(UserStat.voice_minutes).label('voice_minutes'),
+        func.sum(UserStat.reaction_count).label('reaction_count'),
+        func.max(UserStat.timestamp).label('last_seen')
+    )
+    guild_id = request.args.get('guild', '').strip()
+    if guild_id:
+        query = query.filter(UserStat.guild_id == guild_id)
+    if listing.search:
+        if listing.search.isdigit():
+            query = query.filter(prefix_filter(UserStat.user_id, listing.search))
+        else:
+            query = query.filter(prefix_filter(func.lower(UserStat.username), listing.search.lower()))
+    query = query.group_by(UserStat.user_id)
+    
+    page = listing.paginate(query)
+    return render_template('admin/users.html', page=page, listing=listing)
+
+
+@web.route('/admin/messages')
+@admin_required
+def admin_messages():
+    """Boîte de réception des messages de contact, triée par priorité"""
+    from sqlalchemy import func
+    ContactMessage = models.ContactMessage
+    
+    # Le tri « triage » suit l'index (is_read, priority DESC, created_at DESC, id DESC):
+    # une fois le statut de lecture fixé, chaque page est une simple lecture d'index.
+    listing = ListingParams(request.args, {
+        'triage': (ContactMessage.priority, ContactMessage.created_at),
+        'created_at': ContactMessage.created_at
+    }, default_sort='triage')
+    
+    query = db.session.query(ContactMessage)
+    is_read = request.args.get('read', '0')
+    if is_read in ('0', '1'):
+        query = query.filter(ContactMessage.is_read == (is_read == '1'))
+    if listing.search:
+        query = query.filter(prefix_filter(func.lower(ContactMessage.email), listing.search.lower()))
+    
+    page = listing.paginate(query, ContactMessage.id)
+    return render_template('admin/messages.html', page=page, listing=listing, read_filter=is_read,
+                           unread_count=models.Counter.get(db.session, UNREAD_MESSAGES_COUNTER))
+
+
+@web.route('/admin/messages/<int:message_id>')
+@admin_required
+def admin_message_view(message_id):
+    """Lecture d'un message de contact (le marque comme lu)"""
+    message = db.session.get(models.ContactMessage, message_id)
+    
+    if not message:
+        flash('Message non trouvé.', 'danger')
+        return redirect(url_for('admin_messages'))
+    
+    if not message.is_read:
+        mark_messages([message_id], 'read')
+        db.session.refresh(message)
+    
+    return render_template('admin/message_view.html', message=message)
+
+
+def mark_messages(message_ids, action):
+    """
+    Applique une action groupée aux messages `message_ids` en requêtes ensemblistes
+    et tient à jour le compteur de non lus dans la même transaction.
+    
+    Args:
+        message_ids: Liste d'identifiants de messages
+        action: 'read', 'respond' ou 'delete'
+    
+    Returns:
+        Le nombre de messages concernés
+    """
+    from sqlalchemy import update, delete, true, false
+    ContactMessage = models.ContactMessage
+    selected = ContactMessage.id.in_(message_ids)
+    unread = ContactMessage.is_read == false()
+    
+    if action == 'delete':
+        # Les non lus sont supprimés à part pour connaître leur nombre sans les relire
+        became_read = db.session.execute(delete(ContactMessage).where(selected, unread)).rowcount
+        affected = became_read + db.session.execute(delete(ContactMessage).where(selected)).rowcount
+    else:
+        values = {'is_read': True}
+        if action == 'respond':
+            values.update(responded=True, responded_at=datetime.datetime.utcnow())
+        became_read = db.session.execute(
+            update(ContactMessage).where(selected, unread).values(**values)).rowcount
+        affected = became_read
+        if action == 'respond':
+            affected += db.session.execute(
+                update(ContactMessage).where(selected, ContactMessage.is_read == true(),
+                                             ContactMessage.responded.isnot(True))
+                .values(**values)).rowcount
+    
+    models.Counter.adjust(db.session, UNREAD_MESSAGES_COUNTER, -became_read)
+    db.session.commit()
+    return affected
+
+
+@web.route('/admin/messages/bulk', methods=['POST'])
+@admin_required
+def admin_messages_bulk():
+    """Actions groupées sur la sélection de messages (lu, répondu, suppression)"""
+    action = request.form.get('action')
+    message_ids = selected_ids()
     
-    return render_template('admin/users.html', 
-                           users=users,
-                           page=page,
-                           total_pages=1,
-                           total_users=len(users),
-                           offset=offset,
-                           search_query=request.args.get('search', ''),
-                           filters_active=False,
-                           active_filters=[])
+    if action not in BULK_MESSAGE_ACTIONS:
+        flash('Action inconnue.', 'danger')
+    elif not message_ids:
+        flash('Aucun message sélectionné.', 'warning')
+    else:
+        affected = mark_messages(message_ids, action)
+        flash(f'{affected} message(s) {BULK_MESSAGE_ACTIONS[action]}.', 'success')
+    
+    return redirect_back('admin_messages')
 
 
-@app.route('/admin/settings', methods=['GET', 'POST'])
+def sync_unread_counter():
+    """Recalcule le compteur de messages non lus (à l'initialisation de la base)"""
+    from sqlalchemy import false
+    ContactMessage = models.ContactMessage
+    unread = db.session.query(ContactMessage).filter(ContactMessage.is_read == false()).count()
+    models.Counter.reset(db.session, UNREAD_MESSAGES_COUNTER, unread)
+    db.session.commit()
+
+
+@web.route('/admin/settings', methods=['GET', 'POST'])
 @admin_required
 def admin_settings():
     """Paramètres administrateur"""
@@ -608,7 +970,11 @@ def admin_settings():
         flash('Paramètres mis à jour avec succès !', 'success')
         return redirect(url_for('admin_dashboard'))
     
-    # Récupérer les paramètres actuels
+    return render_template('admin/settings.html', settings=_load_admin_settings())
+
+
+def _load_admin_settings():
+    """Récupère les paramètres d'administration actuels"""
     settings = {}
     
     admin_username = db.session.query(models.AdminSettings).filter_by(setting_key='admin_username').first()
@@ -623,83 +989,128 @@ def admin_settings():
     else:
         settings['welcome_message'] = "Bienvenue sur le serveur ! N'oubliez pas de lire les règles et de vous présenter."
     
-    return render_template('admin/settings.html', settings=settings)
+    return settings
 
 
-@app.route('/admin/send-dm/<user_id>', methods=['POST'])
+@web.route('/admin/send-dm', methods=['POST'])
+@web.route('/admin/send-dm/<user_id>', methods=['POST'])
 @admin_required
-def admin_send_dm(user_id):
-    """Envoyer un message direct via le bot (simulation)"""
-    data = request.get_json()
-    message = data.get('message', '')
+def admin_send_dm(user_id=None):
+    """Envoyer un message direct via le bot, à un membre ou à une sélection de membres (un seul lot)"""
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip()
     
     if not message:
         return jsonify({'success': False, 'error': 'Message vide'})
     
-    # Dans un environnement réel, nous enverrions le message via l'API Discord
-    # Ici, nous simulons juste une réponse positive
+    user_ids = [user_id] if user_id else data.get('user_ids') or []
+    if not isinstance(user_ids, list):
+        return jsonify({'success': False, 'error': 'Liste de destinataires invalide'}), 400
+    
+    # Le bot exécute les tâches déposées dans la table bot_jobs (voir job_bridge.py)
+    recipients = dict.fromkeys(str(uid) for uid in user_ids)
+    return _submit_bot_jobs('dm', [{'user_id': uid, 'message': message} for uid in recipients])
+
+
+def _submit_bot_jobs(kind, payloads):
+    """Dépose un lot de tâches pour le bot et renvoie son identifiant de suivi"""
+    import job_bridge
+    
+    try:
+        batch_id = job_bridge.submit_jobs(db.session, kind, payloads, created_by=current_user.username)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'jobs': len(payloads),
+        'status_url': url_for('admin_job_status', batch_id=batch_id),
+    }), 202
+
+
+@web.route('/admin/jobs', methods=['POST'])
+@admin_required
+def admin_submit_jobs():
+    """Soumettre un lot de tâches au bot: {"kind": "announcement", "payloads": [{...}, ...]}"""
+    data = request.get_json(silent=True) or {}
+    payloads = data.get('payloads')
+    if not isinstance(payloads, list):
+        return jsonify({'success': False, 'error': 'Liste de tâches invalide'}), 400
+    return _submit_bot_jobs(data.get('kind'), payloads)
+
+
+@web.route('/admin/jobs/<batch_id>')
+@admin_required
+def admin_job_status(batch_id):
+    """Avancement d'un lot de tâches soumis au bot"""
+    import job_bridge
     
-    return jsonify({'success': True})
+    status = job_bridge.batch_status(db.session, batch_id)
+    if status is None:
+        abort(404)
+    return jsonify(status)
 
 
-@app.route('/stats')
-@app.route('/statistiques')
+@web.route('/stats')
+@web.route('/statistiques')
+@page_cache.cached_page(tags=('stats', 'resources', 'samples'))
 def show_stats():
-    """Page de statistiques du bot"""
-    # Simuler des données pour les graphiques
-    days = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
-    command_data = [42, 37, 53, 62, 51, 33, 45]
-    music_data = [15, 22, 18, 27, 19, 34, 29]
+    """Page de statistiques du bot, servie depuis les résumés précalculés par stats_rollup.py"""
+    import stats_rollup
     
-    category_labels = ['Général', 'Modération', 'Musique', 'Ressources', 'Rôles', 'Admin']
-    category_data = [25, 18, 32, 15, 7, 3]
+    summaries, computed_at = stats_rollup.load_summaries(db.session)
     
-    resource_labels = list(cat.value for cat in models.ResourceCategory)
-    resource_data = [5, 12, 8, 6, 4, 7, 3, 9, 2, 1]
+    def series(metric):
+        return summaries.get(metric, [])
+    
+    # Activité des 7 derniers jours
+    commands_by_day = series('commands_by_day')
+    days = [label for label, _, _ in commands_by_day] or list(stats_rollup.WEEKDAYS)
+    command_data = [value for _, value, _ in commands_by_day] or [0] * len(days)
+    music_data = [value for _, value, _ in series('songs_by_day')] or [0] * len(days)
+    
+    category_labels = [label for label, _, _ in series('command_categories')]
+    category_data = [value for _, value, _ in series('command_categories')]
+    
+    resource_labels = [label for label, _, _ in series('resources_by_category')] or [cat.value for cat in models.ResourceCategory]
+    resource_data = [value for _, value, _ in series('resources_by_category')] or [0] * len(resource_labels)
     
     # Statistiques globales
+    totals = {label: value for label, value, _ in series('totals')}
+    uptime_seconds = totals.get('uptime_seconds')
+    if uptime_seconds is not None:
+        uptime = f"{uptime_seconds // 86400}j {uptime_seconds % 86400 // 3600}h {uptime_seconds % 3600 // 60}m"
+    else:
+        uptime = '-'
     stats = {
-        'servers': 10,
-        'total_users': 347,
-        'uptime': '7j 3h 12m',
-        'ping': 42,
-        'command_count': 1253,
-        'commands_today': 132,
-        'songs_played': 853,
-        'music_hours': 24
+        'servers': totals.get('servers', 0),
+        'total_users': totals.get('total_users', 0),
+        'uptime': uptime,
+        'ping': totals.get('ping', '-'),
+        'command_count': totals.get('command_count', 0),
+        'commands_today': totals.get('commands_today', 0),
+        'songs_played': totals.get('songs_played', 0),
+        'music_hours': totals.get('music_hours', 0)
     }
     
     # Top commandes
-    top_commands = [
-        {'name': 'play', 'category': 'music', 'uses': 324, 'percentage': 100},
-        {'name': 'help', 'category': 'general', 'uses': 253, 'percentage': 78},
-        {'name': 'ping', 'category': 'general', 'uses': 187, 'percentage': 58},
-        {'name': 'skip', 'category': 'music', 'uses': 152, 'percentage': 47},
-        {'name': 'art_resources', 'category': 'resources', 'uses': 118, 'percentage': 36},
-        {'name': 'queue', 'category': 'music', 'uses': 95, 'percentage': 29},
-        {'name': 'pause', 'category': 'music', 'uses': 82, 'percentage': 25},
-        {'name': 'resume', 'category': 'music', 'uses': 77, 'percentage': 24},
-        {'name': 'stop', 'category': 'music', 'uses': 63, 'percentage': 19},
-        {'name': 'clear', 'category': 'moderation', 'uses': 54, 'percentage': 17}
-    ]
+    top_commands = []
+    most_used = max([value for _, value, _ in series('top_commands')], default=0)
+    for name, uses, extra in series('top_commands'):
+        top_commands.append({'name': name, 'category': extra.get('category', 'general'), 'uses': uses,
+                             'percentage': round(uses * 100 / most_used) if most_used else 0})
     
-    # Top ressources
-    top_resources = [
-        {'title': 'Guide de l\'intermittence', 'description': 'Tout savoir sur le statut d\'intermittent du spectacle', 'category': 'Business', 'added_by': 'Admin', 'views': 124},
-        {'title': 'Tutoriel Mixage Audio', 'description': 'Guide complet pour le mixage audio professionnel', 'category': 'Mixage', 'added_by': 'User1', 'views': 98},
-        {'title': 'Masterisation en home studio', 'description': 'Techniques de masterisation à petit budget', 'category': 'Mastering', 'added_by': 'User2', 'views': 87},
-        {'title': 'Formation Ableton Live', 'description': 'Cours complet sur Ableton Live 11', 'category': 'Production', 'added_by': 'User3', 'views': 76},
-        {'title': 'Droits d\'auteur SACEM', 'description': 'Comment protéger vos œuvres musicales', 'category': 'Juridique', 'added_by': 'Admin', 'views': 65}
-    ]
+    # Dernières ressources ajoutées
+    top_resources = [dict(extra, title=title) for title, _, extra in series('latest_resources')]
     
     # Top chansons
-    top_songs = [
-        {'title': 'Titre chanson 1', 'duration': '3:45', 'added_by': 'User1', 'plays': 28},
-        {'title': 'Titre chanson 2', 'duration': '4:12', 'added_by': 'User2', 'plays': 22},
-        {'title': 'Titre chanson 3', 'duration': '3:21', 'added_by': 'User3', 'plays': 18},
-        {'title': 'Titre chanson 4', 'duration': '5:07', 'added_by': 'User1', 'plays': 15},
-        {'title': 'Titre chanson 5', 'duration': '2:59', 'added_by': 'User4', 'plays': 12}
-    ]
+    top_songs = [{'title': title, 'duration': extra.get('duration', '-'), 'added_by': extra.get('added_by'),
+                  'plays': plays} for title, plays, extra in series('top_songs')]
+    
+    last_update = computed_at.strftime('%d/%m/%Y %H:%M:%S') if computed_at else 'jamais'
     
     return render_template('stats.html', active_page='stats',
                           days=json.dumps(days), command_data=json.dumps(command_data),
@@ -710,23 +1121,16 @@ def show_stats():
                           resource_data=json.dumps(resource_data),
                           stats=stats, top_commands=top_commands,
                           top_resources=top_resources, top_songs=top_songs,
-                          last_update=datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
+                          last_update=last_update)
 
 
-@app.route('/stats/realtime')
-@app.route('/realtime-stats')
+@web.route('/stats/realtime')
+@web.route('/realtime-stats')
 def realtime_stats():
     """Page de statistiques en temps réel du bot"""
-    # Récupérer les données réelles à partir de la base de données
     last_update = datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')
     
-    from models import ServerStat, ChannelStat, UserStat, EngagementData, CommandStat
-    from sqlalchemy import func, desc
-    import json
-    import os
-    import time
     import psutil
-    import random  # Pour compléter certaines données non disponibles actuellement
     
     uptime = {
         'days': 0,
@@ -734,30 +1138,76 @@ def realtime_stats():
         'minutes': 0
     }
     
+    # Métriques publiées en direct par le bot (fichier partagé, sans accès à la base)
+    live = live_metrics.snapshot()
+    if live is not None and live['stale']:
+        live = None
+    
     try:
-        # Calculer l'uptime réel si possible
-        proc = psutil.Process()
-        uptime_seconds = time.time() - proc.create_time()
+        # Calculer l'uptime réel: celui du bot s'il publie ses métriques, sinon celui du processus
+        started_at = live['started_at'] if live else psutil.Process().create_time()
+        uptime_seconds = time.time() - started_at
         uptime['days'] = int(uptime_seconds // (60 * 60 * 24))
         uptime['hours'] = int((uptime_seconds % (60 * 60 * 24)) // (60 * 60))
         uptime['minutes'] = int((uptime_seconds % (60 * 60)) // 60)
     except Exception as e:
-        app.logger.warning(f"Erreur lors du calcul de l'uptime: {e}")
+        current_app.logger.warning(f"Erreur lors du calcul de l'uptime: {e}")
         # Valeurs par défaut
         uptime = {'days': 7, 'hours': 3, 'minutes': 12}
     
     try:
-        # Utilisation CPU/RAM actuelle
-        cpu_usage = psutil.cpu_percent(interval=0.1)
+        # Utilisation CPU/RAM actuelle (non bloquant: mesure depuis le dernier appel)
+        cpu_usage = psutil.cpu_percent(interval=None)
         ram_usage = psutil.Process().memory_info().rss // (1024 * 1024)  # en MB
     except Exception as e:
-        app.logger.warning(f"Erreur lors de la récupération des données système: {e}")
+        current_app.logger.warning(f"Erreur lors de la récupération des données système: {e}")
         cpu_usage = 24
         ram_usage = 256
     
     # Version du bot
     version = os.environ.get('BOT_VERSION', '1.2.0')
     
+    # Les agrégats issus de la base sont partagés entre les visiteurs pendant quelques secondes
+    db_stats = page_cache.memoize('realtime_stats', REALTIME_STATS_TTL, _collect_realtime_stats,
+                                  tags=('stats',))
+    
+    if live:
+        db_stats = dict(db_stats, total_servers=live['guilds'])
+    
+    return render_template('realtime_stats.html',
+                          active_page='stats',
+                          last_update=last_update,
+                          uptime=uptime,
+                          # Ping réel du bot, à défaut le temps de réponse moyen estimé
+                          ping=round(live['latency_ms']) if live else db_stats['avg_response_time'],
+                          live=live,
+                          cpu_usage=cpu_usage,
+                          ram_usage=ram_usage,
+                          version=version,
+                          fragment_ttl=REALTIME_STATS_TTL,
+                          **db_stats)
+
+
+@web.route('/api/stats/live')
+def live_stats_api():
+    """Métriques en direct du bot (interrogées périodiquement par la page temps réel)"""
+    return jsonify(live_metrics_view(live_metrics.snapshot()))
+
+
+@web.route('/api/search/suggest')
+def search_suggest():
+    """Autocomplétion: titres, tags et genres des ressources et samples commençant par `q`"""
+    prefix = request.args.get('q', '')[:100]
+    limit = max(1, min(request.args.get('limit', search.DEFAULT_LIMIT, type=int), search.MAX_LIMIT))
+    search_index.ensure_fresh(db.session)
+    return jsonify(query=prefix, **search_index.suggest(prefix, limit))
+
+
+def _collect_realtime_stats():
+    """Agrège les données de la base utilisées par la page de statistiques en temps réel"""
+    from models import ServerStat, UserStat, EngagementData, CommandStat
+    from sqlalchemy import func
+    
     try:
         # Statistiques générales tirées de la base de données
         total_users = db.session.query(func.count(func.distinct(UserStat.user_id))).scalar() or 0
@@ -775,6 +1225,11 @@ def realtime_stats():
             PlaylistEntry.played_at.isnot(None)
         ).scalar() or 0
         
+        # Membres actifs distincts sur 7 jours, tous serveurs confondus (esquisses HyperLogLog)
+        from analytics_store import unique_members
+        unique_members_week = unique_members(
+            db.session, datetime.datetime.utcnow() - datetime.timedelta(days=7))
+        
         # Données d'engagement sur 30 jours
         thirty_days_ago = datetime.datetime.now() - datetime.timedelta(days=30)
         engagement_data = db.session.query(EngagementData).filter(
@@ -861,7 +1316,7 @@ def realtime_stats():
                     avg = sum(counts) / len(counts)
                     hourly_data.append((hour, avg))
         except Exception as e:
-            app.logger.error(f"Erreur lors de l'analyse des données horaires: {e}")
+            current_app.logger.error(f"Erreur lors de l'analyse des données horaires: {e}")
         
         hourly_activity = [0] * 24  # Initialiser pour les 24 heures
         
@@ -950,38 +1405,15 @@ def realtime_stats():
         avg_commands_per_server = round(avg_commands_per_server, 1)
         avg_response_time = round(avg_response_time, 1)
         
-        # Données pour les nouveaux utilisateurs par jour
-        user_join_data = []
-        
-        # Récupérer les données de jointure des 30 derniers jours
-        thirty_days_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-        join_dates = []
-        join_counts = []
-        
-        # Agréger par date
-        last_30_days = [(datetime.datetime.now() - datetime.timedelta(days=i)).strftime('%d/%m') for i in range(30)]
-        last_30_days.reverse()  # Ordre chronologique
-        
-        # Compter les nouveaux membres par jour (simulé pour le moment)
-        new_users_counts = []
-        for _ in range(len(last_30_days)):
-            new_users_counts.append(random.randint(1, 20))
-        
-        new_users_labels = json.dumps(last_30_days)
-        new_users_data = json.dumps(new_users_counts)
+        # Nouveaux membres par jour sur 30 jours et rétention des cohortes hebdomadaires (table member_events)
+        import retention
+        daily_joins = retention.daily_joins(db.session, days=30)
+        new_users_labels = json.dumps([day.strftime('%d/%m') for day, _ in daily_joins])
+        new_users_data = json.dumps([count for _, count in daily_joins])
         
-        # Données pour le taux de rétention hebdomadaire
-        retention_labels = ['Semaine 1', 'Semaine 2', 'Semaine 3', 'Semaine 4']
-        
-        # Simuler des taux de rétention décroissants
-        initial_rate = min(100, 50 + engagement_rate)
-        retention_data = [
-            initial_rate,
-            initial_rate * 0.8,
-            initial_rate * 0.7,
-            initial_rate * 0.65
-        ]
-        retention_data = [round(rate, 1) for rate in retention_data]
+        # Part des arrivants encore présents 1 à 4 semaines après leur semaine d'arrivée (None: pas encore mesurable)
+        retention_data = retention.cohort_retention(db.session)['curve']
+        retention_labels = [f'Semaine {week}' for week in range(1, len(retention_data) + 1)]
         
         # Localisation des serveurs (simulée)
         map_locations = [
@@ -995,12 +1427,13 @@ def realtime_stats():
         map_data = json.dumps(map_locations)
         
     except Exception as e:
-        app.logger.error(f"Erreur lors de la récupération des données de statistiques: {e}")
+        current_app.logger.error(f"Erreur lors de la récupération des données de statistiques: {e}")
         # Utiliser des valeurs par défaut en cas d'erreur
         total_users = 347
         total_servers = 10
         commands_today = 132
         total_songs = 853
+        unique_members_week = None
         
         user_growth_labels = json.dumps([f"{i}" for i in range(1, 31)])
         user_growth_data = json.dumps([300 + i for i in range(30)])
@@ -1032,8 +1465,8 @@ def realtime_stats():
         new_users_labels = json.dumps(['01/04', '05/04', '10/04', '15/04', '20/04', '25/04', '30/04'])
         new_users_data = json.dumps([5, 8, 12, 7, 9, 15, 10])
         
-        retention_labels = json.dumps(['Semaine 1', 'Semaine 2', 'Semaine 3', 'Semaine 4'])
-        retention_data = json.dumps([100, 75, 65, 60])
+        retention_labels = ['Semaine 1', 'Semaine 2', 'Semaine 3', 'Semaine 4']
+        retention_data = [None, None, None, None]
         
         map_data = json.dumps([
             {'lat': 48.8566, 'lng': 2.3522, 'count': 5, 'location': 'Paris, France'},
@@ -1041,35 +1474,67 @@ def realtime_stats():
             {'lat': 40.7128, 'lng': -74.0060, 'count': 7, 'location': 'New York, USA'}
         ])
     
-    return render_template('realtime_stats.html',
-                          active_page='stats',
-                          last_update=last_update,
-                          uptime=uptime,
-                          ping=avg_response_time,  # Utiliser le temps de réponse moyen comme ping
-                          cpu_usage=cpu_usage,
-                          ram_usage=ram_usage,
-                          version=version,
-                          total_users=total_users,
-                          total_servers=total_servers,
-                          commands_today=commands_today,
-                          total_songs=total_songs,
-                          user_growth_labels=user_growth_labels,
-                          user_growth_data=user_growth_data,
-                          command_category_labels=command_category_labels,
-                          command_category_data=command_category_data,
-                          hourly_activity_labels=hourly_activity_labels,
-                          hourly_activity_data=hourly_activity_data,
-                          servers=servers,
-                          activities=activities,
-                          engagement_rate=engagement_rate,
-                          response_rate=response_rate,
-                          avg_commands_per_server=avg_commands_per_server,
-                          avg_response_time=avg_response_time,
-                          map_data=map_data,
-                          new_users_labels=new_users_labels,
-                          new_users_data=new_users_data,
-                          retention_labels=json.dumps(retention_labels),
-                          retention_data=json.dumps(retention_data))
+    return {
+        'computed_at': datetime.datetime.now().timestamp(),
+        'total_users': total_users,
+        'total_servers': total_servers,
+        'commands_today': commands_today,
+        'total_songs': total_songs,
+        'unique_members_week': unique_members_week,
+        'user_growth_labels': user_growth_labels,
+        'user_growth_data': user_growth_data,
+        'command_category_labels': command_category_labels,
+        'command_category_data': command_category_data,
+        'hourly_activity_labels': hourly_activity_labels,
+        'hourly_activity_data': hourly_activity_data,
+        'servers': servers,
+        'activities': activities,
+        'engagement_rate': engagement_rate,
+        'response_rate': response_rate,
+        'avg_commands_per_server': avg_commands_per_server,
+        'avg_response_time': avg_response_time,
+        'map_data': map_data,
+        'new_users_labels': new_users_labels,
+        'new_users_data': new_users_data,
+        'retention_labels': json.dumps(retention_labels),
+        'retention_data': json.dumps(retention_data)
+    }
+
+
+
+# Date donnée aux lignes sans date de tri (antérieures au passage de ces colonnes en
+# NOT NULL): la plus ancienne, là où la pagination les classait jusqu'ici
+UNDATED = datetime.datetime(1970, 1, 1)
+
+
+def _sort_key_fills():
+    """Colonnes de tri des listes paginées devenues NOT NULL, et valeur des lignes restées à NULL"""
+    from sqlalchemy import func
+    return [
+        (models.Resource.added_at, UNDATED),
+        (models.MusicSample.added_at, UNDATED),
+        (models.Collaboration.updated_at, func.coalesce(models.Collaboration.created_at, UNDATED)),
+        (models.ContactMessage.created_at, UNDATED),
+        (models.ContactMessage.priority, 0),
+    ]
+
+
+def fill_sort_keys(conn):
+    """
+    Remplit les clés de tri NULL des tables créées avant qu'elles soient NOT NULL
+    (create_all ne modifie pas une table existante), puis pose la contrainte sous
+    PostgreSQL. SQLite ne sait pas l'ajouter: le modèle l'impose aux insertions.
+    """
+    from sqlalchemy import inspect, text, update
+    inspector = inspect(conn)
+    for column, value in _sort_key_fills():
+        table = column.table
+        conn.execute(update(table).where(column.is_(None)).values({column.name: value}))
+        if conn.dialect.name != 'postgresql':
+            continue
+        existing = {info['name']: info for info in inspector.get_columns(table.name)}
+        if existing[column.name]['nullable']:
+            conn.execute(text(f'ALTER TABLE {table.name} ALTER COLUMN {column.name} SET NOT NULL'))
 
 
 # Initialisation de la base de données et création d'un admin par défaut si nécessaire
@@ -1078,6 +1543,17 @@ def initialize_db():
     # Créer les tables
     db.create_all()
     
+    # Créer les index ajoutés depuis la création des tables existantes
+    from sqlalchemy.schema import CreateIndex
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        fill_sort_keys(conn)
+    
+    # Resynchroniser les compteurs maintenus avec les données
+    sync_unread_counter()
+    
     # Vérifier s'il existe déjà un administrateur
     admin_exists = db.session.query(models.Admin).first() is not None
     
@@ -1092,10 +1568,124 @@ def initialize_db():
         db.session.add(admin)
         db.session.commit()
 
-# Exécuter l'initialisation de la base de données lors du chargement de l'application
-with app.app_context():
-    import models
-    initialize_db()
+def _default_config():
+    """Configuration par défaut, lue depuis l'environnement"""
+    return {
+        'SECRET_KEY': os.environ.get("SESSION_SECRET", "dev_secret_key"),
+        # configure the database, relative to the app instance folder
+        'SQLALCHEMY_DATABASE_URI': os.environ.get("DATABASE_URL", "sqlite:///lebot.db"),
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            "pool_recycle": 300,
+            "pool_pre_ping": True,
+        },
+        # Avec RATE_LIMIT_STORAGE_URL (redis://...), les compteurs de limitation
+        # de débit sont partagés entre workers.
+        'RATE_LIMIT_STORAGE_URL': os.environ.get("RATE_LIMIT_STORAGE_URL"),
+        # Nombre de reverse proxies de confiance devant l'application: l'adresse
+        # du client (limitation de débit, journaux) est alors lue dans X-Forwarded-For.
+        # 0 = connexion directe, l'en-tête est ignoré.
+        'TRUSTED_PROXIES': int(os.environ.get("TRUSTED_PROXIES", 0)),
+        # Créer les tables, index et compte admin au démarrage
+        'INITIALIZE_DB': True,
+    }
+
+
+def create_app(config=None):
+    """
+    Crée et configure l'application web.
+    
+    Args:
+        config: Dictionnaire ou objet de configuration complétant (ou remplaçant)
+            la configuration par défaut
+    
+    Returns:
+        L'application Flask prête à servir
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(_default_config())
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+    
+    # Adresse réelle du client derrière nginx/un load balancer
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+    
+    # initialize the app with the extension, flask-sqlalchemy >= 3.0.x
+    db.init_app(app)
+    login_manager.init_app(app)
+    
+    # Mesure des requêtes (durée, temps en base, rendu, taille) et route /metrics
+    web_metrics.init_app(app)
+    
+    # Cache des pages publiques et des fragments de templates
+    page_cache.init_app(app)
+    
+    # Fichiers statiques empreintés et précompressés (générés par static_assets.py)
+    static_assets.init_app(app)
+    
+    # Limitation de débit par IP des formulaires coûteux (contact, connexion admin)
+    rate_limiter.init_app(app)
+    
+    # Métriques en direct publiées par le bot (fichier mappé en mémoire)
+    live_metrics.init_app(app)
+    
+    # Index mémoire de l'autocomplétion (ressources et samples)
+    search_index.init_app(app)
+    
+    web.init_app(app)
+    
+    if app.config['INITIALIZE_DB']:
+        with app.app_context():
+            initialize_db()
+            # Ne pas transmettre de connexions ouvertes aux workers forkés (gunicorn --preload):
+            # chacun ouvrira les siennes à sa première requête.
+            db.engine.dispose()
+    
+    return app
+
+
+def warm_up(app):
+    """
+    Charge à l'avance ce que chaque worker chargerait sinon à sa première requête
+    (modules importés dans les vues, templates compilés). Appelée dans le processus
+    maître de gunicorn avec --preload, ces pages mémoire sont partagées par les workers.
+    """
+    import psutil
+    import email_validator  # noqa: F401
+    
+    psutil.cpu_percent(interval=None)
+    for name in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        app.jinja_env.get_template(name)
+    
+    with app.app_context():
+        try:
+            search_index.build(db.session)
+        except Exception as e:
+            # L'index sera construit à la première recherche
+            app.logger.warning(f"Index de recherche non construit au démarrage: {e}")
+        db.session.remove()
+        db.engine.dispose()
+
+
+def serve(port=None, debug=True):
+    """Lance le serveur de développement Flask (scripts de lancement locaux)"""
+    port = port or int(os.environ.get('PORT', 8080))
+    print(f"Démarrage de l'application web sur http://0.0.0.0:{port}")
+    create_app().run(host='0.0.0.0', port=port, debug=debug)
+
+
+def __getattr__(name):
+    """
+    Compatibilité avec `gunicorn app:app` et `from app import app`: l'application
+    par défaut n'est créée qu'au premier accès à `app.app`.
+    """
+    if name == 'app':
+        application = globals()['app'] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    serve(port=5000)
@@ -0,0 +1,208 @@
+"""
+Mode de service ASGI de l'application web LeSéminaire[BOT].
+
+    uvicorn asgi:app --http asgi:H11NoDelayProtocol --host 0.0.0.0 --port 8080 --workers 2
+
+L'application Flask (synchrone) est enveloppée par asgiref.WsgiToAsgi: ses vues
+s'exécutent dans un pool de threads (ASGI_WSGI_THREADS, 32 par défaut). Les routes suivantes sont
+servies nativement, sans occuper de thread pendant leurs attentes:
+
+- /api/stats/live/stream: flux SSE des métriques en direct du bot; un visiteur
+  connecté ne coûte qu'une coroutine endormie entre deux envois, là où un
+  worker gunicorn synchrone resterait bloqué pendant toute la connexion;
+- /api/stats/summary: résumés de la page /stats; la lecture en base est attendue
+  (exécutée dans un petit pool dédié à la base) pendant que la boucle continue
+  de servir les autres connexions.
+
+Dépendances: `pip install .[asgi]` (asgiref, uvicorn).
+"""
+import os
+import json
+import socket
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import asgiref
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from uvicorn.protocols.http.h11_impl import H11Protocol
+
+from app import create_app, db, warm_up
+from live_metrics import live_metrics, public_view as live_metrics_view
+import stats_rollup
+
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux envois du flux SSE (secondes)
+STREAM_INTERVAL = 1.0
+
+# Nombre de lectures en base exécutées simultanément par les routes natives
+DB_THREADS = 4
+
+# Versions d'asgiref sur lesquelles PooledWsgiToAsgi a été vérifié
+ASGIREF_TESTED = ">=3.8.1,<3.13"
+
+# Threads exécutant les vues Flask (requêtes synchrones traitées en parallèle)
+WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 32))
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """
+    WsgiToAsgi dont les appels WSGI sont répartis sur un pool de threads. Par
+    défaut asgiref les exécute en mode « thread sensitive », c'est-à-dire tous
+    dans un même thread: les requêtes Flask seraient alors traitées une à une.
+
+    asgiref ne permet pas de choisir ce pool: on réenveloppe la fonction
+    synchrone que son décorateur @sync_to_async garde dans `.func`. Ce détail
+    interne est vérifié sur les versions de ASGIREF_TESTED (voir pyproject.toml);
+    s'il change, on revient au comportement d'origine avec un avertissement
+    plutôt que de servir des réponses incorrectes.
+    """
+
+    def __init__(self, wsgi_application, threads=WSGI_THREADS):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-wsgi')
+        # duplicate_header_limit n'existe qu'à partir d'asgiref 3.12
+        self._instance_args = ((self.duplicate_header_limit,)
+                               if hasattr(self, 'duplicate_header_limit') else ())
+        self._instance_class = None
+
+        run_wsgi_app = getattr(WsgiToAsgiInstance.__dict__.get('run_wsgi_app'), 'func', None)
+        if not callable(run_wsgi_app):
+            logger.warning(f"asgiref {asgiref.__version__} non pris en charge (versions testées: "
+                           f"{ASGIREF_TESTED}): les vues Flask seront exécutées dans un seul thread")
+            return
+
+        class Instance(WsgiToAsgiInstance):
+            pass
+
+        Instance.run_wsgi_app = sync_to_async(run_wsgi_app, thread_sensitive=False, executor=self.executor)
+        self._instance_class = Instance
+
+    async def __call__(self, scope, receive, send):
+        if self._instance_class is None:
+            await super().__call__(scope, receive, send)
+            return
+        await self._instance_class(self.wsgi_application, *self._instance_args)(scope, receive, send)
+
+
+class H11NoDelayProtocol(H11Protocol):
+    """
+    Protocole HTTP d'uvicorn qui désactive l'algorithme de Nagle. Avec --workers,
+    le socket partagé entre processus perd TCP_NODELAY: chaque réponse (en-têtes
+    puis corps, écrits séparément) attendait alors ~40 ms l'accusé de réception
+    retardé du client.
+    """
+
+    def connection_made(self, transport):
+        sock = transport.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().connection_made(transport)
+
+
+class AsgiApp:
+    """Application ASGI: routes natives asynchrones, le reste délégué à Flask."""
+
+    def __init__(self, flask_app, db_threads=DB_THREADS):
+        self.flask_app = flask_app
+        self.wsgi = PooledWsgiToAsgi(flask_app)
+        self.db_executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix='asgi-db')
+        self.routes = {
+            '/api/stats/live/stream': self.live_stream,
+            '/api/stats/summary': self.stats_summary,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            handler = self.routes.get(scope['path'])
+            if handler is not None:
+                await handler(scope, receive, send)
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.db_executor.shutdown(wait=False)
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _with_session(self, fn):
+        with self.flask_app.app_context():
+            return fn(db.session)
+
+    async def run_db(self, fn):
+        """Exécute `fn(session)` dans le pool dédié à la base et attend son résultat."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db_executor, self._with_session, fn)
+
+    @staticmethod
+    async def _send_json(send, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def stats_summary(self, scope, receive, send):
+        """Résumés précalculés de la page /stats, au format JSON."""
+        summaries, computed_at = await self.run_db(stats_rollup.load_summaries)
+        await self._send_json(send, {
+            'computed_at': computed_at.isoformat() if computed_at else None,
+            'metrics': {metric: [{'label': label, 'value': value, 'extra': extra}
+                                 for label, value, extra in rows]
+                        for metric, rows in summaries.items()},
+        })
+
+    async def live_stream(self, scope, receive, send):
+        """Flux SSE des métriques en direct du bot, jusqu'à la déconnexion du client."""
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        try:
+            while not disconnected.is_set():
+                # Lecture de la projection mémoire: quelques microsecondes, sans E/S
+                payload = json.dumps(live_metrics_view(live_metrics.snapshot()))
+                await send({'type': 'http.response.body', 'body': f"data: {payload}\n\n".encode(),
+                            'more_body': True})
+                try:
+                    await asyncio.wait_for(disconnected.wait(), STREAM_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except OSError:
+            pass  # Connexion fermée pendant un envoi
+        finally:
+            watcher.cancel()
+
+
+def create_asgi_app(config=None):
+    """
+    Crée l'application ASGI. Les pages savent alors qu'un flux SSE est disponible
+    (LIVE_STREAM_URL) et l'utilisent au lieu d'interroger l'API périodiquement.
+    """
+    flask_app = create_app(dict({'LIVE_STREAM_URL': '/api/stats/live/stream'}, **(config or {})))
+    warm_up(flask_app)
+    return AsgiApp(flask_app)
+
+
+app = create_asgi_app()
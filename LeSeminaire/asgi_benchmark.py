@@ -0,0 +1,204 @@
+"""
+Banc d'essai de capacité: gunicorn synchrone (gunicorn.conf.py) contre le mode
+ASGI (uvicorn asgi:app), avec le même nombre de workers et la même base remplie.
+
+Deux mesures par serveur:
+
+- débit et latences sous N clients simultanés (boucle fermée sur /, /stats et
+  /api/stats/live);
+- réactivité quand N connexions restent ouvertes (clients lents ou inactifs,
+  et flux SSE en mode ASGI): latence et échecs d'une requête sonde.
+
+    python asgi_benchmark.py --workers 2 --concurrency 10,50,200 --held 10,100,500
+
+Dépendances: aiohttp (installé avec discord.py), gunicorn et `pip install .[asgi]`.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+
+import aiohttp
+
+from load_test import create_seeded_app, percentile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CLOSED_LOOP_PATHS = ['/', '/stats', '/api/stats/live']
+PROBE_PATH = '/api/stats/live'
+STREAM_PATH = '/api/stats/live/stream'
+PROBE_TIMEOUT = 5.0
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, workers, database_url):
+    """Démarre `kind` ('gunicorn' ou 'uvicorn') dans son propre groupe de processus."""
+    if kind == 'gunicorn':
+        command = ['gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}', '-w', str(workers)]
+    else:
+        command = ['uvicorn', 'asgi:app', '--http', 'asgi:H11NoDelayProtocol', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--log-level', 'warning']
+    env = dict(os.environ, DATABASE_URL=database_url)
+    return subprocess.Popen(command, cwd=BASE_DIR, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def wait_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(base_url + PROBE_PATH) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Serveur injoignable: {base_url}")
+
+
+async def closed_loop(base_url, concurrency, duration):
+    """`concurrency` clients enchaînant les requêtes pendant `duration` secondes."""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def client(index):
+            nonlocal errors
+            position = index
+            while time.perf_counter() < deadline:
+                path = CLOSED_LOOP_PATHS[position % len(CLOSED_LOOP_PATHS)]
+                position += 1
+                began = time.perf_counter()
+                try:
+                    async with session.get(base_url + path) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                            continue
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - began) * 1000)
+
+        await asyncio.gather(*(client(i) for i in range(concurrency)))
+
+    latencies.sort()
+    return {
+        'rps': round(len(latencies) / duration, 1),
+        'p50': round(percentile(latencies, 0.50), 1),
+        'p99': round(percentile(latencies, 0.99), 1),
+        'errors': errors,
+    }
+
+
+async def held_connections(host, port, count, mode, probes=5):
+    """
+    Garde `count` connexions ouvertes ('idle': requête jamais terminée, comme un
+    client lent; 'sse': flux SSE en cours), puis mesure une requête sonde.
+    """
+    writers = []
+    try:
+        for _ in range(count):
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), PROBE_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                break
+            if mode == 'sse':
+                writer.write(f"GET {STREAM_PATH} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            else:
+                writer.write(f"GET / HTTP/1.1\r\nHost: {host}\r\n".encode())
+            writers.append(writer)
+        await asyncio.sleep(0.5)
+
+        latencies, failures = [], 0
+        timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            for _ in range(probes):
+                began = time.perf_counter()
+                try:
+                    async with session.get(f"http://{host}:{port}{PROBE_PATH}") as response:
+                        await response.read()
+                    latencies.append((time.perf_counter() - began) * 1000)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    failures += 1
+        return {
+            'opened': len(writers),
+            'probe_ms': round(statistics.median(latencies), 1) if latencies else None,
+            'failures': failures,
+        }
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+async def benchmark(kind, base_url, port, concurrencies, held_counts, duration):
+    await wait_ready(base_url)
+    rows = []
+    for concurrency in concurrencies:
+        rows.append((kind, f"{concurrency} clients", await closed_loop(base_url, concurrency, duration)))
+    modes = ['idle', 'sse'] if kind == 'uvicorn' else ['idle']
+    for mode in modes:
+        for count in held_counts:
+            rows.append((kind, f"{count} connexions {mode}", await held_connections('127.0.0.1', port, count, mode)))
+            await asyncio.sleep(1)  # Laisser le serveur fermer les connexions
+    return rows
+
+
+def format_row(kind, scenario, result):
+    details = ", ".join(f"{key}={value}" for key, value in result.items())
+    return f"{kind:<10}{scenario:<26}{details}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capacité gunicorn synchrone contre ASGI")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', default='10,50,200', help="Nombres de clients simultanés")
+    parser.add_argument('--held', default='10,100,500', help="Nombres de connexions maintenues ouvertes")
+    parser.add_argument('--duration', type=float, default=5.0, help="Durée de chaque mesure de débit")
+    parser.add_argument('--servers', default='gunicorn,uvicorn')
+    args = parser.parse_args(argv)
+
+    concurrencies = [int(value) for value in args.concurrency.split(',') if value]
+    held_counts = [int(value) for value in args.held.split(',') if value]
+    _, database_url = create_seeded_app(1)
+    print(f"Base de test: {database_url}", file=sys.stderr)
+
+    try:
+        for kind in args.servers.split(','):
+            port = _free_port()
+            process = start_server(kind, port, args.workers, database_url)
+            try:
+                rows = asyncio.run(benchmark(kind, f"http://127.0.0.1:{port}", port,
+                                             concurrencies, held_counts, args.duration))
+            finally:
+                stop_server(process)
+            for row in rows:
+                print(format_row(*row))
+    finally:
+        os.remove(database_url[len('sqlite:///'):])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,7 @@ from discord.ext import commands
 from dotenv import load_dotenv
 from help_command import HelpCommand
 from database import db_manager
+from command_docs import export_command_docs
 
 # Configurer le logging
 logging.basicConfig(
@@ -26,11 +27,6 @@ logger = logging.getLogger('le_seminaire_bot')
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-# Vérifier si le token est disponible
-if not TOKEN:
-    logger.error("Token Discord non trouvé. Veuillez définir DISCORD_TOKEN dans le fichier .env")
-    exit(1)
-
 # Configuration des intents Discord (autorisations nécessaires)
 intents = discord.Intents.default()
 intents.members = True
@@ -54,7 +50,9 @@ INITIAL_EXTENSIONS = [
     'cogs.security',   # Module anti-spam et protection contre les raids
     'cogs.shield',     # Module bouclier (protection DDos, anti-bot, etc.)
     'cogs.messenger',  # Module de messagerie directe (annonces, bienvenue, événements)
-    'cogs.analytics'   # Module d'analytique et visualisation d'engagement
+    'cogs.analytics',  # Module d'analytique et visualisation d'engagement
+    'cogs.live_stats', # Métriques en direct partagées avec le site web
+    'cogs.bridge'      # Exécution des tâches soumises par le panneau d'administration
 ]
 
 # Événement: Le bot est prêt et connecté
@@ -102,6 +100,11 @@ async def load_extensions():
 # Démarrage du bot
 async def main():
     """Fonction principale pour démarrer le bot"""
+    # Vérifier si le token est disponible
+    if not TOKEN:
+        logger.error("Token Discord non trouvé. Veuillez définir DISCORD_TOKEN dans le fichier .env")
+        exit(1)
+    
     # Initialiser la base de données
     logger.info("Initialisation de la base de données...")
     
@@ -109,6 +112,9 @@ async def main():
     logger.info("Chargement des modules...")
     await load_extensions()
     
+    # Exporter la documentation des commandes (site web et !help)
+    export_command_docs(bot)
+    
     # Connexion au Discord
     logger.info("Connexion à Discord...")
     await bot.start(TOKEN)
@@ -11,26 +11,60 @@ import logging
 import json
 import typing
 import os
-from collections import defaultdict, Counter
+import io
+import math
+import analytics_charts
+from anomaly_detector import AnomalyDetector, WINDOW_SECONDS
+from analytics_journal import AnalyticsJournal, FLUSH_INTERVAL
+from analytics_store import AnalyticsStore, clock, day_index, save_sketches, top_items, unique_members
+from voice_sessions import VoiceSessionTracker, load_sessions, save_sessions
+import retention
+from web_metrics import DEFAULT_DIR as METRICS_DIR, Registry, remove_snapshot, snapshot_path, write_snapshot
 
 # Configuration du logger
 logger = logging.getLogger('le_seminaire.analytics')
 
+# Catégorie (page /stats) des commandes de chaque cog; 'general' par défaut
+COMMAND_CATEGORIES = {
+    "MusicCog": "music",
+    "ModerationCog": "moderation",
+    "Security": "moderation",
+    "Shield": "moderation",
+    "ResourceCog": "resources",
+}
+
+# Nombre maximal d'utilisations de commandes en attente d'écriture en base
+MAX_PENDING_COMMAND_EVENTS = 10000
+
+# Arrivées et départs de membres en attente d'écriture (table member_events)
+MEMBER_EVENTS_INTERVAL = 30  # secondes entre deux écritures groupées
+MAX_PENDING_MEMBER_EVENTS = 10000
+
+# Sauvegarde horaire à chaque heure pile (UTC): une ligne ServerStat porte
+# l'heure qui vient de s'écouler (voir anomaly_replay.load_hours)
+SAVE_TIMES = [datetime.time(hour=hour) for hour in range(24)]
+
 class ServerAnalytics(commands.Cog):
     """Système d'analytique et de visualisation pour LeSéminaire[BOT]."""
 
     def __init__(self, bot):
         self.bot = bot
-        self.activity_data = defaultdict(lambda: defaultdict(int))
-        self.message_activity = defaultdict(int)
-        self.voice_activity = defaultdict(int)
-        self.reaction_activity = defaultdict(int)
-        self.emoji_usage = Counter()
-        self.user_join_data = []
-        self.user_leave_data = []
-        self.active_hour_data = defaultdict(int)
-        self.active_day_data = defaultdict(int)
-        self.channel_activity = defaultdict(int)
+        # Journal local des événements pas encore enregistrés en base (rejoué au démarrage)
+        try:
+            self.journal = AnalyticsJournal()
+        except OSError as e:
+            logger.error(f"Journal d'analytique indisponible: {e}")
+            self.journal = None
+        # Détection des variations anormales de messages et d'arrivées, métriques déposées pour /metrics
+        self.metrics = Registry()
+        self.metrics_path = snapshot_path(os.environ.get('METRICS_DIR', METRICS_DIR))
+        self.detector = AnomalyDetector(registry=self.metrics)
+        self.store = AnalyticsStore(journal=self.journal, detector=self.detector)  # Compteurs d'activité, un jeu par serveur
+        self.voice_sessions = VoiceSessionTracker()  # Membres actuellement en vocal
+        self.command_events = []  # Utilisations de commandes à écrire au prochain rollup
+        self.member_events = []  # Arrivées et départs à écrire au prochain passage de member_events_task
+        self.charts = analytics_charts.ChartCache()  # Graphiques PNG des commandes, rendus hors de la boucle
+        self.started_at = datetime.datetime.utcnow()
         
         # Accès à la base de données via database.py
         from database import DatabaseManager
@@ -40,9 +74,17 @@ class ServerAnalytics(commands.Cog):
         self.save_analytics_task.start()
         self.weekly_report_task.start()
         self.daily_analytics_cleanup.start()
+        self.stats_rollup_task.start()
+        self.voice_accrual_task.start()
+        self.member_events_task.start()
+        self.anomaly_task.start()
+        if self.journal is not None:
+            self.journal_flush_task.start()
         
         # Charger les données existantes
         self._load_analytics_data()
+        self._replay_journal()
+        self._load_voice_sessions()
     
     def _load_analytics_data(self):
         """Charge les données d'analytique depuis la base de données."""
@@ -53,38 +95,19 @@ class ServerAnalytics(commands.Cog):
             # Récupérer les statistiques des 30 derniers jours
             thirty_days_ago = datetime.datetime.utcnow() - datetime.timedelta(days=30)
             recent_stats = session.query(ServerStat).filter(
-                ServerStat.timestamp >= thirty_days_ago
+                ServerStat.timestamp >= thirty_days_ago,
+                ServerStat.type == 'hourly'
             ).order_by(ServerStat.timestamp.desc()).all()
             
-            if recent_stats:
-                # Traiter les statistiques pour initialiser les données d'analytics
-                for stat in recent_stats:
-                    try:
-                        data = json.loads(stat.data) if stat.data else {}
-                        
-                        # Date de la statistique (pour regrouper par jour)
-                        stat_date = stat.timestamp.strftime('%Y-%m-%d')
-                        
-                        # Activité du jour
-                        if 'message_count' in data:
-                            self.activity_data[stat_date]['messages'] += data['message_count']
-                        
-                        if 'voice_minutes' in data:
-                            self.activity_data[stat_date]['voice'] += data['voice_minutes']
-                        
-                        if 'reaction_count' in data:
-                            self.activity_data[stat_date]['reactions'] += data['reaction_count']
-                        
-                        # Heures actives
-                        hour = stat.timestamp.hour
-                        self.active_hour_data[hour] += data.get('message_count', 0)
-                        
-                        # Jours actifs
-                        weekday = stat.timestamp.weekday()
-                        self.active_day_data[weekday] += data.get('message_count', 0)
-                        
-                    except Exception as e:
-                        logger.error(f"Erreur lors du traitement des statistiques: {e}")
+            # Chaque sauvegarde est reprise dans les compteurs de son serveur
+            for stat in recent_stats:
+                if not stat.guild_id or not stat.guild_id.isdigit():
+                    continue
+                try:
+                    data = json.loads(stat.data) if stat.data else {}
+                    self.store.shard(int(stat.guild_id)).load_stat(stat.timestamp, data)
+                except Exception as e:
+                    logger.error(f"Erreur lors du traitement des statistiques: {e}")
             
             logger.info(f"Données d'analytique chargées: {len(recent_stats)} entrées")
         except Exception as e:
@@ -93,58 +116,283 @@ class ServerAnalytics(commands.Cog):
             if 'session' in locals():
                 session.close()
     
+    def _replay_journal(self):
+        """Reprend les événements journalisés depuis la dernière sauvegarde (arrêt sans sauvegarde)."""
+        if self.journal is None:
+            return
+        try:
+            replayed = self.store.replay(self.journal.replay())
+            if replayed:
+                logger.info(f"Journal d'analytique: {replayed} événement(s) rejoué(s)")
+        except Exception as e:
+            logger.error(f"Erreur lors de la reprise du journal d'analytique: {e}")
+    
+    def _load_voice_sessions(self):
+        """Charge les sessions vocales enregistrées (confrontées aux états vocaux une fois le bot prêt)."""
+        try:
+            session = self.db.get_session()
+            load_sessions(session, self.voice_sessions)
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des sessions vocales: {e}")
+        finally:
+            if 'session' in locals():
+                session.close()
+    
     def cog_unload(self):
-        """Nettoyage lors du déchargement du cog."""
+        """Nettoyage lors du déchargement du cog: dernière sauvegarde des compteurs."""
         self.save_analytics_task.cancel()
         self.weekly_report_task.cancel()
         self.daily_analytics_cleanup.cancel()
+        self.stats_rollup_task.cancel()
+        self.voice_accrual_task.cancel()
+        self.journal_flush_task.cancel()
+        self.member_events_task.cancel()
+        self.anomaly_task.cancel()
+        try:
+            self._accrue_voice()
+            self._save_analytics()
+            try:
+                self._write_voice_sessions(self.voice_sessions.changes())
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enregistrement des sessions vocales: {e}")
+            try:
+                self._write_member_events(self.member_events)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enregistrement des arrivées et départs: {e}")
+        finally:
+            self.charts.close()
+            remove_snapshot(self.metrics_path)
+            if self.journal is not None:
+                # Si la sauvegarde a échoué, le journal garde les événements pour le prochain démarrage
+                self.journal.close()
     
-    @tasks.loop(hours=1)
-    async def save_analytics_task(self):
-        """Sauvegarde les données d'analytique dans la base de données."""
+    def _member_name(self, guild_id, user_id):
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(user_id) if guild else None
+        return member.display_name if member else None
+    
+    def _save_analytics(self):
+        """
+        Enregistre les compteurs horaires de chaque serveur. Compteurs et journal ne
+        sont vidés qu'une fois l'écriture validée: en cas d'échec, la sauvegarde
+        suivante reprend aussi cette heure.
+        """
         try:
-            from models import ServerStat
-            
-            # Créer un snapshot des données actuelles
-            now = datetime.datetime.utcnow()
-            data = {
-                'message_count': sum(self.message_activity.values()),
-                'voice_minutes': sum(self.voice_activity.values()),
-                'reaction_count': sum(self.reaction_activity.values()),
-                'active_channels': {str(k): v for k, v in self.channel_activity.items() if v > 0},
-                'emoji_usage': {emoji: count for emoji, count in self.emoji_usage.most_common(10)},
-                'active_users': len(self.message_activity)
-            }
+            from sqlalchemy import insert
+            from models import ServerStat, UserStat
             
-            # Réinitialiser les compteurs temporaires
-            self.message_activity = defaultdict(int)
-            self.voice_activity = defaultdict(int)
-            self.reaction_activity = defaultdict(int)
-            self.channel_activity = defaultdict(int)
-            self.emoji_usage = Counter()
-            
-            # Sauvegarder dans la base de données
+            # Relevé des compteurs et segment du journal correspondant, pris ensemble
+            segment = self.journal.rotate() if self.journal is not None else None
+            hourly = self.store.hourly_rows(names=self._member_name)
+            if not hourly.server_rows:
+                return
             session = self.db.get_session()
-            stat = ServerStat(
-                timestamp=now,
-                guild_id=self.bot.guilds[0].id if self.bot.guilds else None,
-                type='hourly',
-                data=json.dumps(data)
-            )
-            session.add(stat)
+            session.execute(insert(ServerStat), hourly.server_rows)
+            if hourly.user_rows:
+                session.execute(insert(UserStat), hourly.user_rows)
+            save_sketches(session, hourly.sketches)
             session.commit()
-            logger.info(f"Données d'analytique sauvegardées: {data}")
+            self.store.clear_hour(hourly)
+            if segment is not None:
+                self.journal.discard(segment)
+            logger.info(f"Données d'analytique sauvegardées pour {len(hourly.server_rows)} serveur(s)")
         except Exception as e:
             logger.error(f"Erreur lors de la sauvegarde des données d'analytique: {e}")
         finally:
             if 'session' in locals():
                 session.close()
     
+    @tasks.loop(time=SAVE_TIMES)
+    async def save_analytics_task(self):
+        """Sauvegarde les données d'analytique dans la base de données."""
+        self._save_analytics()
+    
+    def _accrue_voice(self, accrued=None):
+        """Compte les minutes vocales écoulées de chaque session dans l'heure en cours."""
+        bucket = clock.now()
+        if accrued is None:
+            accrued = self.voice_sessions.accrue(bucket.moment)
+        for voice_session, minutes in accrued:
+            if minutes > 0:
+                self.store.voice(voice_session.guild_id, bucket, voice_session.user_id, minutes)
+    
+    def _write_voice_sessions(self, changes):
+        """Enregistre les sessions vocales modifiées (dans un thread, avec sa propre session)."""
+        if not (changes.upserts or changes.deletes):
+            return
+        session = self.db.Session()
+        try:
+            save_sessions(session, changes)
+            session.commit()
+        finally:
+            session.close()
+    
+    async def _persist_voice_sessions(self):
+        """Écrit hors de la boucle d'événements les sessions vocales modifiées depuis le dernier passage."""
+        changes = self.voice_sessions.changes()
+        try:
+            await self.bot.loop.run_in_executor(None, self._write_voice_sessions, changes)
+        except Exception as e:
+            # Non confirmées, ces lignes seront reprises au passage suivant
+            logger.error(f"Erreur lors de l'enregistrement des sessions vocales: {e}")
+        else:
+            self.voice_sessions.mark_saved(changes)
+    
+    @tasks.loop(minutes=1)
+    async def voice_accrual_task(self):
+        """Décompte périodique des sessions vocales en cours."""
+        self._accrue_voice()
+        await self._persist_voice_sessions()
+    
+    @voice_accrual_task.before_loop
+    async def before_voice_accrual(self):
+        """Une fois le bot prêt, confronte les sessions reprises aux membres réellement en vocal."""
+        await self.bot.wait_until_ready()
+        present = {}
+        for guild in self.bot.guilds:
+            for channel in list(guild.voice_channels) + list(guild.stage_channels):
+                if channel == guild.afk_channel:
+                    continue
+                for user_id in channel.voice_states:
+                    member = guild.get_member(user_id)
+                    if member is not None and member.bot:
+                        continue
+                    present[(guild.id, user_id)] = (channel.id, member.display_name if member else None)
+        bucket = clock.now()
+        self._accrue_voice(self.voice_sessions.reconcile(present, bucket.moment))
+        await self._persist_voice_sessions()
+        logger.info(f"Sessions vocales en cours: {len(self.voice_sessions.sessions)}")
+    
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def journal_flush_task(self):
+        """Écrit sur disque les événements journalisés (hors de la boucle d'événements)."""
+        try:
+            await self.bot.loop.run_in_executor(None, self.journal.flush)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture du journal d'analytique: {e}")
+    
+    def _write_member_events(self, events):
+        """Insère en une fois des arrivées et départs (dans un thread, avec sa propre session)."""
+        if not events:
+            return
+        from sqlalchemy import insert
+        from models import MemberEvent
+        
+        session = self.db.Session()
+        try:
+            session.execute(insert(MemberEvent), events)
+            session.commit()
+        finally:
+            session.close()
+    
+    @tasks.loop(seconds=MEMBER_EVENTS_INTERVAL)
+    async def member_events_task(self):
+        """Écriture groupée des arrivées et départs de membres."""
+        events, self.member_events = self.member_events, []
+        if not events:
+            return
+        try:
+            await self.bot.loop.run_in_executor(None, self._write_member_events, events)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement des arrivées et départs: {e}")
+            # Conserver les événements non écrits pour le prochain passage
+            self.member_events[:0] = events
+            del self.member_events[:-MAX_PENDING_MEMBER_EVENTS]
+    
+    @tasks.loop(seconds=WINDOW_SECONDS)
+    async def anomaly_task(self):
+        """Clôt la fenêtre du détecteur d'anomalies, signale les anomalies et dépose les métriques."""
+        for anomaly in self.detector.close_window():
+            await self._send_anomaly_alert(anomaly)
+        try:
+            await self.bot.loop.run_in_executor(None, write_snapshot, self.metrics, self.metrics_path)
+        except Exception as e:
+            logger.error(f"Erreur lors du dépôt des métriques du bot: {e}")
+    
+    @anomaly_task.before_loop
+    async def before_anomaly(self):
+        """Attendre que le bot soit prêt avant de démarrer la tâche."""
+        await self.bot.wait_until_ready()
+    
+    async def _send_anomaly_alert(self, anomaly):
+        """Signale une anomalie dans le canal de logs du serveur (bot-logs, sinon le canal système)."""
+        guild = self.bot.get_guild(anomaly.guild_id)
+        if guild is None:
+            return
+        minutes = WINDOW_SECONDS // 60
+        if anomaly.metric == 'joins':
+            title = "🚪 Afflux inhabituel de nouveaux membres"
+            unit = "arrivées"
+        elif anomaly.direction == 'spike':
+            title = "📈 Pic d'activité inhabituel"
+            unit = "messages"
+        else:
+            title = "📉 Chute d'activité inhabituelle"
+            unit = "messages"
+        channel = guild.get_channel(anomaly.channel_id) if anomaly.channel_id is not None else None
+        scope = channel.mention if channel else ("tout le serveur" if anomaly.channel_id is None
+                                                 else f"canal {anomaly.channel_id}")
+        logger.warning(f"Anomalie {anomaly.metric}/{anomaly.direction} sur {guild.name} ({scope}): "
+                       f"{anomaly.value} en {minutes} min, ~{anomaly.expected:.1f} attendus, écart {anomaly.score:+.1f}")
+        
+        log_channel = discord.utils.get(guild.text_channels, name="bot-logs") or guild.system_channel
+        if not log_channel:
+            return
+        embed = discord.Embed(
+            title=title,
+            description=f"Portée: {scope}",
+            color=discord.Color.orange() if anomaly.direction == 'spike' else discord.Color.blue()
+        )
+        embed.add_field(name="Observé", value=f"{anomaly.value:,} {unit} en {minutes} min", inline=True)
+        embed.add_field(name="Habituel", value=f"~{anomaly.expected:.1f}", inline=True)
+        embed.add_field(name="Écart", value=f"{anomaly.score:+.1f} σ", inline=True)
+        try:
+            await log_channel.send(embed=embed)
+        except discord.HTTPException as e:
+            logger.warning(f"Alerte d'anomalie non envoyée sur {guild.name}: {e}")
+    
     @save_analytics_task.before_loop
     async def before_save_analytics(self):
+        """Attendre que le bot soit prêt avant de démarrer la tâche (première sauvegarde à l'heure pile suivante)."""
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(minutes=15)
+    async def stats_rollup_task(self):
+        """Enregistre les commandes utilisées et met à jour les résumés de la page /stats."""
+        events, self.command_events = self.command_events, []
+        latency = self.bot.latency
+        extra_totals = {
+            'uptime_seconds': int((datetime.datetime.utcnow() - self.started_at).total_seconds()),
+        }
+        if math.isfinite(latency):
+            extra_totals['ping'] = round(latency * 1000)
+        
+        try:
+            await self.bot.loop.run_in_executor(None, self._run_stats_rollup, events, extra_totals)
+        except Exception as e:
+            logger.error(f"Erreur lors du rollup des statistiques: {e}")
+            # Conserver les utilisations non écrites pour le prochain passage
+            self.command_events[:0] = events
+            del self.command_events[:-MAX_PENDING_COMMAND_EVENTS]
+    
+    def _run_stats_rollup(self, events, extra_totals):
+        """Écrit les utilisations en attente puis exécute le rollup (dans un thread, avec sa propre session)."""
+        from sqlalchemy import insert
+        from models import CommandStat
+        import stats_rollup
+        
+        session = self.db.Session()
+        try:
+            if events:
+                session.execute(insert(CommandStat), events)
+            stats_rollup.run_rollup(session, extra_totals=extra_totals)
+        finally:
+            session.close()
+    
+    @stats_rollup_task.before_loop
+    async def before_stats_rollup(self):
         """Attendre que le bot soit prêt avant de démarrer la tâche."""
         await self.bot.wait_until_ready()
-        await asyncio.sleep(300)  # Attendre 5 minutes après le démarrage pour commencer
     
     @tasks.loop(hours=24)
     async def weekly_report_task(self):
@@ -154,12 +402,11 @@ class ServerAnalytics(commands.Cog):
             return
         
         try:
-            # Trouver le premier administrateur/propriétaire pour envoyer le rapport
+            # Chaque propriétaire reçoit le rapport de son serveur
             for guild in self.bot.guilds:
                 owner = guild.owner
                 if owner:
                     await self._send_weekly_report(owner, guild)
-                    break
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi du rapport hebdomadaire: {e}")
     
@@ -172,7 +419,7 @@ class ServerAnalytics(commands.Cog):
     async def daily_analytics_cleanup(self):
         """Nettoie les anciennes données d'analytique."""
         try:
-            from models import ServerStat
+            from models import ServerStat, ActivitySketch
             
             # Supprimer les données de plus de 90 jours
             ninety_days_ago = datetime.datetime.utcnow() - datetime.timedelta(days=90)
@@ -181,6 +428,9 @@ class ServerAnalytics(commands.Cog):
             old_records = session.query(ServerStat).filter(
                 ServerStat.timestamp < ninety_days_ago
             ).delete()
+            old_records += session.query(ActivitySketch).filter(
+                ActivitySketch.start < ninety_days_ago
+            ).delete()
             
             session.commit()
             logger.info(f"Nettoyage des données d'analytique: {old_records} enregistrements supprimés")
@@ -212,41 +462,35 @@ class ServerAnalytics(commands.Cog):
             color=discord.Color.blue()
         )
         
-        # Calculer les statistiques de la semaine
-        one_week_ago = datetime.datetime.utcnow() - datetime.timedelta(days=7)
-        today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-        week_ago_str = one_week_ago.strftime('%Y-%m-%d')
+        shard = self.store.shard(guild.id)
         
-        # Messages totaux de la semaine
-        total_messages = sum(self.activity_data[date]['messages'] for date in self.activity_data 
-                            if week_ago_str <= date <= today)
-        
-        # Minutes vocales totales de la semaine
-        total_voice = sum(self.activity_data[date]['voice'] for date in self.activity_data 
-                          if week_ago_str <= date <= today)
+        # Calculer les statistiques de la semaine
+        now = datetime.datetime.utcnow()
+        one_week_ago = now - datetime.timedelta(days=7)
         
-        # Réactions totales de la semaine
-        total_reactions = sum(self.activity_data[date]['reactions'] for date in self.activity_data 
-                             if week_ago_str <= date <= today)
+        # Messages, minutes vocales et réactions totaux de la semaine
+        total_messages, total_voice, total_reactions = shard.daily.totals(day_index(one_week_ago), day_index(now))
+        total_voice = round(total_voice)
         
-        # Nouveaux membres
-        new_members = len([data for data in self.user_join_data 
-                          if data.get('timestamp') and data['timestamp'] >= one_week_ago])
+        # Membres actifs distincts sur la semaine
+        active_members = self._unique_members(guild.id, one_week_ago)
         
-        # Membres partis
-        left_members = len([data for data in self.user_leave_data 
-                           if data.get('timestamp') and data['timestamp'] >= one_week_ago])
+        # Nouveaux membres et départs
+        new_members, left_members = self._member_counts(guild.id, one_week_ago)
         
         # Ajouter les champs au rapport
         embed.add_field(name="📝 Messages", value=f"{total_messages:,}", inline=True)
         embed.add_field(name="🎤 Minutes vocales", value=f"{total_voice:,}", inline=True)
         embed.add_field(name="👍 Réactions", value=f"{total_reactions:,}", inline=True)
-        embed.add_field(name="📈 Nouveaux membres", value=f"{new_members:,}", inline=True)
-        embed.add_field(name="📉 Départs", value=f"{left_members:,}", inline=True)
+        if active_members is not None:
+            embed.add_field(name="👤 Membres actifs", value=f"~{active_members:,}", inline=True)
+        if new_members is not None:
+            embed.add_field(name="📈 Nouveaux membres", value=f"{new_members:,}", inline=True)
+            embed.add_field(name="📉 Départs", value=f"{left_members:,}", inline=True)
         
         # Jours les plus actifs
         day_names = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
-        most_active_day = max(self.active_day_data.items(), key=lambda x: x[1], default=(0, 0))
+        most_active_day = max(enumerate(shard.weekday_totals()), key=lambda x: x[1])
         if most_active_day[1] > 0:
             embed.add_field(
                 name="📅 Jour le plus actif",
@@ -255,7 +499,7 @@ class ServerAnalytics(commands.Cog):
             )
         
         # Heures les plus actives
-        most_active_hour = max(self.active_hour_data.items(), key=lambda x: x[1], default=(0, 0))
+        most_active_hour = max(enumerate(shard.hour_totals()), key=lambda x: x[1])
         if most_active_hour[1] > 0:
             embed.add_field(
                 name="⏰ Heure la plus active",
@@ -263,7 +507,7 @@ class ServerAnalytics(commands.Cog):
                 inline=True
             )
         
-        embed.set_footer(text=f"Période: {week_ago_str} - {today}")
+        embed.set_footer(text=f"Période: {one_week_ago.strftime('%Y-%m-%d')} - {now.strftime('%Y-%m-%d')}")
         
         try:
             await user.send(embed=embed)
@@ -273,46 +517,112 @@ class ServerAnalytics(commands.Cog):
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi du rapport hebdomadaire: {e}")
     
+    def _unique_members(self, guild_id, since, channel_id=None):
+        """Membres actifs distincts depuis `since` (base et esquisses en attente), None en cas d'erreur."""
+        try:
+            session = self.db.get_session()
+            pending = self.store.shard(guild_id).pending_users(channel_id)
+            return unique_members(session, since, guild_id=guild_id, channel_id=channel_id, pending=pending)
+        except Exception as e:
+            logger.error(f"Erreur lors du comptage des membres actifs: {e}")
+            return None
+        finally:
+            if 'session' in locals():
+                session.close()
+    
+    def _top_items(self, guild_id, kind, days, limit):
+        """Salons ou emojis les plus utilisés sur `days` jours (base et heure en cours), None en cas d'erreur."""
+        shard = self.store.shard(guild_id)
+        pending = shard.channel_activity if kind == 'channels' else shard.emoji_usage
+        since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+        try:
+            session = self.db.get_session()
+            return top_items(session, guild_id, kind, since, pending=pending, limit=limit)
+        except Exception as e:
+            logger.error(f"Erreur lors du classement des {kind}: {e}")
+            return None
+        finally:
+            if 'session' in locals():
+                session.close()
+    
+    async def _send_chart(self, ctx, embed, key, filename, function, *args):
+        """Envoie `embed` illustré du graphique `function(*args)` (mis en cache par `key`), ou seul si le rendu échoue."""
+        try:
+            png = await self.charts.render(key, function, *args)
+        except Exception as e:
+            logger.error(f"Erreur lors du rendu du graphique {key[1]}: {e}")
+            return await ctx.send(embed=embed)
+        embed.set_image(url=f"attachment://{filename}")
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO(png), filename=filename))
+    
+    def _member_counts(self, guild_id, since):
+        """Arrivées et départs depuis `since` (base et événements en attente), (None, None) en cas d'erreur."""
+        try:
+            session = self.db.get_session()
+            joins, leaves = retention.member_counts(session, since, guild_id)
+        except Exception as e:
+            logger.error(f"Erreur lors du comptage des arrivées et départs: {e}")
+            return None, None
+        finally:
+            if 'session' in locals():
+                session.close()
+        for event in self.member_events:
+            if event['guild_id'] == str(guild_id) and event['occurred_at'] >= since:
+                if event['kind'] == 'join':
+                    joins += 1
+                else:
+                    leaves += 1
+        return joins, leaves
+    
+    def _record_member_event(self, member, kind):
+        self.member_events.append({
+            'guild_id': str(member.guild.id),
+            'user_id': str(member.id),
+            'kind': kind,
+            'occurred_at': datetime.datetime.utcnow(),
+        })
+        if len(self.member_events) > MAX_PENDING_MEMBER_EVENTS:
+            del self.member_events[:-MAX_PENDING_MEMBER_EVENTS]
+    
+    def _record_command(self, ctx, success):
+        if ctx.command is None:
+            return
+        self.command_events.append({
+            'command_name': ctx.command.qualified_name,
+            'category': COMMAND_CATEGORIES.get(ctx.command.cog_name, 'general'),
+            'guild_id': str(ctx.guild.id) if ctx.guild else 'dm',
+            'user_id': str(ctx.author.id),
+            'used_at': datetime.datetime.utcnow(),
+            'success': success,
+        })
+        if len(self.command_events) > MAX_PENDING_COMMAND_EVENTS:
+            del self.command_events[:-MAX_PENDING_COMMAND_EVENTS]
+    
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        """Collecte des utilisations de commandes réussies."""
+        self._record_command(ctx, True)
+    
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        """Collecte des utilisations de commandes en échec."""
+        self._record_command(ctx, False)
+    
     @commands.Cog.listener()
     async def on_message(self, message):
         """Collecte des données sur les messages."""
-        if message.author.bot:
+        if message.author.bot or message.guild is None:
             return
-        
-        # Incrémenter l'activité par utilisateur
-        self.message_activity[message.author.id] += 1
-        
-        # Incrémenter l'activité par canal
-        self.channel_activity[message.channel.id] += 1
-        
-        # Enregistrer l'heure active
-        hour = datetime.datetime.utcnow().hour
-        self.active_hour_data[hour] += 1
-        
-        # Enregistrer le jour actif
-        weekday = datetime.datetime.utcnow().weekday()
-        self.active_day_data[weekday] += 1
-        
-        # Enregistrer l'activité quotidienne
-        today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-        self.activity_data[today]['messages'] += 1
+        # Activité par canal, par jour et par heure de la semaine, membres actifs (esquisses)
+        self.store.message(message.guild.id, clock.now(), message.author.id, message.channel.id)
     
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction, user):
         """Collecte des données sur les réactions."""
-        if user.bot:
+        if user.bot or reaction.message.guild is None:
             return
-        
-        # Incrémenter l'activité de réaction par utilisateur
-        self.reaction_activity[user.id] += 1
-        
-        # Compteur d'emojis
-        emoji_name = str(reaction.emoji)
-        self.emoji_usage[emoji_name] += 1
-        
-        # Enregistrer l'activité quotidienne
-        today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-        self.activity_data[today]['reactions'] += 1
+        # Activité de réaction par utilisateur, emojis et activité quotidienne
+        self.store.reaction(reaction.message.guild.id, clock.now(), user.id, str(reaction.emoji))
     
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -320,46 +630,38 @@ class ServerAnalytics(commands.Cog):
         if member.bot:
             return
         
-        # Si l'utilisateur rejoint un canal vocal
-        if before.channel is None and after.channel is not None:
-            # Stocker l'heure de début pour calculer la durée plus tard
-            member._voice_join_time = datetime.datetime.utcnow()
-        
-        # Si l'utilisateur quitte un canal vocal
-        elif before.channel is not None and (after.channel is None or after.channel != before.channel):
-            join_time = getattr(member, '_voice_join_time', None)
-            if join_time:
-                # Calculer la durée en minutes
-                now = datetime.datetime.utcnow()
-                duration = (now - join_time).total_seconds() / 60
-                
-                # Incrémenter l'activité vocale par utilisateur
-                self.voice_activity[member.id] += duration
-                
-                # Enregistrer l'activité quotidienne
-                today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-                self.activity_data[today]['voice'] += duration
-                
-                # Nettoyer la donnée temporaire
-                del member._voice_join_time
+        # Le salon AFK ne compte pas comme présence en vocal
+        afk_channel = member.guild.afk_channel
+        before_channel = before.channel if before.channel != afk_channel else None
+        after_channel = after.channel if after.channel != afk_channel else None
+        if before_channel == after_channel:
+            return  # Micro, caméra, partage d'écran...
+        
+        bucket = clock.now()
+        guild_id = member.guild.id
+        if after_channel is None:
+            # Déconnexion: les minutes pas encore décomptées sont ajoutées
+            minutes = self.voice_sessions.leave(guild_id, member.id, bucket.moment)
+        elif before_channel is None:
+            self.voice_sessions.join(guild_id, member.id, after_channel.id, bucket.moment, member.display_name)
+            minutes = 0.0
+        else:
+            # Changement de salon: la session continue dans le nouveau salon
+            minutes = self.voice_sessions.move(guild_id, member.id, after_channel.id, bucket.moment,
+                                               member.display_name)
+        if minutes > 0:
+            self.store.voice(guild_id, bucket, member.id, minutes)
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
         """Collecte des données sur les nouveaux membres."""
-        self.user_join_data.append({
-            'user_id': member.id,
-            'timestamp': datetime.datetime.utcnow(),
-            'guild_id': member.guild.id
-        })
+        self._record_member_event(member, 'join')
+        self.detector.join(member.guild.id)
     
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         """Collecte des données sur les membres qui partent."""
-        self.user_leave_data.append({
-            'user_id': member.id,
-            'timestamp': datetime.datetime.utcnow(),
-            'guild_id': member.guild.id
-        })
+        self._record_member_event(member, 'leave')
     
     @commands.group(name="analytics", invoke_without_command=True)
     @commands.has_permissions(administrator=True)
@@ -391,11 +693,8 @@ class ServerAnalytics(commands.Cog):
         categories = len(guild.categories)
         
         # Activité récente
-        today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
-        yesterday = (datetime.datetime.utcnow() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        today_messages = self.activity_data[today]['messages']
-        yesterday_messages = self.activity_data[yesterday]['messages']
+        today = day_index(datetime.datetime.utcnow())
+        (yesterday_messages, today_messages), _, _ = self.store.shard(guild.id).daily.series(today - 1, today)
         
         # Membres en vocal
         members_in_voice = sum(1 for m in guild.members if m.voice)
@@ -435,14 +734,13 @@ class ServerAnalytics(commands.Cog):
             return await ctx.send("❌ Le nombre de jours doit être compris entre 1 et 30.")
         
         # Calculer les dates
-        today = datetime.datetime.utcnow()
+        today = datetime.datetime.utcnow().date()
         start_date = today - datetime.timedelta(days=days)
-        date_range = [(start_date + datetime.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days + 1)]
         
-        # Préparer les données d'activité
-        message_data = [self.activity_data[date]['messages'] for date in date_range]
-        voice_data = [round(self.activity_data[date]['voice']) for date in date_range]
-        reaction_data = [self.activity_data[date]['reactions'] for date in date_range]
+        # Préparer les données d'activité (un élément par jour, du plus ancien au plus récent)
+        message_data, voice_data, reaction_data = self.store.shard(ctx.guild.id).daily.series(
+            day_index(start_date), day_index(today))
+        voice_data = [round(minutes) for minutes in voice_data]
         
         embed = discord.Embed(
             title=f"📊 Activité sur {days} jours - {ctx.guild.name}",
@@ -470,39 +768,72 @@ class ServerAnalytics(commands.Cog):
         # Jour le plus actif
         if total_messages > 0:
             most_active_index = message_data.index(max(message_data))
-            most_active_date = date_range[most_active_index]
-            most_active_formatted = datetime.datetime.strptime(most_active_date, '%Y-%m-%d').strftime('%d/%m/%Y')
+            most_active_date = start_date + datetime.timedelta(days=most_active_index)
+            most_active_formatted = most_active_date.strftime('%d/%m/%Y')
             embed.add_field(
                 name="📅 Jour le plus actif",
                 value=f"{most_active_formatted} ({message_data[most_active_index]:,} messages)",
                 inline=False
             )
         
-        embed.set_footer(text=f"Période: {datetime.datetime.strptime(date_range[0], '%Y-%m-%d').strftime('%d/%m/%Y')} - {datetime.datetime.strptime(date_range[-1], '%Y-%m-%d').strftime('%d/%m/%Y')}")
+        embed.set_footer(text=f"Période: {start_date.strftime('%d/%m/%Y')} - {today.strftime('%d/%m/%Y')}")
+        
+        labels = [(start_date + datetime.timedelta(days=offset)).strftime('%d/%m') for offset in range(len(message_data))]
+        await self._send_chart(ctx, embed, (ctx.guild.id, 'activity', days), 'activity.png',
+                               analytics_charts.render_activity, f"Activité sur {days} jours - {ctx.guild.name}",
+                               labels, list(message_data), voice_data, list(reaction_data))
+    
+    @analytics_group.command(name="members")
+    @commands.has_permissions(administrator=True)
+    async def analytics_members_cmd(self, ctx, days: typing.Optional[int] = 7, channel: typing.Optional[discord.TextChannel] = None):
+        """
+        Affiche le nombre de membres actifs distincts (ayant écrit au moins un message).
+        
+        Exemple:
+        !analytics members 30 #général
+        """
+        if days < 1 or days > 90:
+            return await ctx.send("❌ Le nombre de jours doit être compris entre 1 et 90.")
+        
+        since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+        count = self._unique_members(ctx.guild.id, since, channel.id if channel else None)
+        if count is None:
+            return await ctx.send("❌ Impossible de compter les membres actifs pour le moment.")
+        
+        scope = channel.mention if channel else ctx.guild.name
+        embed = discord.Embed(
+            title=f"👤 Membres actifs - {ctx.guild.name}",
+            description=f"**~{count:,}** membres distincts ont écrit dans {scope} ces {days} derniers jours.",
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text="Estimation HyperLogLog (erreur type de 2 à 3 %)")
         
         await ctx.send(embed=embed)
     
     @analytics_group.command(name="channels")
     @commands.has_permissions(administrator=True)
-    async def analytics_channels_cmd(self, ctx, limit: typing.Optional[int] = 10):
+    async def analytics_channels_cmd(self, ctx, limit: typing.Optional[int] = 10, days: typing.Optional[int] = 7):
         """
-        Affiche les canaux les plus actifs du serveur.
+        Affiche les canaux les plus actifs du serveur sur une période donnée.
         
         Exemple:
-        !analytics channels 5
+        !analytics channels 5 30
         """
         if limit < 1 or limit > 25:
             return await ctx.send("❌ La limite doit être comprise entre 1 et 25.")
+        if days < 1 or days > 90:
+            return await ctx.send("❌ Le nombre de jours doit être compris entre 1 et 90.")
         
-        channels = [(channel_id, count) for channel_id, count in self.channel_activity.items()]
-        channels.sort(key=lambda x: x[1], reverse=True)
+        channels = self._top_items(ctx.guild.id, 'channels', days, limit)
+        if channels is None:
+            return await ctx.send("❌ Impossible de classer les canaux pour le moment.")
         
         embed = discord.Embed(
-            title=f"📊 Canaux les plus actifs - {ctx.guild.name}",
+            title=f"📊 Canaux les plus actifs sur {days} jours - {ctx.guild.name}",
             color=discord.Color.blue()
         )
         
-        for i, (channel_id, count) in enumerate(channels[:limit], 1):
+        for i, (channel_id, count, _) in enumerate(channels, 1):
             channel = self.bot.get_channel(channel_id)
             channel_name = channel.mention if channel else f"Canal inconnu ({channel_id})"
             embed.add_field(
@@ -513,29 +844,39 @@ class ServerAnalytics(commands.Cog):
         
         if not channels:
             embed.description = "Aucune donnée d'activité disponible pour les canaux."
+            return await ctx.send(embed=embed)
         
-        await ctx.send(embed=embed)
+        items = []
+        for channel_id, count, _ in channels:
+            channel = self.bot.get_channel(channel_id)
+            items.append((f"#{channel.name}" if channel else str(channel_id), count))
+        await self._send_chart(ctx, embed, (ctx.guild.id, 'channels', limit, days), 'channels.png',
+                               analytics_charts.render_top, f"Canaux les plus actifs sur {days} jours", items)
     
     @analytics_group.command(name="emojis")
     @commands.has_permissions(administrator=True)
-    async def analytics_emojis_cmd(self, ctx, limit: typing.Optional[int] = 10):
+    async def analytics_emojis_cmd(self, ctx, limit: typing.Optional[int] = 10, days: typing.Optional[int] = 7):
         """
-        Affiche les emojis les plus utilisés sur le serveur.
+        Affiche les emojis les plus utilisés sur le serveur sur une période donnée.
         
         Exemple:
-        !analytics emojis 5
+        !analytics emojis 5 30
         """
         if limit < 1 or limit > 25:
             return await ctx.send("❌ La limite doit être comprise entre 1 et 25.")
+        if days < 1 or days > 90:
+            return await ctx.send("❌ Le nombre de jours doit être compris entre 1 et 90.")
         
-        top_emojis = self.emoji_usage.most_common(limit)
+        top_emojis = self._top_items(ctx.guild.id, 'emojis', days, limit)
+        if top_emojis is None:
+            return await ctx.send("❌ Impossible de classer les emojis pour le moment.")
         
         embed = discord.Embed(
-            title=f"📊 Emojis les plus utilisés - {ctx.guild.name}",
+            title=f"📊 Emojis les plus utilisés sur {days} jours - {ctx.guild.name}",
             color=discord.Color.blue()
         )
         
-        for i, (emoji, count) in enumerate(top_emojis, 1):
+        for i, (emoji, count, _) in enumerate(top_emojis, 1):
             embed.add_field(
                 name=f"{i}. {emoji}",
                 value=f"{count:,} utilisations",
@@ -550,41 +891,26 @@ class ServerAnalytics(commands.Cog):
     @analytics_group.command(name="hours")
     @commands.has_permissions(administrator=True)
     async def analytics_hours_cmd(self, ctx):
-        """Affiche les heures les plus actives du serveur."""
-        hours = [(hour, count) for hour, count in self.active_hour_data.items()]
-        hours.sort(key=lambda x: x[0])  # Trier par heure
+        """Affiche les heures les plus actives du serveur (carte de chaleur jour x heure)."""
+        shard = self.store.shard(ctx.guild.id)
+        hour_totals = shard.hour_totals()
         
         # Trouver l'heure la plus active
-        most_active_hour = max(hours, key=lambda x: x[1]) if hours else (0, 0)
+        most_active_hour = max(enumerate(hour_totals), key=lambda x: x[1])
         
         embed = discord.Embed(
             title=f"📊 Heures d'activité - {ctx.guild.name}",
-            description=f"Heure la plus active: **{most_active_hour[0]:02d}:00 UTC** ({most_active_hour[1]:,} messages)",
             color=discord.Color.blue()
         )
-        
-        # Créer une représentation textuelle
-        hour_blocks = []
-        if hours:
-            max_count = max([count for _, count in hours])
-            for hour, count in hours:
-                if max_count > 0:
-                    # Calculer la proportion pour la visualisation
-                    proportion = count / max_count
-                    num_blocks = round(proportion * 10)
-                    bar = '█' * num_blocks + '░' * (10 - num_blocks)
-                    hour_blocks.append(f"`{hour:02d}:00` {bar} {count:,}")
-        
-        # Divisez les heures en deux colonnes
-        half = len(hour_blocks) // 2 + len(hour_blocks) % 2
-        first_half = '\n'.join(hour_blocks[:half]) if hour_blocks else "Aucune donnée"
-        second_half = '\n'.join(hour_blocks[half:]) if hour_blocks and len(hour_blocks) > half else "Suite..."
-        
-        embed.add_field(name="Heures (UTC) - Partie 1", value=first_half, inline=True)
-        if second_half != "Suite...":
-            embed.add_field(name="Heures (UTC) - Partie 2", value=second_half, inline=True)
-        
-        await ctx.send(embed=embed)
+        if most_active_hour[1] == 0:
+            embed.description = "Aucune donnée"
+            return await ctx.send(embed=embed)
+        embed.description = (f"Heure la plus active: **{most_active_hour[0]:02d}:00 UTC** "
+                             f"({most_active_hour[1]:,} messages)")
+        
+        await self._send_chart(ctx, embed, (ctx.guild.id, 'hours'), 'hours.png',
+                               analytics_charts.render_heatmap, f"Messages par jour et heure - {ctx.guild.name}",
+                               list(shard.week_hours))
     
     @analytics_group.command(name="retention")
     @commands.has_permissions(administrator=True)
@@ -602,14 +928,20 @@ class ServerAnalytics(commands.Cog):
         today = datetime.datetime.utcnow()
         start_date = today - datetime.timedelta(days=days)
         
-        # Filtrer les données
-        joins = [data for data in self.user_join_data 
-                if data.get('timestamp') and data['timestamp'] >= start_date]
-        leaves = [data for data in self.user_leave_data 
-                 if data.get('timestamp') and data['timestamp'] >= start_date]
+        # Arrivées et départs de la période, puis rétention des cohortes hebdomadaires
+        total_joins, total_leaves = self._member_counts(ctx.guild.id, start_date)
+        if total_joins is None:
+            return await ctx.send("❌ Impossible de lire les arrivées et départs des membres.")
+        try:
+            session = self.db.get_session()
+            cohorts = retention.cohort_retention(session, ctx.guild.id, cohorts=math.ceil(days / 7) + 1, now=today)
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de la rétention: {e}")
+            cohorts = None
+        finally:
+            if 'session' in locals():
+                session.close()
         
-        total_joins = len(joins)
-        total_leaves = len(leaves)
         net_change = total_joins - total_leaves
         
         embed = discord.Embed(
@@ -624,14 +956,16 @@ class ServerAnalytics(commands.Cog):
                        value=f"{'+' if net_change >= 0 else ''}{net_change:,}", 
                        inline=True)
         
-        # Calculer le taux de rétention
-        if total_joins > 0:
-            retention_rate = (total_joins - total_leaves) / total_joins * 100
-            embed.add_field(
-                name="🔄 Taux de rétention",
-                value=f"{max(0, retention_rate):.2f}%",
-                inline=True
-            )
+        # Rétention: part des arrivants encore présents 1, 2, ... semaines après leur semaine d'arrivée
+        if cohorts and cohorts['cohorts']:
+            curve = " · ".join(f"S+{week}: {rate:.0f}%" for week, rate in enumerate(cohorts['curve'], 1)
+                               if rate is not None)
+            embed.add_field(name="🔄 Taux de rétention", value=curve or "Cohortes trop récentes", inline=False)
+            lines = []
+            for cohort in cohorts['cohorts'][-8:]:
+                rates = " · ".join(f"{rate:.0f}%" for rate in cohort['retention']) or "—"
+                lines.append(f"`{cohort['week'].strftime('%d/%m')}` {cohort['size']:,} arrivée(s): {rates}")
+            embed.add_field(name="📅 Cohortes (semaine d'arrivée)", value="\n".join(lines), inline=False)
         
         # Moyenne par jour
         avg_joins = round(total_joins / days, 2)
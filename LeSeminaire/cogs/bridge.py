@@ -0,0 +1,147 @@
+"""
+Module passerelle pour LeSéminaire[BOT].
+Exécute les tâches déposées par le panneau d'administration du site (messages
+privés, annonces, diffusion de ressources) via la table `bot_jobs`.
+"""
+
+import discord
+from discord.ext import commands, tasks
+import logging
+
+from job_bridge import JobConsumer, requeue_stale_jobs, purge_finished_jobs
+
+# Configuration du logger
+logger = logging.getLogger('le_seminaire.bridge')
+
+# Salon de diffusion des ressources (à défaut: salon système du serveur)
+RESOURCES_CHANNEL = "ressources"
+
+
+class JobBridge(commands.Cog):
+    """Consommateur des tâches soumises par le site web."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+        # Accès à la base de données via database.py
+        from database import DatabaseManager
+        self.db = DatabaseManager()
+
+        self.consumer = JobConsumer(self.db.Session, {
+            'dm': self.handle_dm,
+            'announcement': self.handle_announcement,
+            'resource_broadcast': self.handle_resource_broadcast,
+        })
+
+        self.poll_jobs_task.start()
+        self.maintenance_task.start()
+
+    def cog_unload(self):
+        """Nettoyage lors du déchargement du cog."""
+        self.poll_jobs_task.cancel()
+        self.maintenance_task.cancel()
+
+    @tasks.loop(seconds=2)
+    async def poll_jobs_task(self):
+        """Traite les tâches en attente, lot par lot tant que la file n'est pas vide."""
+        try:
+            while await self.consumer.run_once():
+                pass
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement des tâches du site: {e}")
+
+    @poll_jobs_task.before_loop
+    async def before_poll_jobs(self):
+        """Attendre que le bot soit prêt avant de démarrer la tâche."""
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=5)
+    async def maintenance_task(self):
+        """Relance les tâches interrompues et purge les tâches terminées anciennes."""
+        session = self.db.Session()
+        try:
+            requeued, failed = requeue_stale_jobs(session)
+            purged = purge_finished_jobs(session)
+            if requeued or failed or purged:
+                logger.info(f"Tâches du site: {requeued} relancées, {failed} abandonnées, {purged} purgées")
+        except Exception as e:
+            logger.error(f"Erreur lors de la maintenance des tâches du site: {e}")
+        finally:
+            session.close()
+
+    @maintenance_task.before_loop
+    async def before_maintenance(self):
+        """Attendre que le bot soit prêt avant de démarrer la tâche."""
+        await self.bot.wait_until_ready()
+
+    async def handle_dm(self, payload):
+        """Envoie un message privé à un utilisateur (préférences de messagerie respectées)."""
+        user_id = int(payload['user_id'])
+        messenger = self.bot.get_cog('Messenger')
+        if messenger and messenger._is_user_opted_out(user_id):
+            raise RuntimeError("L'utilisateur a désactivé les messages du bot")
+
+        user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+        try:
+            await user.send(payload['message'])
+        except discord.Forbidden:
+            raise RuntimeError("Messages privés fermés") from None
+        if messenger:
+            messenger._update_last_dm_time(user_id)
+        return f"Envoyé à {user}"
+
+    async def handle_announcement(self, payload):
+        """Confie une annonce à la file d'annonces du module de messagerie."""
+        messenger = self.bot.get_cog('Messenger')
+        if messenger is None:
+            raise RuntimeError("Module de messagerie non chargé")
+        if self.bot.get_guild(int(payload['guild_id'])) is None:
+            raise RuntimeError(f"Serveur introuvable: {payload['guild_id']}")
+        messenger.pending_announcements.append({
+            'guild_id': payload['guild_id'],
+            'message': payload['message'],
+            'filter_roles': payload.get('filter_roles', []),
+        })
+        return f"Annonce mise en file ({len(messenger.pending_announcements)} en attente)"
+
+    async def handle_resource_broadcast(self, payload):
+        """Publie une ressource dans le salon des ressources de chaque serveur (ou d'un seul)."""
+        from models import Resource
+
+        session = self.db.Session()
+        try:
+            resource = session.get(Resource, int(payload['resource_id']))
+            if resource is None:
+                raise RuntimeError(f"Ressource introuvable: {payload['resource_id']}")
+            embed = discord.Embed(
+                title=f"📚 {resource.title}",
+                description=resource.description or "",
+                url=resource.url,
+                color=discord.Color.blue()
+            )
+            embed.add_field(name="Catégorie", value=resource.category.value if resource.category else "Général")
+        finally:
+            session.close()
+
+        guilds = self.bot.guilds
+        if payload.get('guild_id'):
+            guilds = [guild for guild in guilds if guild.id == int(payload['guild_id'])]
+
+        sent = 0
+        for guild in guilds:
+            channel = discord.utils.get(guild.text_channels, name=RESOURCES_CHANNEL) or guild.system_channel
+            if channel is None:
+                continue
+            try:
+                await channel.send(embed=embed)
+                sent += 1
+            except discord.Forbidden:
+                logger.warning(f"Impossible de publier la ressource dans {guild.name}")
+        if not sent:
+            raise RuntimeError("Aucun salon disponible pour la diffusion")
+        return f"Publiée sur {sent} serveur(s)"
+
+
+async def setup(bot):
+    """Ajoute le cog passerelle au bot."""
+    await bot.add_cog(JobBridge(bot))
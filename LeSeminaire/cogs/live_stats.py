@@ -0,0 +1,81 @@
+"""
+Module de métriques en direct pour LeSéminaire[BOT].
+Publie plusieurs fois par seconde l'état du bot (ping, serveurs, vocal, musique)
+dans le fichier partagé lu par la page /stats/realtime du site.
+"""
+
+import math
+import time
+import logging
+
+from discord.ext import commands, tasks
+
+from live_metrics import SnapshotWriter
+
+# Configuration du logger
+logger = logging.getLogger('le_seminaire.live_stats')
+
+# Intervalle de publication (secondes)
+PUBLISH_INTERVAL = 0.25
+
+
+class LiveStats(commands.Cog):
+    """Publication des métriques en direct du bot."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.started_at = time.time()
+        self.commands_total = 0
+        self.writer = SnapshotWriter()
+        self.publish_task.start()
+
+    def cog_unload(self):
+        """Nettoyage lors du déchargement du cog."""
+        self.publish_task.cancel()
+        self.writer.close()
+
+    def _music_state(self):
+        """Nombre de serveurs en lecture et titre en cours (premier trouvé)."""
+        music = self.bot.get_cog('MusicCog')
+        playing, title = 0, ''
+        if music is None:
+            return playing, title
+        for voice_client in self.bot.voice_clients:
+            if not voice_client.is_playing():
+                continue
+            playing += 1
+            queue = music.queues.get(voice_client.guild.id)
+            if not title and queue is not None and queue.current is not None:
+                title = queue.current.title or ''
+        return playing, title
+
+    @tasks.loop(seconds=PUBLISH_INTERVAL)
+    async def publish_task(self):
+        """Écrit un nouvel instantané des métriques."""
+        latency = self.bot.latency
+        playing, title = self._music_state()
+        self.writer.publish(
+            started_at=self.started_at,
+            latency_ms=latency * 1000 if math.isfinite(latency) else 0.0,
+            guilds=len(self.bot.guilds),
+            members=sum(guild.member_count or 0 for guild in self.bot.guilds),
+            voice_connections=len(self.bot.voice_clients),
+            playing=playing,
+            commands_total=self.commands_total,
+            now_playing=title,
+        )
+
+    @publish_task.before_loop
+    async def before_publish(self):
+        """Attendre que le bot soit prêt avant de démarrer la tâche."""
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        """Compte les commandes exécutées depuis le démarrage."""
+        self.commands_total += 1
+
+
+async def setup(bot):
+    """Ajoute le cog de métriques en direct au bot."""
+    await bot.add_cog(LiveStats(bot))
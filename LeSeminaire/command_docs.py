@@ -0,0 +1,277 @@
+"""
+Documentation des commandes de LeSéminaire[BOT], générée depuis l'arbre de commandes.
+
+Le bot exporte au démarrage (ou `python command_docs.py` hors ligne, sans
+instancier réellement les cogs) toutes les commandes des cogs chargés - alias, signatures, paramètres, permissions et
+docstrings - dans un fichier JSON versionné. La page /commands/doc du site et la
+commande `!help` servent toutes deux ce document, sans réintrospection à chaque appel.
+"""
+import os
+import json
+import hashlib
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Version du format du document (à incrémenter si sa structure change)
+SCHEMA_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.environ.get('COMMAND_DOCS_PATH', os.path.join(BASE_DIR, 'instance', 'command_docs.json'))
+
+# Nom affiché et icône (Feather) de chaque catégorie, par nom de cog
+CATEGORY_DISPLAY_NAMES = {
+    "ResourceCog": "📚 Ressources",
+    "MusicCog": "🎵 Musique",
+    "CollaborationCog": "🤝 Collaborations",
+    "ModerationCog": "🛡️ Modération",
+    "Security": "🛡️ Sécurité",
+    "Shield": "🔰 Bouclier",
+    "Messenger": "✉️ Messagerie",
+    "ServerAnalytics": "📊 Analytique",
+    "None": "⚙️ Autres",
+    "Autres": "⚙️ Autres"
+}
+
+CATEGORY_ICONS = {
+    "ResourceCog": "book",
+    "MusicCog": "music",
+    "CollaborationCog": "share-2",
+    "ModerationCog": "shield",
+    "Security": "shield",
+    "Shield": "lock",
+    "Messenger": "mail",
+    "ServerAnalytics": "bar-chart-2",
+}
+
+UNCATEGORIZED = "Autres"
+
+
+def _describe_check(check):
+    """
+    Décrit un check discord.py (has_permissions, has_role, guild_only...) à partir
+    du nom de la fabrique et des valeurs capturées par sa fermeture.
+
+    Returns:
+        Tuple (nom, valeurs capturées)
+    """
+    name = getattr(check, '__qualname__', repr(check)).split('.<locals>')[0]
+    values = []
+    for cell in getattr(check, '__closure__', None) or ():
+        try:
+            values.append(cell.cell_contents)
+        except ValueError:
+            continue
+    return name, values
+
+
+def _describe_param(param):
+    converter = getattr(param, 'converter', None)
+    default = None
+    if not param.required:
+        default = getattr(param, 'displayed_default', None) or repr(param.default)
+    return {
+        'name': param.name,
+        'required': param.required,
+        'default': default,
+        'type': getattr(converter, '__name__', None) or str(converter),
+    }
+
+
+def _describe_command(command, prefix):
+    checks, permissions, roles = [], [], []
+    for check in command.checks:
+        name, values = _describe_check(check)
+        checks.append(name)
+        for value in values:
+            if name in ('has_permissions', 'has_guild_permissions') and isinstance(value, dict):
+                permissions.extend(perm for perm, enabled in value.items() if enabled)
+            elif name in ('has_role', 'has_any_role'):
+                roles.extend(value if isinstance(value, (list, tuple)) else [value])
+
+    signature = command.signature
+    return {
+        'name': command.name,
+        'qualified_name': command.qualified_name,
+        'parent': command.parent.qualified_name if command.parent else None,
+        'cog': command.cog_name or UNCATEGORIZED,
+        'aliases': list(command.aliases),
+        'signature': signature,
+        'usage': f"{prefix}{command.qualified_name}" + (f" {signature}" if signature else ""),
+        'help': command.help,
+        'brief': command.brief,
+        'short_doc': command.short_doc,
+        'hidden': command.hidden,
+        'params': [_describe_param(param) for param in command.clean_params.values()],
+        'checks': checks,
+        'required_permissions': sorted(set(permissions)),
+        'required_roles': [str(role) for role in roles],
+        'subcommands': sorted(sub.qualified_name for sub in getattr(command, 'commands', ())),
+    }
+
+
+def build_command_docs(bot, prefix='!'):
+    """
+    Construit le document à partir des commandes actuellement chargées sur `bot`.
+
+    Returns:
+        Le document (dict) prêt à être sérialisé
+    """
+    commands = {}
+    categories = {}
+    for command in sorted(bot.walk_commands(), key=lambda c: c.qualified_name):
+        entry = _describe_command(command, prefix)
+        commands[entry['qualified_name']] = entry
+        categories.setdefault(entry['cog'], []).append(entry['qualified_name'])
+
+    category_list = []
+    for cog_name, names in categories.items():
+        cog = bot.get_cog(cog_name)
+        category_list.append({
+            'name': cog_name,
+            'slug': cog_name.lower(),
+            'display_name': CATEGORY_DISPLAY_NAMES.get(cog_name, cog_name),
+            'icon': CATEGORY_ICONS.get(cog_name, 'terminal'),
+            'description': (cog.description if cog else None) or None,
+            'commands': names,
+        })
+    category_list.sort(key=lambda category: (category['name'] == UNCATEGORIZED, category['name'].lower()))
+
+    body = {'prefix': prefix, 'categories': category_list, 'commands': commands}
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'version': digest[:12],
+        'generated_at': datetime.datetime.utcnow().replace(microsecond=0).isoformat() + 'Z',
+        'bot_version': os.environ.get('BOT_VERSION', '1.2.0'),
+        **body,
+    }
+
+
+def write_command_docs(docs, path=DEFAULT_PATH):
+    """
+    Écrit le document de façon atomique. Le fichier n'est pas réécrit si son contenu
+    (version) est inchangé, ce qui préserve sa date de génération.
+
+    Returns:
+        True si le fichier a été (ré)écrit
+    """
+    try:
+        with open(path, encoding='utf-8') as existing:
+            if json.load(existing).get('version') == docs['version']:
+                return False
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as output:
+        json.dump(docs, output, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return True
+
+
+def export_command_docs(bot, path=DEFAULT_PATH, prefix='!'):
+    """
+    Génère la documentation de `bot`, la conserve sur le bot (pour `!help`) et
+    l'écrit dans `path` (pour le site).
+    """
+    docs = build_command_docs(bot, prefix)
+    bot.command_docs = docs
+    try:
+        if write_command_docs(docs, path):
+            logger.info(f"Documentation des commandes exportée ({len(docs['commands'])} commandes, version {docs['version']})")
+    except OSError as e:
+        logger.error(f"Impossible d'écrire la documentation des commandes dans {path}: {e}")
+    return docs
+
+
+def docs_for_bot(bot, refresh=False):
+    """Document en mémoire du bot, construit à la demande s'il n'a pas encore été exporté."""
+    docs = getattr(bot, 'command_docs', None)
+    if docs is None or refresh:
+        prefix = bot.command_prefix if isinstance(bot.command_prefix, str) else '!'
+        docs = bot.command_docs = build_command_docs(bot, prefix)
+    return docs
+
+
+_cache_lock = threading.Lock()
+_cache = {}  # {chemin: (mtime, document)}
+
+
+def load_command_docs(path=DEFAULT_PATH):
+    """
+    Lit le document exporté, en le gardant en mémoire tant que le fichier n'a pas
+    changé.
+
+    Returns:
+        Le document, ou None s'il n'a pas encore été généré ou n'est pas lisible
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    try:
+        with open(path, encoding='utf-8') as source:
+            docs = json.load(source)
+    except (OSError, ValueError) as e:
+        logger.error(f"Documentation des commandes illisible ({path}): {e}")
+        return None
+    if docs.get('schema_version') != SCHEMA_VERSION:
+        logger.warning(f"Documentation des commandes au format {docs.get('schema_version')} ignorée "
+                       f"(attendu: {SCHEMA_VERSION}); relancez l'export")
+        return None
+
+    with _cache_lock:
+        _cache[path] = (mtime, docs)
+    return docs
+
+
+def docs_only_cogs(extensions):
+    """
+    Instances des cogs définis par les modules `extensions`, créées sans exécuter
+    leur __init__: discord.py copie les commandes dès Cog.__new__, ce qui suffit à
+    la documentation, sans base de données, journal, fichier partagé ni tâche
+    périodique. Ces cogs ne doivent servir qu'à l'export.
+    """
+    import inspect
+    import importlib
+    from discord.ext import commands
+
+    cogs = []
+    for extension in extensions:
+        try:
+            module = importlib.import_module(extension)
+        except Exception as e:
+            logger.error(f"Échec du chargement du module {extension}: {e}")
+            continue
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, commands.Cog) and cls.__module__ == module.__name__:
+                cogs.append(cls.__new__(cls))
+    return cogs
+
+
+async def _export_offline(path):
+    from bot import bot, INITIAL_EXTENSIONS
+    # Ni connexion à Discord ni `async with bot`: sa fermeture déchargerait les cogs
+    # (cog_unload), qui écriraient en base et dans le journal du bot en service.
+    for cog in docs_only_cogs(INITIAL_EXTENSIONS):
+        await bot.add_cog(cog)
+    return export_command_docs(bot, path)
+
+
+if __name__ == "__main__":
+    import sys
+    import asyncio
+
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    exported = asyncio.run(_export_offline(target))
+    print(f"{len(exported['commands'])} commandes exportées dans {target} (version {exported['version']})")
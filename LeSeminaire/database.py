@@ -10,6 +10,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from models import Base, Resource, MusicSample, Collaboration, CollaborationMember
 from models import PlaylistEntry, GuildSettings, ResourceCategory
+from search_index import mark_changed as mark_search_changed
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +81,7 @@ class DatabaseManager:
             added_by=added_by
         )
         session.add(resource)
+        mark_search_changed(session)
         session.commit()
         return resource
     
@@ -141,6 +143,7 @@ class DatabaseManager:
         resource = session.query(Resource).filter(Resource.id == resource_id).first()
         if resource:
             session.delete(resource)
+            mark_search_changed(session)
             session.commit()
             return True
         return False
@@ -180,6 +183,7 @@ class DatabaseManager:
             added_by=added_by
         )
         session.add(sample)
+        mark_search_changed(session)
         session.commit()
         return sample
     
@@ -0,0 +1,19 @@
+"""
+Configuration gunicorn de l'application web LeSéminaire[BOT].
+Lue automatiquement par `gunicorn` lancé depuis ce dossier.
+
+L'application est créée une seule fois dans le processus maître (preload) puis
+partagée par les workers forkés, au lieu d'être importée par chacun d'eux.
+"""
+import os
+
+wsgi_app = "app:create_app()"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+preload_app = True
+
+
+def when_ready(server):
+    """Précharge modules et templates dans le maître, avant la création des workers"""
+    from app import warm_up
+    warm_up(server.app.wsgi())
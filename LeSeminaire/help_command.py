@@ -7,11 +7,16 @@ from discord.ext import commands
 import logging
 from typing import Dict, List, Optional, Union, Mapping
 
+from command_docs import docs_for_bot
+
 logger = logging.getLogger(__name__)
 
 class HelpCommand(commands.HelpCommand):
     """
     Commande d'aide personnalisée pour le bot Le Séminaire.
+    
+    Le contenu provient de la documentation exportée au démarrage (command_docs):
+    les commandes ne sont pas réintrospectées à chaque `!help`.
     """
     
     def __init__(self):
@@ -22,6 +27,28 @@ class HelpCommand(commands.HelpCommand):
             }
         )
     
+    def _docs(self):
+        return docs_for_bot(self.context.bot)
+    
+    def _entry(self, command):
+        """Fiche documentée de `command` (document régénéré si la commande est nouvelle)"""
+        entry = self._docs()['commands'].get(command.qualified_name)
+        if entry is None:
+            entry = docs_for_bot(self.context.bot, refresh=True)['commands'].get(command.qualified_name)
+        return entry
+    
+    def _visible(self, entry):
+        """Masque les commandes cachées et celles réservées à des permissions que l'auteur n'a pas"""
+        if entry is None or entry['hidden']:
+            return False
+        permissions = getattr(self.context.author, 'guild_permissions', None)
+        if permissions is None or permissions.administrator:
+            return True
+        return all(getattr(permissions, name, False) for name in entry['required_permissions'])
+    
+    def _signature(self, entry):
+        return f"{self.context.clean_prefix}{entry['qualified_name']} {entry['signature']}".rstrip()
+    
     async def send_bot_help(self, mapping):
         """
         Affiche l'aide générale avec les catégories.
@@ -35,32 +62,14 @@ class HelpCommand(commands.HelpCommand):
             color=0x7289da
         )
         
-        # Trier les commandes par cog
-        filtered = await self.filter_commands(self.context.bot.commands, sort=True)
-        
-        # Grouper les commandes par catégorie (cog)
-        cogs_dict = {}
-        for command in filtered:
-            cog_name = command.cog_name or "Autres"
-            if cog_name not in cogs_dict:
-                cogs_dict[cog_name] = []
-            cogs_dict[cog_name].append(command)
-        
-        # Renommer certaines catégories pour plus de clarté
-        display_names = {
-            "ResourceCog": "📚 Ressources",
-            "MusicCog": "🎵 Musique",
-            "CollaborationCog": "🤝 Collaborations",
-            "ModerationCog": "🛡️ Modération",
-            "None": "⚙️ Autres",
-            "Autres": "⚙️ Autres"
-        }
-        
-        # Ajouter les catégories à l'embed
-        for cog_name, commands_list in cogs_dict.items():
-            display_name = display_names.get(cog_name, cog_name)
-            value = ", ".join(f"`{cmd.name}`" for cmd in commands_list)
-            embed.add_field(name=display_name, value=value, inline=False)
+        # Ajouter les catégories (cogs) à l'embed, avec leurs commandes de premier niveau
+        docs = self._docs()
+        for category in docs['categories']:
+            entries = [docs['commands'][name] for name in category['commands']]
+            names = [entry['name'] for entry in entries if entry['parent'] is None and self._visible(entry)]
+            if names:
+                value = ", ".join(f"`{name}`" for name in names)
+                embed.add_field(name=category['display_name'], value=value, inline=False)
         
         embed.add_field(
             name="📋 Plus d'informations",
@@ -81,29 +90,30 @@ class HelpCommand(commands.HelpCommand):
         """
         Affiche l'aide pour une commande spécifique.
         """
+        entry = self._entry(command)
+        if entry is None:
+            await self.get_destination().send(self.command_not_found(command.qualified_name))
+            return
+        
         embed = discord.Embed(
-            title=f"Commande: {command.name}",
+            title=f"Commande: {entry['name']}",
             color=0x7289da
         )
         
         # Ajouter la description de la commande
-        if command.help:
-            embed.description = command.help
-        else:
-            embed.description = "Aucune description disponible."
+        embed.description = entry['help'] or "Aucune description disponible."
         
         # Ajouter la syntaxe
-        signature = self.get_command_signature(command)
-        embed.add_field(name="Syntaxe", value=f"`{signature}`", inline=False)
+        embed.add_field(name="Syntaxe", value=f"`{self._signature(entry)}`", inline=False)
         
         # Ajouter les alias
-        if command.aliases:
-            aliases = ", ".join(f"`{alias}`" for alias in command.aliases)
+        if entry['aliases']:
+            aliases = ", ".join(f"`{alias}`" for alias in entry['aliases'])
             embed.add_field(name="Alias", value=aliases, inline=True)
         
-        # Ajouter le groupe parent si applicable
+        # Ajouter les sous-commandes si applicable
         if isinstance(command, commands.Group):
-            subcommands = ", ".join(f"`{c.name}`" for c in command.commands)
+            subcommands = ", ".join(f"`{name.split(' ')[-1]}`" for name in entry['subcommands'])
             embed.add_field(
                 name="Sous-commandes", 
                 value=subcommands or "Aucune sous-commande",
@@ -118,27 +128,30 @@ class HelpCommand(commands.HelpCommand):
         """
         Affiche l'aide pour un groupe de commandes.
         """
+        entry = self._entry(group)
+        if entry is None:
+            await self.get_destination().send(self.command_not_found(group.qualified_name))
+            return
+        
         embed = discord.Embed(
-            title=f"Groupe de commandes: {group.name}",
+            title=f"Groupe de commandes: {entry['name']}",
             color=0x7289da
         )
         
         # Ajouter la description du groupe
-        if group.help:
-            embed.description = group.help
-        else:
-            embed.description = "Aucune description disponible."
-        
-        # Filtrer et trier les sous-commandes
-        filtered = await self.filter_commands(group.commands, sort=True)
-        
-        # Ajouter chaque sous-commande
-        for command in filtered:
-            signature = self.get_command_signature(command).replace(group.name + " ", "")
-            value = command.help or "Aucune description disponible."
+        embed.description = entry['help'] or "Aucune description disponible."
+        
+        # Ajouter chaque sous-commande visible
+        commands_docs = self._docs()['commands']
+        for name in entry['subcommands']:
+            sub_entry = commands_docs.get(name)
+            if not self._visible(sub_entry):
+                continue
+            signature = f"{sub_entry['name']} {sub_entry['signature']}".rstrip()
+            value = sub_entry['help'] or "Aucune description disponible."
             if len(value) > 100:
                 value = value[:97] + "..."
-            embed.add_field(name=f"{command.name} - `{signature}`", value=value, inline=False)
+            embed.add_field(name=f"{sub_entry['name']} - `{signature}`", value=value, inline=False)
         
         embed.set_footer(text="Le Séminaire | Bot de communauté artistique")
         
@@ -148,15 +161,9 @@ class HelpCommand(commands.HelpCommand):
         """
         Affiche l'aide pour un cog (catégorie de commandes).
         """
-        # Renommer certaines catégories pour plus de clarté
-        display_names = {
-            "ResourceCog": "📚 Ressources",
-            "MusicCog": "🎵 Musique",
-            "CollaborationCog": "🤝 Collaborations",
-            "ModerationCog": "🛡️ Modération"
-        }
-        
-        display_name = display_names.get(cog.qualified_name, cog.qualified_name)
+        docs = self._docs()
+        category = next((c for c in docs['categories'] if c['name'] == cog.qualified_name), None)
+        display_name = category['display_name'] if category else cog.qualified_name
         
         embed = discord.Embed(
             title=f"Catégorie: {display_name}",
@@ -164,24 +171,23 @@ class HelpCommand(commands.HelpCommand):
         )
         
         # Ajouter la description du cog
-        if cog.description:
-            embed.description = cog.description
+        if category and category['description']:
+            embed.description = category['description']
         else:
             embed.description = "Collection de commandes pour cette catégorie."
         
-        # Filtrer et trier les commandes de ce cog
-        filtered = await self.filter_commands(cog.get_commands(), sort=True)
-        
-        # Ajouter chaque commande
-        for command in filtered:
-            signature = self.get_command_signature(command)
-            brief = command.brief or command.help
+        # Ajouter chaque commande de premier niveau visible
+        for name in (category['commands'] if category else ()):
+            entry = docs['commands'][name]
+            if entry['parent'] is not None or not self._visible(entry):
+                continue
+            brief = entry['brief'] or entry['help']
             if brief:
                 if len(brief) > 100:
                     brief = brief[:97] + "..."
             else:
                 brief = "Aucune description disponible."
-            embed.add_field(name=f"{command.name} - `{signature}`", value=brief, inline=False)
+            embed.add_field(name=f"{entry['name']} - `{self._signature(entry)}`", value=brief, inline=False)
         
         embed.set_footer(text="Le Séminaire | Bot de communauté artistique")
         
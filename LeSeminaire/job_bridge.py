@@ -0,0 +1,279 @@
+"""
+Passerelle site -> bot de LeSéminaire[BOT], adossée à la table `bot_jobs`.
+
+Le site ne peut pas joindre le bot directement: les actions d'administration
+(messages privés, annonces, diffusion de ressources) y sont donc déposées sous
+forme de tâches, par lots insérés en une seule requête. Le bot (cog `bridge`)
+réclame périodiquement les tâches en attente, les exécute puis les acquitte en
+une seule mise à jour, avec leur compte rendu. Le site suit l'avancement d'un
+lot via son identifiant.
+
+Tout consommateur fournissant un gestionnaire par type de tâche peut remplacer
+le bot; `python job_bridge.py --fake` lance un faux bot qui acquitte les tâches
+sans rien envoyer (développement de l'interface sans connexion à Discord).
+"""
+import json
+import uuid
+import datetime
+import logging
+
+from sqlalchemy import func, insert, update
+
+from models import BotJob
+
+logger = logging.getLogger(__name__)
+
+# Paramètres obligatoires de chaque type de tâche
+JOB_KINDS = {
+    'dm': ('user_id', 'message'),
+    'announcement': ('guild_id', 'message'),
+    'resource_broadcast': ('resource_id',),
+}
+
+JOB_STATUSES = ('pending', 'running', 'done', 'failed')
+
+# Nombre maximal de tâches par lot soumis, et par lot réclamé par le bot
+MAX_BATCH_SIZE = 500
+CLAIM_BATCH_SIZE = 25
+
+# Tâche « running » depuis plus longtemps: le consommateur s'est arrêté en cours de route
+STALE_AFTER = datetime.timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+
+
+def validate_payload(kind, payload):
+    """
+    Vérifie le type et les paramètres d'une tâche.
+
+    Raises:
+        ValueError: Type inconnu ou paramètre obligatoire manquant
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Type de tâche inconnu: {kind}")
+    if not isinstance(payload, dict):
+        raise ValueError("Les paramètres d'une tâche doivent être un objet")
+    missing = [name for name in JOB_KINDS[kind] if payload.get(name) in (None, '')]
+    if missing:
+        raise ValueError(f"Paramètres manquants pour '{kind}': {', '.join(missing)}")
+
+
+def submit_jobs(session, kind, payloads, created_by=None):
+    """
+    Dépose un lot de tâches du même type dans la transaction de `session`
+    (une seule requête INSERT). La validation porte sur tout le lot avant écriture.
+
+    Returns:
+        Identifiant du lot
+
+    Raises:
+        ValueError: Lot vide ou trop grand, ou tâche invalide
+    """
+    payloads = list(payloads)
+    if not payloads:
+        raise ValueError("Aucune tâche à soumettre")
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise ValueError(f"Lot trop grand ({len(payloads)} tâches, maximum {MAX_BATCH_SIZE})")
+    for payload in payloads:
+        validate_payload(kind, payload)
+
+    batch_id = uuid.uuid4().hex
+    now = datetime.datetime.utcnow()
+    session.execute(insert(BotJob), [{
+        'batch_id': batch_id,
+        'kind': kind,
+        'payload': json.dumps(payload, ensure_ascii=False),
+        'status': 'pending',
+        'attempts': 0,
+        'created_by': created_by,
+        'created_at': now,
+    } for payload in payloads])
+    return batch_id
+
+
+def batch_status(session, batch_id):
+    """
+    Avancement d'un lot.
+
+    Returns:
+        Dict {'batch_id', 'total', 'counts': {statut: nombre}, 'jobs': [...]},
+        ou None si le lot est inconnu
+    """
+    jobs = session.query(BotJob).filter(BotJob.batch_id == batch_id).order_by(BotJob.id).all()
+    if not jobs:
+        return None
+    counts = dict.fromkeys(JOB_STATUSES, 0)
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    return {
+        'batch_id': batch_id,
+        'total': len(jobs),
+        'counts': counts,
+        'finished': counts['pending'] == counts['running'] == 0,
+        'jobs': [{
+            'id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'result': job.result,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        } for job in jobs],
+    }
+
+
+def claim_jobs(session, limit=CLAIM_BATCH_SIZE):
+    """
+    Réclame jusqu'à `limit` tâches en attente (les plus anciennes d'abord) et les
+    passe à l'état 'running', puis valide la transaction.
+
+    Returns:
+        Liste de tuples (id, type, paramètres) des seules tâches effectivement
+        réclamées par cet appel
+    """
+    now = datetime.datetime.utcnow()
+    # SKIP LOCKED (PostgreSQL) laisse plusieurs consommateurs se répartir la file
+    rows = session.query(BotJob.id, BotJob.kind, BotJob.payload).filter(
+        BotJob.status == 'pending'
+    ).order_by(BotJob.id).limit(limit).with_for_update(skip_locked=True).all()
+    if not rows:
+        session.rollback()
+        return []
+
+    # Un autre consommateur a pu réclamer une partie de ces tâches entre la lecture
+    # et la mise à jour: ne renvoyer que celles que cette mise à jour a fait passer
+    # de 'pending' à 'running'.
+    values = {BotJob.status: 'running', BotJob.claimed_at: now, BotJob.attempts: BotJob.attempts + 1}
+    if session.get_bind().dialect.update_returning:
+        claimed = session.execute(
+            update(BotJob).where(BotJob.id.in_([row.id for row in rows]), BotJob.status == 'pending')
+            .values(values).returning(BotJob.id, BotJob.kind, BotJob.payload)
+            .execution_options(synchronize_session=False)
+        ).all()
+        claimed.sort(key=lambda row: row.id)
+    else:
+        claimed = [row for row in rows if session.execute(
+            update(BotJob).where(BotJob.id == row.id, BotJob.status == 'pending').values(values)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1]
+    session.commit()
+    return [(row.id, row.kind, json.loads(row.payload)) for row in claimed]
+
+
+def complete_jobs(session, results):
+    """
+    Acquitte des tâches réclamées, en une seule requête, puis valide la transaction.
+
+    Args:
+        results: Liste de tuples (id, succès, compte rendu)
+    """
+    if not results:
+        return
+    now = datetime.datetime.utcnow()
+    session.execute(update(BotJob), [{
+        'id': job_id,
+        'status': 'done' if ok else 'failed',
+        'result': str(detail)[:1000] if detail is not None else None,
+        'finished_at': now,
+    } for job_id, ok, detail in results])
+    session.commit()
+
+
+def requeue_stale_jobs(session, now=None):
+    """
+    Remet en attente les tâches restées 'running' trop longtemps (consommateur
+    arrêté), ou les marque en échec après MAX_ATTEMPTS tentatives.
+
+    Returns:
+        Tuple (tâches remises en attente, tâches abandonnées)
+    """
+    now = now or datetime.datetime.utcnow()
+    stale = (BotJob.status == 'running', BotJob.claimed_at < now - STALE_AFTER)
+    failed = session.query(BotJob).filter(*stale, BotJob.attempts >= MAX_ATTEMPTS).update(
+        {BotJob.status: 'failed', BotJob.result: 'Abandonnée après plusieurs tentatives', BotJob.finished_at: now},
+        synchronize_session=False)
+    requeued = session.query(BotJob).filter(*stale).update(
+        {BotJob.status: 'pending', BotJob.claimed_at: None}, synchronize_session=False)
+    session.commit()
+    return requeued, failed
+
+
+def purge_finished_jobs(session, older_than=datetime.timedelta(days=30)):
+    """Supprime les tâches terminées depuis plus de `older_than`; renvoie leur nombre."""
+    cutoff = datetime.datetime.utcnow() - older_than
+    deleted = session.query(BotJob).filter(
+        BotJob.status.in_(('done', 'failed')), BotJob.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    session.commit()
+    return deleted
+
+
+def pending_count(session):
+    """Nombre de tâches en attente"""
+    return session.query(func.count(BotJob.id)).filter(BotJob.status == 'pending').scalar() or 0
+
+
+class JobConsumer:
+    """
+    Exécute les tâches réclamées avec un gestionnaire asynchrone par type:
+    `handler(payload) -> compte rendu`; une exception marque la tâche en échec.
+    Le cog `bridge` en est l'implémentation réelle; un faux consommateur ne
+    fournit que des gestionnaires factices.
+    """
+
+    def __init__(self, session_factory, handlers, batch_size=CLAIM_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.batch_size = batch_size
+
+    async def run_once(self):
+        """
+        Traite un lot de tâches en attente.
+
+        Returns:
+            Nombre de tâches traitées
+        """
+        session = self.session_factory()
+        try:
+            jobs = claim_jobs(session, self.batch_size)
+            results = []
+            for job_id, kind, payload in jobs:
+                handler = self.handlers.get(kind)
+                if handler is None:
+                    results.append((job_id, False, f"Type de tâche non pris en charge: {kind}"))
+                    continue
+                try:
+                    results.append((job_id, True, await handler(payload)))
+                except Exception as e:
+                    logger.warning(f"Échec de la tâche {job_id} ({kind}): {e}")
+                    results.append((job_id, False, str(e) or type(e).__name__))
+            complete_jobs(session, results)
+            return len(jobs)
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    import sys
+    import asyncio
+
+    if '--fake' not in sys.argv:
+        print("Usage: python job_bridge.py --fake   (faux bot qui acquitte les tâches sans les exécuter)")
+        sys.exit(1)
+
+    from app import create_app, db
+
+    async def fake_handler(payload):
+        return f"Simulé: {json.dumps(payload, ensure_ascii=False)[:200]}"
+
+    async def consume_forever():
+        consumer = JobConsumer(db.session, dict.fromkeys(JOB_KINDS, fake_handler))
+        while True:
+            handled = await consumer.run_once()
+            if handled:
+                print(f"{handled} tâche(s) acquittée(s)")
+            await asyncio.sleep(0 if handled else 2)
+
+    logging.basicConfig(level=logging.INFO)
+    with create_app().app_context():
+        try:
+            asyncio.run(consume_forever())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,172 @@
+"""
+Métriques en direct du bot partagées avec le site via un fichier mappé en mémoire.
+
+Le bot publie plusieurs fois par seconde un instantané binaire de taille fixe
+(ping, serveurs, membres, connexions vocales, morceau en cours...) dans un petit
+fichier; l'application web le lit directement dans la projection mémoire, sans
+requête SQL ni service réseau.
+
+La cohérence est assurée par un seqlock: l'écrivain (unique) rend le numéro de
+séquence impair pendant l'écriture puis pair une fois terminée; un lecteur qui
+voit un numéro impair ou différent avant et après sa lecture recommence.
+"""
+import os
+import mmap
+import time
+import struct
+
+MAGIC = b'LSLM'
+# Version du format (à incrémenter si la disposition des champs change)
+FORMAT_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.environ.get('LIVE_METRICS_PATH', os.path.join(BASE_DIR, 'instance', 'live_metrics.bin'))
+
+# En-tête: signature, version, taille des données, numéro de séquence
+HEADER = struct.Struct('<4sHHQ')
+SEQ_OFFSET = 8
+
+# Données: horodatages (epoch), ping, compteurs, titre en cours (UTF-8, complété par des zéros)
+TITLE_SIZE = 128
+PAYLOAD = struct.Struct(f'<dddIIIIQ{TITLE_SIZE}s')
+FIELDS = ('published_at', 'started_at', 'latency_ms', 'guilds', 'members', 'voice_connections',
+          'playing', 'commands_total', 'now_playing')
+
+SIZE = HEADER.size + PAYLOAD.size
+
+# Au-delà de ce délai sans publication, le bot est considéré comme arrêté
+STALE_AFTER = 5.0
+
+
+class SnapshotWriter:
+    """Publie les instantanés (côté bot, un seul écrivain par fichier)."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != SIZE:
+                os.ftruncate(fd, SIZE)
+            self._map = mmap.mmap(fd, SIZE, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        magic, version, _, seq = HEADER.unpack_from(self._map, 0)
+        # Reprendre la séquence d'un fichier existant (toujours paire au repos)
+        self._seq = seq + (seq & 1) if magic == MAGIC and version == FORMAT_VERSION else 0
+        HEADER.pack_into(self._map, 0, MAGIC, FORMAT_VERSION, PAYLOAD.size, self._seq)
+
+    def publish(self, *, started_at, latency_ms=0.0, guilds=0, members=0, voice_connections=0,
+                playing=0, commands_total=0, now_playing=''):
+        """Écrit un nouvel instantané."""
+        title = (now_playing or '').encode('utf-8')[:TITLE_SIZE]
+        self._seq += 1
+        struct.pack_into('<Q', self._map, SEQ_OFFSET, self._seq)
+        PAYLOAD.pack_into(self._map, HEADER.size, time.time(), started_at, latency_ms, guilds, members,
+                          voice_connections, playing, commands_total, title)
+        self._seq += 1
+        struct.pack_into('<Q', self._map, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        self._map.close()
+
+
+class SnapshotReader:
+    """Lit le dernier instantané publié (côté web), sans copie du fichier."""
+
+    def __init__(self, path=DEFAULT_PATH, retries=100):
+        self.path = path
+        self.retries = retries
+        self._map = None
+        self._last = None  # Dernières valeurs cohérentes lues
+
+    def _open(self):
+        try:
+            with open(self.path, 'rb') as source:
+                if os.fstat(source.fileno()).st_size < SIZE:
+                    return None
+                return mmap.mmap(source.fileno(), SIZE, access=mmap.ACCESS_READ)
+        except OSError:
+            return None
+
+    def read(self):
+        """
+        Returns:
+            Dict des champs de l'instantané (plus 'age' et 'stale'), ou None si le
+            bot n'a encore rien publié ou si le format n'est pas reconnu
+        """
+        if self._map is None:
+            self._map = self._open()
+            if self._map is None:
+                return None
+
+        for _ in range(self.retries):
+            magic, version, size, seq = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION or size != PAYLOAD.size:
+                return None
+            if seq & 1:
+                continue  # écriture en cours
+            values = PAYLOAD.unpack_from(self._map, HEADER.size)
+            if struct.unpack_from('<Q', self._map, SEQ_OFFSET)[0] == seq:
+                self._last = values
+                break
+        else:
+            # Écrivain trop actif: se contenter du dernier instantané cohérent
+            values = self._last
+            if values is None:
+                return None
+
+        snapshot = dict(zip(FIELDS, values))
+        snapshot['now_playing'] = snapshot['now_playing'].rstrip(b'\0').decode('utf-8', 'ignore')
+        snapshot['age'] = max(0.0, time.time() - snapshot['published_at'])
+        snapshot['stale'] = snapshot['age'] > STALE_AFTER
+        return snapshot
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def public_view(snapshot):
+    """Représentation JSON d'un instantané pour le site (API et flux SSE)."""
+    if snapshot is None:
+        return {'online': False}
+    return {
+        'online': not snapshot['stale'],
+        'age': round(snapshot['age'], 2),
+        'uptime_seconds': int(time.time() - snapshot['started_at']),
+        'ping': round(snapshot['latency_ms']),
+        'guilds': snapshot['guilds'],
+        'members': snapshot['members'],
+        'voice_connections': snapshot['voice_connections'],
+        'playing': snapshot['playing'],
+        'now_playing': snapshot['now_playing'],
+        'commands_total': snapshot['commands_total'],
+    }
+
+
+class LiveMetrics:
+    """Accès aux métriques en direct du bot depuis l'application Flask."""
+
+    def __init__(self, app=None):
+        self._reader = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Enregistre l'extension auprès de l'application Flask."""
+        app.config.setdefault('LIVE_METRICS_PATH', DEFAULT_PATH)
+        app.extensions['live_metrics'] = self
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = SnapshotReader(app.config['LIVE_METRICS_PATH'])
+
+    def snapshot(self):
+        """Dernier instantané publié par le bot, ou None (voir SnapshotReader.read)."""
+        if self._reader is None:
+            return None
+        return self._reader.read()
+
+
+live_metrics = LiveMetrics()
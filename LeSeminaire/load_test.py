@@ -0,0 +1,388 @@
+"""
+Test de charge hors ligne du site LeSéminaire[BOT].
+
+Rejoue un mélange pondéré de routes (pages publiques, statistiques, pages
+d'administration avec une session connectée) contre une base SQLite jetable
+remplie de données réalistes, puis affiche le débit et les percentiles de
+latence (p50/p95/p99) par route. Le code de sortie est 1 si un seuil est dépassé
+ou si les performances régressent par rapport à une référence enregistrée.
+
+Par défaut, les requêtes passent par le client de test Flask depuis plusieurs
+threads (aucun serveur nécessaire); avec --url, elles visent un serveur déjà
+démarré (gunicorn par exemple) dont la base a été remplie avec --seed-only.
+
+Exemples:
+    python load_test.py --threads 8 --duration 20
+    python load_test.py --save-baseline instance/load_baseline.json
+    python load_test.py --baseline instance/load_baseline.json --tolerance 0.25
+    DATABASE_URL=sqlite:////tmp/charge.db python load_test.py --seed-only
+    python load_test.py --url http://127.0.0.1:5000
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import threading
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Mélange de routes rejouées: (nom, chemin, poids, connexion admin requise)
+ROUTE_MIX = [
+    ('index', '/', 25, False),
+    ('stats', '/stats', 20, False),
+    ('realtime', '/stats/realtime', 12, False),
+    ('resources', '/resources', 15, False),
+    ('commands', '/commands', 5, False),
+    ('live_api', '/api/stats/live', 8, False),
+    ('admin_dashboard', '/admin/dashboard', 4, True),
+    ('admin_resources', '/admin/resources', 4, True),
+    ('admin_users', '/admin/users', 3, True),
+    ('admin_messages', '/admin/messages', 3, True),
+    ('admin_resources_search', '/admin/resources?q=guide', 1, True),
+]
+
+# Seuils par défaut (millisecondes, et taux d'erreur maximal par route)
+DEFAULT_THRESHOLDS = {
+    '*': {'p95': 250, 'p99': 500, 'error_rate': 0.0},
+    'realtime': {'p95': 400, 'p99': 800},
+}
+
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'admin123'
+
+
+def seed_database(session, scale=1, rng=None):
+    """
+    Remplit la base avec un volume de données représentatif (multiplié par `scale`),
+    puis calcule les résumés de la page /stats.
+    """
+    import models
+    import stats_rollup
+    from sqlalchemy import insert
+
+    rng = rng or random.Random(42)
+    now = datetime.datetime.utcnow()
+    categories = list(models.ResourceCategory)
+
+    def ago(max_days):
+        return now - datetime.timedelta(seconds=rng.randint(0, max_days * 86400))
+
+    session.execute(insert(models.Resource), [{
+        'title': f"{rng.choice(['Guide', 'Tutoriel', 'Formation', 'Astuces'])} {i}",
+        'url': f"https://example.org/ressource/{i}",
+        'description': "Ressource de démonstration pour le test de charge",
+        'category': rng.choice(categories),
+        'added_by': f"membre{i % 50}",
+        'added_at': ago(365),
+        'approved': rng.random() > 0.1,
+    } for i in range(300 * scale)])
+
+    session.execute(insert(models.MusicSample), [{
+        'title': f"Sample {i}",
+        'url': f"https://example.org/sample/{i}.wav",
+        'bpm': rng.randint(70, 160),
+        'genre': rng.choice(['Hip-hop', 'House', 'Jazz', 'Trap']),
+        'duration': rng.randint(5, 240),
+        'added_by': f"membre{i % 50}",
+        'added_at': ago(365),
+    } for i in range(200 * scale)])
+
+    session.execute(insert(models.UserStat), [{
+        'timestamp': ago(30),
+        'guild_id': str(1000 + i % 5),
+        'user_id': str(10 ** 17 + i % (500 * scale)),
+        'username': f"membre{i % (500 * scale)}",
+        'message_count': rng.randint(0, 400),
+        'voice_minutes': rng.randint(0, 600),
+        'reaction_count': rng.randint(0, 100),
+    } for i in range(5000 * scale)])
+
+    command_categories = {'play': 'music', 'skip': 'music', 'queue': 'music', 'help': 'general',
+                          'ressources': 'resources', 'sample': 'resources', 'ban': 'moderation'}
+    command_names = list(command_categories)
+    session.execute(insert(models.CommandStat), [{
+        'command_name': name,
+        'category': command_categories[name],
+        'guild_id': str(1000 + i % 5),
+        'user_id': str(10 ** 17 + i % 500),
+        'used_at': ago(60),
+        'success': rng.random() > 0.05,
+    } for i, name in enumerate(rng.choice(command_names) for _ in range(20000 * scale))])
+
+    session.execute(insert(models.PlaylistEntry), [{
+        'url': f"https://youtube.com/watch?v={i % 150}",
+        'title': f"Morceau {i % 150}",
+        'duration': rng.randint(120, 420),
+        'added_by': f"membre{i % 50}",
+        'guild_id': str(1000 + i % 5),
+        'added_at': ago(60),
+        'played_at': ago(60),
+    } for i in range(3000 * scale)])
+
+    session.execute(insert(models.ServerStat), [{
+        'timestamp': ago(30),
+        'guild_id': str(1000 + i % 5),
+        'type': 'hourly',
+        'data': json.dumps({'message_count': rng.randint(0, 300), 'active_users': rng.randint(0, 80)}),
+    } for i in range(24 * 30 * scale)])
+
+    session.execute(insert(models.ContactMessage), [{
+        'name': f"Visiteur {i}",
+        'email': f"visiteur{i}@example.org",
+        'subject': "Demande d'information",
+        'message': "Message de démonstration pour le test de charge.",
+        'created_at': ago(90),
+        'is_read': rng.random() > 0.3,
+        'priority': rng.choice([0, 0, 0, 1, 2]),
+    } for i in range(1000 * scale)])
+
+    session.commit()
+    stats_rollup.run_rollup(session)
+
+
+class TestClientTarget:
+    """Requêtes via le client de test Flask (un client, donc une session, par thread)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self, admin):
+        client = self.app.test_client()
+        if admin:
+            client.post('/admin/login', data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+
+        def get(path):
+            response = client.get(path)
+            body = response.get_data()
+            response.close()
+            return response.status_code, len(body)
+        return get
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTarget:
+    """Requêtes HTTP vers un serveur démarré séparément."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def session(self, admin):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                             _NoRedirect())
+        if admin:
+            form = urllib.parse.urlencode({'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}).encode()
+            try:
+                opener.open(self.base_url + '/admin/login', form).read()
+            except urllib.error.HTTPError as e:
+                if e.code != 302:
+                    raise
+
+        def get(path):
+            try:
+                with opener.open(self.base_url + path) as response:
+                    return response.status, len(response.read())
+            except urllib.error.HTTPError as e:
+                return e.code, 0
+        return get
+
+
+def percentile(sorted_values, fraction):
+    """Percentile au rang le plus proche d'une liste triée."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def run_load(target, threads=8, duration=10.0, warmup=1.0, seed=1):
+    """
+    Exécute le mélange de routes pendant `duration` secondes (après `warmup`
+    secondes non mesurées) depuis `threads` threads.
+
+    Returns:
+        Dict {'duration', 'routes': {nom: {'count', 'errors', 'p50', 'p95', 'p99', 'rps'}}, 'total': {...}}
+    """
+    names = [name for name, _, _, _ in ROUTE_MIX]
+    weights = [weight for _, _, weight, _ in ROUTE_MIX]
+    routes = {name: (path, admin) for name, path, _, admin in ROUTE_MIX}
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    timing = {}
+
+    def start_clock():
+        now = time.perf_counter()
+        timing['measure_from'] = now + warmup
+        timing['end'] = now + warmup + duration
+
+    # Les sessions (connexions admin) sont ouvertes avant le départ commun
+    start_barrier = threading.Barrier(threads, action=start_clock)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        public, admin = target.session(False), target.session(True)
+        local_samples = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        start_barrier.wait()
+        while time.perf_counter() < timing['end']:
+            name = rng.choices(names, weights)[0]
+            path, needs_admin = routes[name]
+            began = time.perf_counter()
+            status, _ = (admin if needs_admin else public)(path)
+            elapsed = time.perf_counter() - began
+            if began < timing['measure_from']:
+                continue
+            local_samples[name].append(elapsed * 1000)
+            # Une redirection (vers la page de connexion notamment) compte comme une erreur
+            if status != 200:
+                local_errors[name] += 1
+        with lock:
+            for name in names:
+                samples[name].extend(local_samples[name])
+                errors[name] += local_errors[name]
+
+    workers = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    def summarize(values, error_count):
+        values = sorted(values)
+        return {
+            'count': len(values),
+            'errors': error_count,
+            'error_rate': round(error_count / len(values), 4) if values else 0.0,
+            'rps': round(len(values) / duration, 1),
+            'p50': round(percentile(values, 0.50), 2),
+            'p95': round(percentile(values, 0.95), 2),
+            'p99': round(percentile(values, 0.99), 2),
+        }
+
+    report = {'duration': duration, 'threads': threads, 'routes': {}}
+    for name in names:
+        report['routes'][name] = summarize(samples[name], errors[name])
+    report['total'] = summarize([v for values in samples.values() for v in values], sum(errors.values()))
+    return report
+
+
+def check_report(report, thresholds=None, baseline=None, tolerance=0.25):
+    """
+    Compare un rapport aux seuils absolus et, le cas échéant, à une référence.
+
+    Returns:
+        Liste des dépassements (vide si tout est conforme)
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    failures = []
+    for name, stats in report['routes'].items():
+        if not stats['count']:
+            continue
+        limits = dict(thresholds.get('*', {}), **thresholds.get(name, {}))
+        for metric, limit in limits.items():
+            if stats.get(metric, 0) > limit:
+                failures.append(f"{name}: {metric} = {stats[metric]} > {limit}")
+        reference = (baseline or {}).get('routes', {}).get(name)
+        if reference and reference['count']:
+            for metric in ('p50', 'p95', 'p99'):
+                allowed = reference[metric] * (1 + tolerance)
+                if stats[metric] > allowed:
+                    failures.append(f"{name}: {metric} = {stats[metric]} ms, référence {reference[metric]} ms "
+                                    f"(+{tolerance:.0%} toléré)")
+    if baseline and report['total']['rps'] < baseline['total']['rps'] * (1 - tolerance):
+        failures.append(f"débit total = {report['total']['rps']} req/s, référence {baseline['total']['rps']} req/s")
+    return failures
+
+
+def format_report(report):
+    lines = [f"{'Route':<24}{'Requêtes':>10}{'Erreurs':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+    for name, stats in list(report['routes'].items()) + [('TOTAL', report['total'])]:
+        lines.append(f"{name:<24}{stats['count']:>10}{stats['errors']:>9}{stats['rps']:>9}"
+                     f"{stats['p50']:>9}{stats['p95']:>9}{stats['p99']:>9}")
+    return "\n".join(lines)
+
+
+def create_seeded_app(scale, database_url=None):
+    """Application configurée sur une base SQLite jetable (ou `database_url`) remplie de données."""
+    if database_url is None:
+        handle, path = tempfile.mkstemp(prefix='lebot-charge-', suffix='.db')
+        os.close(handle)
+        database_url = f"sqlite:///{path}"
+    from app import create_app, db
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        # La connexion admin de chaque thread ne doit pas être limitée
+        'RATE_LIMIT_ENABLED': False,
+    })
+    with app.app_context():
+        seed_database(db.session, scale)
+    return app, database_url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge du site LeSéminaire[BOT]")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="Durée mesurée (secondes)")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Échauffement non mesuré (secondes)")
+    parser.add_argument('--scale', type=int, default=1, help="Multiplicateur du volume de données")
+    parser.add_argument('--url', help="Viser un serveur déjà démarré au lieu du client de test")
+    parser.add_argument('--no-cache', action='store_true', help="Désactiver le cache de pages (client de test)")
+    parser.add_argument('--seed-only', action='store_true', help="Remplir la base DATABASE_URL et quitter")
+    parser.add_argument('--thresholds', help="Fichier JSON de seuils {route|'*': {métrique: limite}}")
+    parser.add_argument('--baseline', help="Rapport JSON de référence pour détecter les régressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Régression tolérée (fraction)")
+    parser.add_argument('--save-baseline', help="Enregistrer le rapport comme nouvelle référence")
+    parser.add_argument('--json', action='store_true', help="Afficher le rapport au format JSON")
+    args = parser.parse_args(argv)
+
+    if args.seed_only:
+        _, database_url = create_seeded_app(args.scale, os.environ.get('DATABASE_URL'))
+        print(f"Base remplie: {database_url}")
+        return 0
+
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        app, database_url = create_seeded_app(args.scale)
+        app.config['PAGE_CACHE_ENABLED'] = not args.no_cache
+        target = TestClientTarget(app)
+        print(f"Base de test: {database_url}", file=sys.stderr)
+
+    report = run_load(target, args.threads, args.duration, args.warmup)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+
+    thresholds = None
+    if args.thresholds:
+        with open(args.thresholds, encoding='utf-8') as source:
+            thresholds = json.load(source)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            baseline = json.load(source)
+
+    failures = check_report(report, thresholds, baseline, args.tolerance)
+    for failure in failures:
+        print(f"ÉCHEC {failure}", file=sys.stderr)
+    if not args.url:
+        os.remove(database_url[len('sqlite:///'):])
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -109,7 +109,17 @@ def run_discord_bot():
         print(f"ERREUR lors du démarrage du bot Discord: {e}")
 
 # Fonction pour démarrer l'application web
-    return app  # Pour Gunicorn
+def run_web_app(port=None):
+    from app import serve
+    serve(port)
+
+
+def __getattr__(name):
+    """Compatibilité avec `gunicorn main:app`: l'application est créée par app.create_app()"""
+    if name == 'app':
+        import app as web
+        return web.app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Point d'entrée principal
 if __name__ == "__main__":
@@ -123,10 +133,14 @@ if __name__ == "__main__":
         # Si nous sommes dans le workflow "Discord Bot Runner", démarrer le bot Discord
         if os.environ.get("DISCORD_BOT") == "1" or os.environ.get("RUN_DISCORD_BOT") == "1":
             run_discord_bot()
+        else:
+            run_web_app()
   
     else:
         # Si des arguments sont fournis, les traiter comme avant
         if sys.argv[1] == "bot":
             # Mode bot Discord
             run_discord_bot()
-     
+        elif sys.argv[1] in ("web", "web8080"):
+            # Mode application web (port 8080 par défaut)
+            run_web_app(8080 if sys.argv[1] == "web8080" else None)
@@ -8,7 +8,7 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from app import db
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, Enum, Index, LargeBinary, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 
 # Utilisation de la base SQLAlchemy définie dans app.py
@@ -35,11 +35,17 @@ class Resource(Base):
     title = Column(String(100), nullable=False)
     url = Column(String(500), nullable=False)
     description = Column(Text, nullable=True)
-    category = Column(Enum(ResourceCategory), default=ResourceCategory.GENERAL)
+    category = Column(Enum(ResourceCategory), default=ResourceCategory.GENERAL, index=True)
     tags = Column(String(200), nullable=True)
     added_by = Column(String(100), nullable=True)  # ID Discord ou nom d'utilisateur
-    added_at = Column(DateTime, default=datetime.datetime.utcnow)
-    approved = Column(Boolean, default=True)
+    added_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow,
+                      server_default=func.now(), index=True)
+    approved = Column(Boolean, default=True, index=True)
+    
+    __table_args__ = (
+        # Recherche par préfixe insensible à la casse (interface d'administration)
+        Index('ix_resources_title_lower', func.lower(title)),
+    )
     
     def __repr__(self):
         return f"<Resource '{self.title}' ({self.category.value})>"
@@ -54,11 +60,16 @@ class MusicSample(Base):
     description = Column(Text, nullable=True)
     bpm = Column(Integer, nullable=True)
     key = Column(String(10), nullable=True)  # Tonalité musicale
-    genre = Column(String(50), nullable=True)
+    genre = Column(String(50), nullable=True, index=True)
     tags = Column(String(200), nullable=True)
     duration = Column(Integer, nullable=True)  # Durée en secondes
     added_by = Column(String(100), nullable=False)  # ID Discord
-    added_at = Column(DateTime, default=datetime.datetime.utcnow)
+    added_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow,
+                      server_default=func.now(), index=True)
+    
+    __table_args__ = (
+        Index('ix_music_samples_title_lower', func.lower(title)),
+    )
     
     def __repr__(self):
         return f"<MusicSample '{self.title}' by {self.added_by}>"
@@ -70,10 +81,15 @@ class Collaboration(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
-    status = Column(String(20), default="En cours")  # En cours, Terminé, Abandonné
+    status = Column(String(20), default="En cours", index=True)  # En cours, Terminé, Abandonné
     created_by = Column(String(100), nullable=False)  # ID Discord
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow, server_default=func.now(), index=True)
+    
+    __table_args__ = (
+        Index('ix_collaborations_title_lower', func.lower(title)),
+    )
     
     # Relations
     members = relationship("CollaborationMember", back_populates="collaboration", cascade="all, delete-orphan")
@@ -108,7 +124,7 @@ class PlaylistEntry(Base):
     added_by = Column(String(100), nullable=False)  # ID Discord
     guild_id = Column(String(100), nullable=False)  # ID du serveur Discord
     added_at = Column(DateTime, default=datetime.datetime.utcnow)
-    played_at = Column(DateTime, nullable=True)  # Timestamp de la dernière lecture
+    played_at = Column(DateTime, nullable=True, index=True)  # Timestamp de la dernière lecture
     
     def __repr__(self):
         return f"<PlaylistEntry '{self.title}' by {self.added_by}>"
@@ -169,12 +185,19 @@ class ContactMessage(Base):
     phone = Column(String(20), nullable=True)
     ip_address = Column(String(50), nullable=True)
     user_agent = Column(String(255), nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow,
+                        server_default=func.now(), index=True)
     is_read = Column(Boolean, default=False)
     responded = Column(Boolean, default=False)
     responded_at = Column(DateTime, nullable=True)
     response_text = Column(Text, nullable=True)
-    priority = Column(Integer, default=0)  # 0=Normal, 1=Medium, 2=High
+    priority = Column(Integer, nullable=False, default=0, server_default='0')  # 0=Normal, 1=Medium, 2=High
+    
+    __table_args__ = (
+        Index('ix_contact_messages_email_lower', func.lower(email)),
+        # File de tri de la boîte de réception: non lus d'abord, puis priorité et date
+        Index('ix_contact_messages_triage', is_read, priority.desc(), created_at.desc(), id.desc()),
+    )
     
     def __repr__(self):
         return f"<ContactMessage from {self.name} ({self.subject})>"
@@ -189,7 +212,7 @@ class CommandStat(Base):
     category = Column(String(50), nullable=True)
     guild_id = Column(String(100), nullable=False)  # ID du serveur Discord
     user_id = Column(String(100), nullable=False)  # ID Discord
-    used_at = Column(DateTime, default=datetime.datetime.utcnow)
+    used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     success = Column(Boolean, default=True)
     
     def __repr__(self):
@@ -209,6 +232,140 @@ class AdminSettings(Base):
         return f"<AdminSettings {self.setting_key}>"
 
 
+class Counter(Base):
+    """
+    Compteur maintenu de façon incrémentale (ex: messages de contact non lus),
+    pour éviter un COUNT(*) sur la table concernée à chaque affichage.
+    """
+    __tablename__ = 'counters'
+    
+    name = Column(String(100), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    
+    @classmethod
+    def get(cls, session, name):
+        """Valeur courante du compteur `name` (0 s'il n'existe pas encore)"""
+        value = session.query(cls.value).filter(cls.name == name).scalar()
+        return value or 0
+    
+    @classmethod
+    def _upsert(cls, session, name, value, new_value):
+        """
+        Crée le compteur avec `value`, ou s'il existe déjà le passe à `new_value`
+        (expression SQL), en une seule requête INSERT ... ON CONFLICT DO UPDATE:
+        deux workers qui créent le même compteur ne se heurtent pas à la clé primaire.
+        """
+        now = datetime.datetime.utcnow()
+        dialect = session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            # Autres moteurs: UPDATE puis création si le compteur n'existe pas
+            updated = session.query(cls).filter(cls.name == name).update(
+                {cls.value: new_value, cls.updated_at: now}, synchronize_session=False)
+            if not updated:
+                session.add(cls(name=name, value=value))
+            return
+        statement = insert(cls).values(name=name, value=value, updated_at=now)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=[cls.name], set_={'value': new_value, 'updated_at': now}))
+    
+    @classmethod
+    def adjust(cls, session, name, delta):
+        """
+        Ajoute `delta` au compteur dans la transaction de `session`, par une
+        requête atomique (value = value + delta) sans lecture préalable.
+        """
+        if not delta:
+            return
+        cls._upsert(session, name, max(delta, 0), cls.value + delta)
+    
+    @classmethod
+    def reset(cls, session, name, value):
+        """Remplace la valeur du compteur (utilisé pour le resynchroniser)"""
+        cls._upsert(session, name, value, value)
+    
+    def __repr__(self):
+        return f"<Counter {self.name}={self.value}>"
+
+
+class DailyRollup(Base):
+    """
+    Agrégat journalier d'un événement brut (commandes, lectures musicales...),
+    produit par stats_rollup.py à partir des tables d'événements.
+    """
+    __tablename__ = 'daily_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    metric = Column(String(50), nullable=False)  # 'commands', 'songs', 'music_seconds'
+    key = Column(String(500), nullable=False)  # Nom de commande, URL du morceau...
+    label = Column(String(200), nullable=True)
+    category = Column(String(50), nullable=True)
+    value = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('metric', 'day', 'key', name='uq_daily_rollups_metric_day_key'),
+    )
+    
+    def __repr__(self):
+        return f"<DailyRollup {self.metric}:{self.key} {self.day}={self.value}>"
+
+
+class StatSummary(Base):
+    """
+    Ligne précalculée de la page de statistiques publique (une série par `metric`,
+    ordonnée par `position`). La table est reconstruite à chaque passage du rollup.
+    """
+    __tablename__ = 'stat_summaries'
+    
+    id = Column(Integer, primary_key=True)
+    metric = Column(String(50), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    label = Column(String(200), nullable=True)
+    value = Column(Integer, nullable=False, default=0)
+    extra = Column(Text, nullable=True)  # Données complémentaires au format JSON
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_stat_summaries_metric_position', metric, position),
+    )
+    
+    def __repr__(self):
+        return f"<StatSummary {self.metric}[{self.position}] {self.label}={self.value}>"
+
+
+class BotJob(Base):
+    """
+    Tâche soumise par le site au bot (message privé, annonce, diffusion de
+    ressource), consommée par le cog `bridge` (voir job_bridge.py).
+    """
+    __tablename__ = 'bot_jobs'
+    
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(String(32), nullable=False, index=True)  # Lot soumis en une seule requête
+    kind = Column(String(50), nullable=False)  # 'dm', 'announcement', 'resource_broadcast'
+    payload = Column(Text, nullable=False)  # Paramètres au format JSON
+    status = Column(String(20), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    result = Column(Text, nullable=True)  # Compte rendu ou message d'erreur
+    created_by = Column(String(100), nullable=True)  # Administrateur à l'origine de la tâche
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # File d'attente: tâches en attente par ordre d'arrivée
+        Index('ix_bot_jobs_status_id', status, id),
+    )
+    
+    def __repr__(self):
+        return f"<BotJob {self.id} {self.kind} ({self.status})>"
+
+
 class MessagePreference(Base):
     """Modèle pour les préférences de messagerie directe des utilisateurs"""
     __tablename__ = 'message_preferences'
@@ -235,10 +392,80 @@ class ServerStat(Base):
     type = Column(String(50), nullable=False)  # Type de statistique: 'hourly', 'daily', 'weekly'
     data = Column(Text, nullable=True)  # Données JSON encodées
     
+    __table_args__ = (
+        # Historique d'un serveur (chargement du cog analytics, dernier relevé par serveur)
+        Index('ix_server_stats_guild_timestamp', guild_id, timestamp),
+    )
+    
     def __repr__(self):
         return f"<ServerStat {self.type} {self.timestamp.strftime('%Y-%m-%d %H:%M')}>"
 
 
+class ActivitySketch(Base):
+    """
+    Esquisse HyperLogLog des membres actifs: par serveur et par heure (channel_id
+    vide), ou par salon et par jour. Voir sketches.py.
+    """
+    __tablename__ = 'activity_sketches'
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(String(100), nullable=False)  # ID du serveur Discord
+    channel_id = Column(String(100), nullable=True)  # ID du salon (None: tout le serveur)
+    period = Column(String(10), nullable=False)  # 'hour' ou 'day'
+    start = Column(DateTime, nullable=False)  # Début de l'heure ou du jour (UTC)
+    registers = Column(LargeBinary, nullable=False)  # HyperLogLog.to_bytes()
+    
+    __table_args__ = (
+        # Fusion des esquisses d'une période (un serveur, un salon ou tous les serveurs)
+        Index('ix_activity_sketches_period_start', period, start),
+        Index('ix_activity_sketches_guild_period_start', guild_id, period, start),
+    )
+    
+    def __repr__(self):
+        return f"<ActivitySketch {self.guild_id}/{self.channel_id or '*'} {self.period} {self.start:%Y-%m-%d %H:%M}>"
+
+
+class VoiceSessionRecord(Base):
+    """Session vocale en cours, enregistrée pour être reprise après un redémarrage du bot (voir voice_sessions.py)"""
+    __tablename__ = 'voice_sessions'
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(String(100), nullable=False)  # ID du serveur Discord
+    user_id = Column(String(100), nullable=False)  # ID Discord du membre
+    channel_id = Column(String(100), nullable=False)  # Salon vocal actuel
+    started_at = Column(DateTime, nullable=False)  # Connexion (UTC)
+    accrued_until = Column(DateTime, nullable=False)  # Minutes déjà comptées jusqu'à cet instant
+    
+    __table_args__ = (
+        UniqueConstraint('guild_id', 'user_id', name='uq_voice_sessions_guild_user'),
+    )
+    
+    def __repr__(self):
+        return f"<VoiceSessionRecord {self.guild_id}/{self.user_id} depuis {self.started_at:%Y-%m-%d %H:%M}>"
+
+
+class MemberEvent(Base):
+    """Arrivée ou départ d'un membre d'un serveur Discord (rétention, voir retention.py)"""
+    __tablename__ = 'member_events'
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(String(100), nullable=False)  # ID du serveur Discord
+    user_id = Column(String(100), nullable=False)  # ID Discord du membre
+    kind = Column(String(10), nullable=False)  # 'join' ou 'leave'
+    occurred_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # Arrivées et départs d'une période (tous serveurs ou un serveur)
+        Index('ix_member_events_kind_occurred', kind, occurred_at),
+        Index('ix_member_events_guild_kind_occurred', guild_id, kind, occurred_at),
+        # Premier départ d'un membre après son arrivée (cohortes de rétention)
+        Index('ix_member_events_member', guild_id, user_id, kind, occurred_at),
+    )
+    
+    def __repr__(self):
+        return f"<MemberEvent {self.kind} {self.guild_id}/{self.user_id} {self.occurred_at:%Y-%m-%d %H:%M}>"
+
+
 class ChannelStat(Base):
     """Modèle pour les statistiques des canaux Discord"""
     __tablename__ = 'channel_stats'
@@ -262,12 +489,17 @@ class UserStat(Base):
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
     guild_id = Column(String(100), nullable=False)  # ID du serveur Discord
-    user_id = Column(String(100), nullable=False)  # ID Discord
+    user_id = Column(String(100), nullable=False, index=True)  # ID Discord
     username = Column(String(100), nullable=True)  # Nom d'utilisateur (pour référence facile)
     message_count = Column(Integer, default=0)  # Nombre de messages
     voice_minutes = Column(Integer, default=0)  # Minutes en vocal
     reaction_count = Column(Integer, default=0)  # Nombre de réactions
     
+    __table_args__ = (
+        Index('ix_user_stats_guild_user', guild_id, user_id),
+        Index('ix_user_stats_username_lower', func.lower(username)),
+    )
+    
     def __repr__(self):
         return f"<UserStat {self.username or self.user_id} ({self.message_count} messages)>"
 
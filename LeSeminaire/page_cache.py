@@ -0,0 +1,200 @@
+"""
+Module de cache des pages publiques pour LeSéminaire[BOT].
+Met en cache les réponses complètes servies aux visiteurs anonymes ainsi que
+des fragments de templates, avec une durée de vie configurable par route.
+"""
+import time
+import threading
+import logging
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_login import current_user
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+# Durées de vie par défaut (en secondes) des pages mises en cache, par endpoint.
+# Peuvent être surchargées via app.config['PAGE_CACHE_TTLS'].
+DEFAULT_TTLS = {
+    'index': 600,
+    'features': 600,
+    'commands': 600,
+    'commands_doc': 600,
+    'resources': 300,
+    'security': 600,
+    'show_stats': 60,
+}
+
+
+class PageCache:
+    """
+    Cache mémoire (par processus) des pages et fragments de templates.
+
+    Chaque entrée porte des tags permettant une invalidation ciblée, par exemple
+    lorsque les administrateurs modifient les ressources ou les samples.
+    """
+
+    KINDS = ('page', 'fragment', 'data')
+
+    def __init__(self, app=None, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = {}  # {clé: (expiration, valeur, tags)}
+        self._lock = threading.Lock()
+        self._stats = {kind: {'hits': 0, 'misses': 0} for kind in self.KINDS}
+        self._invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Enregistre le cache auprès de l'application Flask."""
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_TTLS', dict(DEFAULT_TTLS))
+        app.extensions['page_cache'] = self
+        app.jinja_env.globals['cached_fragment'] = self.fragment
+
+    # Primitives ---------------------------------------------------------
+
+    def _get(self, key, kind):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._stats[kind]['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._stats[kind]['misses'] += 1
+        return None
+
+    def _set(self, key, value, ttl, tags=()):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value, frozenset(tags))
+            if len(self._entries) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Supprime les entrées expirées, puis les plus anciennes si nécessaire."""
+        now = time.monotonic()
+        for key in [k for k, (exp, _, _) in self._entries.items() if exp <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, *tags):
+        """
+        Invalide toutes les entrées portant au moins un des tags donnés.
+        Sans argument, vide entièrement le cache.
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        wanted = set(tags)
+        with self._lock:
+            if not wanted:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [k for k, (_, _, entry_tags) in self._entries.items() if entry_tags & wanted]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self._invalidations += removed
+        if removed:
+            logger.debug(f"Cache invalidé ({', '.join(tags) or 'tout'}): {removed} entrées")
+        return removed
+
+    def metrics(self):
+        """Retourne les compteurs de succès/échecs et le taux de succès par type d'entrée."""
+        with self._lock:
+            result = {'entries': len(self._entries), 'invalidations': self._invalidations}
+            for kind, counts in self._stats.items():
+                total = counts['hits'] + counts['misses']
+                result[kind] = {
+                    'hits': counts['hits'],
+                    'misses': counts['misses'],
+                    'hit_rate': round(counts['hits'] / total, 4) if total else 0.0,
+                }
+        return result
+
+    # Helpers haut niveau ------------------------------------------------
+
+    def _enabled(self):
+        return current_app.config.get('PAGE_CACHE_ENABLED', True)
+
+    def memoize(self, key, ttl, fn, tags=()):
+        """Retourne la valeur en cache pour `key`, ou la calcule avec `fn()`."""
+        if not self._enabled():
+            return fn()
+        value = self._get(('data', key), 'data')
+        if value is None:
+            value = fn()
+            self._set(('data', key), value, ttl, tags)
+        return value
+
+    def fragment(self, name, ttl, *key_parts, caller=None, tags=()):
+        """
+        Met en cache le rendu d'un bloc de template.
+
+        Utilisation dans un template:
+            {% call cached_fragment('realtime:servers', 30) %} ... {% endcall %}
+        """
+        if not self._enabled():
+            return caller()
+        key = ('fragment', name) + tuple(str(part) for part in key_parts)
+        html = self._get(key, 'fragment')
+        if html is None:
+            html = Markup(caller())
+            self._set(key, html, ttl, tags)
+        return html
+
+    def cached_page(self, ttl=300, query_args=(), tags=()):
+        """
+        Décorateur de vue: met en cache la réponse complète pour les visiteurs anonymes.
+
+        Args:
+            ttl: Durée de vie par défaut (surchargée par PAGE_CACHE_TTLS[endpoint])
+            query_args: Paramètres de requête qui font partie de la clé de cache
+            tags: Tags utilisés pour l'invalidation
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._cacheable_request():
+                    return view(*args, **kwargs)
+
+                key = self._page_key(query_args)
+                cached = self._get(key, 'page')
+                if cached is not None:
+                    body, status, headers = cached
+                    response = current_app.response_class(body, status=status, headers=headers)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    endpoint_ttl = current_app.config['PAGE_CACHE_TTLS'].get(request.endpoint, ttl)
+                    headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'set-cookie']
+                    self._set(key, (response.get_data(), response.status_code, headers), endpoint_ttl, tags)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def _cacheable_request(self):
+        """Seules les requêtes GET anonymes sans message flash en attente sont mises en cache."""
+        if not self._enabled() or request.method not in ('GET', 'HEAD'):
+            return False
+        if current_user.is_authenticated:
+            return False
+        return '_flashes' not in session
+
+    @staticmethod
+    def _page_key(query_args):
+        args = tuple((name, request.args.get(name, '')) for name in sorted(query_args))
+        return ('page', request.endpoint) + args
+
+
+page_cache = PageCache()
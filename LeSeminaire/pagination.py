@@ -0,0 +1,231 @@
+"""
+Pagination par curseur (keyset) pour les listes de l'interface d'administration.
+
+Contrairement à OFFSET, chaque page est obtenue par une recherche dans l'index de
+la colonne de tri à partir de la dernière valeur vue: le coût d'une page reste
+constant quelle que soit la taille de la table ou la position dans la liste.
+
+La position suivant le curseur est une seule comparaison de valeurs de ligne,
+`(tri, id) < (:tri, :id)`, que SQLite comme PostgreSQL traduisent en intervalle
+de l'index (tri, id). Les colonnes de tri doivent donc être NOT NULL: une ligne
+NULL ne satisfait aucune comparaison et disparaîtrait après la première page,
+et l'ordre des NULL diffère d'un moteur à l'autre.
+"""
+import enum
+import json
+import base64
+import datetime
+
+from sqlalchemy import and_, tuple_
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+# Borne haute pour les recherches par préfixe sur un index (voir prefix_filter)
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+class KeysetPage:
+    """Une page de résultats et les curseurs permettant de naviguer autour."""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _dump_value(value):
+    if isinstance(value, datetime.datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, enum.Enum):
+        return ['str', value.name]
+    return ['v', value]
+
+
+def _load_value(item):
+    kind, value = item
+    if kind == 'dt':
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values):
+    """Encode les valeurs de tri d'une ligne en un curseur opaque utilisable dans une URL."""
+    raw = json.dumps([_dump_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Décode un curseur produit par encode_cursor.
+
+    Returns:
+        La liste des valeurs, ou None si le curseur est absent ou invalide
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii'))
+        return [_load_value(item) for item in json.loads(raw)]
+    except (ValueError, TypeError):
+        return None
+
+
+def clamp_per_page(value, default=DEFAULT_PER_PAGE):
+    """Borne le nombre d'éléments par page demandé par le client."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(MAX_PER_PAGE, value))
+
+
+def prefix_filter(expression, prefix):
+    """
+    Filtre « commence par » exprimé comme un intervalle, ce qui permet au moteur
+    d'utiliser un index B-tree sur `expression` (contrairement à LIKE '%...%').
+    """
+    return and_(expression >= prefix, expression < prefix + PREFIX_UPPER_BOUND)
+
+
+def _check_not_null(expr):
+    """Refuse une colonne de tri nullable (les expressions calculées sont supposées non nulles)"""
+    column = getattr(expr, 'expression', expr)
+    if getattr(column, 'nullable', False):
+        raise ValueError(f"Colonne de tri nullable: {column} (à déclarer NOT NULL)")
+
+
+def _keyset_condition(key_exprs, values, forward):
+    """
+    Condition « strictement après `values` » sur la clé composite `key_exprs`,
+    dans le sens décroissant si `forward` est vrai, croissant sinon.
+    """
+    if len(key_exprs) == 1:
+        key, value = key_exprs[0], values[0]
+    else:
+        key, value = tuple_(*key_exprs), tuple_(*values, types=[expr.type for expr in key_exprs])
+    return key < value if forward else key > value
+
+
+def paginate_keyset(query, sort_expr, id_expr=None, descending=True,
+                    after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Récupère une page de `query` triée sur (sort_expr, id_expr).
+
+    Args:
+        query: Requête SQLAlchemy (ORM) déjà filtrée
+        sort_expr: Expression de tri, idéalement couverte par un index, ou tuple
+            d'expressions triées dans le même sens (clé composite)
+        id_expr: Colonne unique départageant les égalités (None si sort_expr est unique)
+        descending: Ordre de tri principal
+        after: Curseur de la dernière ligne de la page précédente
+        before: Curseur de la première ligne de la page suivante (navigation arrière)
+        per_page: Nombre d'éléments par page
+
+    Returns:
+        Un objet KeysetPage
+    """
+    sort_exprs = tuple(sort_expr) if isinstance(sort_expr, (tuple, list)) else (sort_expr,)
+    key_exprs = sort_exprs + ((id_expr,) if id_expr is not None else ())
+    key_labels = [f'_keyset_{position}' for position in range(len(key_exprs))]
+    key_columns = [expr.label(label) for expr, label in zip(key_exprs, key_labels)]
+    for expr in key_exprs:
+        _check_not_null(expr)
+    single_entity = len(query.column_descriptions) == 1
+
+    after_values = decode_cursor(after)
+    before_values = decode_cursor(before) if after_values is None else None
+    if after_values is not None and len(after_values) != len(key_exprs):
+        after_values = None
+    if before_values is not None and len(before_values) != len(key_exprs):
+        before_values = None
+    backwards = before_values is not None
+
+    # "forward" signifie: dans le sens de l'ordre principal (décroissant par défaut)
+    if after_values is not None:
+        query = query.filter(_keyset_condition(key_exprs, after_values, forward=descending))
+    elif backwards:
+        query = query.filter(_keyset_condition(key_exprs, before_values, forward=not descending))
+
+    scan_descending = descending != backwards
+    order = [expr.desc() if scan_descending else expr.asc() for expr in key_exprs]
+    rows = query.add_columns(*key_columns).order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_of(row):
+        mapping = row._mapping
+        return encode_cursor([mapping[label] for label in key_labels])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = cursor_of(rows[-1])
+        if (backwards and has_more) or after_values is not None:
+            prev_cursor = cursor_of(rows[0])
+
+    items = [row[0] for row in rows] if single_entity else rows
+    return KeysetPage(items, per_page, next_cursor, prev_cursor)
+
+
+class ListingParams:
+    """
+    Paramètres de tri, de recherche et de pagination d'une liste, lus depuis la
+    query string (sort, order, q, per_page, after, before).
+    """
+
+    CURSOR_ARGS = ('after', 'before')
+
+    def __init__(self, args, sorts, default_sort, default_order='desc'):
+        """
+        Args:
+            args: request.args
+            sorts: {clé de tri: expression SQL indexée, ou tuple d'expressions}
+            default_sort: Clé de tri par défaut
+            default_order: 'asc' ou 'desc'
+        """
+        self.args = args
+        self.sorts = sorts
+        self.sort = args.get('sort') if args.get('sort') in sorts else default_sort
+        order = args.get('order', default_order)
+        self.order = order if order in ('asc', 'desc') else default_order
+        self.search = args.get('q', '').strip()
+        self.per_page = clamp_per_page(args.get('per_page'))
+
+    def paginate(self, query, id_expr=None):
+        """Applique le tri et la pagination par curseur à `query`."""
+        return paginate_keyset(query, self.sorts[self.sort], id_expr,
+                               descending=self.order == 'desc',
+                               after=self.args.get('after'),
+                               before=self.args.get('before'),
+                               per_page=self.per_page)
+
+    def url_args(self, **overrides):
+        """Paramètres d'URL courants (sans curseur), complétés par `overrides`."""
+        values = {k: v for k, v in self.args.items() if k not in self.CURSOR_ARGS and v != ''}
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return values
+
+    def sort_args(self, key):
+        """Paramètres d'URL pour trier sur `key` (inverse l'ordre si déjà trié dessus)."""
+        order = 'asc' if self.sort == key and self.order == 'desc' else 'desc'
+        return self.url_args(sort=key, order=order)
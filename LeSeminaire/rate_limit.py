@@ -0,0 +1,201 @@
+"""
+Limitation de débit par adresse IP (seau à jetons) pour LeSéminaire[BOT].
+Protège les routes coûteuses (formulaire de contact, connexion admin) en
+rejetant les rafales avant tout accès à la base ou calcul de hash.
+"""
+import time
+import threading
+import logging
+from functools import wraps
+
+from flask import current_app, request, render_template
+from werkzeug.exceptions import TooManyRequests
+
+logger = logging.getLogger(__name__)
+
+# Limites par défaut: {nom: (capacité du seau, période de recharge complète en secondes)}.
+# Peuvent être surchargées via app.config['RATE_LIMITS'].
+DEFAULT_LIMITS = {
+    'contact': (5, 600),       # 5 envois en rafale, puis 1 toutes les 2 minutes
+    'admin_login': (10, 300),  # 10 tentatives en rafale, puis 1 toutes les 30 secondes
+}
+
+# Script Lua appliquant le seau à jetons de façon atomique côté Redis
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - stamp) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'stamp', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class MemoryBuckets:
+    """Seaux à jetons conservés en mémoire (propres à chaque processus)."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}  # {clé: [jetons, horodatage]}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """
+        Consomme un jeton du seau `key`.
+
+        Returns:
+            Tuple (autorisé, jetons restants)
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._sweep(now, rate, capacity)
+                bucket = self._buckets[key] = [float(capacity), now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            bucket[0], bucket[1] = tokens, now
+            return allowed, tokens
+
+    def _sweep(self, now, rate, capacity):
+        """Oublie les seaux redevenus pleins (clients inactifs), sinon les plus anciens."""
+        idle = [key for key, (tokens, stamp) in self._buckets.items()
+                if tokens + (now - stamp) * rate >= capacity]
+        for key in idle:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            oldest = sorted(self._buckets, key=lambda k: self._buckets[k][1])
+            for key in oldest[:len(oldest) // 2]:
+                del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBuckets:
+    """Seaux à jetons partagés entre processus et machines via Redis."""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def take(self, key, capacity, rate, now):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, now])
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class RateLimiter:
+    """
+    Limiteur de débit par IP et par route.
+
+    Le stockage est en mémoire par défaut; si RATE_LIMIT_STORAGE_URL pointe vers
+    un serveur Redis (et que le paquet `redis` est installé), les seaux sont
+    partagés entre tous les workers.
+
+    L'adresse du client est request.remote_addr: derrière un reverse proxy,
+    régler TRUSTED_PROXIES pour qu'elle soit lue dans X-Forwarded-For (voir
+    create_app), sinon tous les clients partagent le seau du proxy.
+    """
+
+    def __init__(self, app=None, clock=time.time):
+        self.storage = MemoryBuckets()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Enregistre le limiteur auprès de l'application Flask."""
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMITS', dict(DEFAULT_LIMITS))
+        app.config.setdefault('RATE_LIMIT_STORAGE_URL', None)
+        app.extensions['rate_limiter'] = self
+
+        storage_url = app.config['RATE_LIMIT_STORAGE_URL']
+        if storage_url:
+            try:
+                self.storage = RedisBuckets(storage_url)
+            except ImportError:
+                logger.warning("Paquet redis absent: limitation de débit conservée en mémoire")
+
+        app.register_error_handler(429, self._too_many_requests)
+
+    def _count(self, name, allowed):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'allowed': 0, 'rejected': 0})
+            stats['allowed' if allowed else 'rejected'] += 1
+
+    def hit(self, name, key):
+        """
+        Consomme un jeton de la limite `name` pour `key`.
+
+        Returns:
+            Tuple (autorisé, secondes avant le prochain jeton)
+        """
+        capacity, period = current_app.config['RATE_LIMITS'][name]
+        rate = capacity / period
+        allowed, tokens = self.storage.take(f'{name}:{key}', capacity, rate, self.clock())
+        self._count(name, allowed)
+        retry_after = 0 if allowed else max(1, int((1 - tokens) / rate + 0.999))
+        return allowed, retry_after
+
+    def limit(self, name, methods=('POST',)):
+        """
+        Décorateur de vue: rejette (429) les requêtes `methods` qui dépassent la
+        limite `name` pour l'adresse IP du client, avant d'exécuter la vue.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if current_app.config['RATE_LIMIT_ENABLED'] and request.method in methods:
+                    allowed, retry_after = self.hit(name, request.remote_addr or 'inconnu')
+                    if not allowed:
+                        logger.warning(f"Limite '{name}' atteinte pour {request.remote_addr}")
+                        raise TooManyRequests(retry_after=retry_after)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def metrics(self):
+        """Compteurs d'acceptations et de rejets par limite."""
+        with self._lock:
+            limits = {name: dict(stats) for name, stats in self._stats.items()}
+        return {
+            'storage': type(self.storage).__name__,
+            'limits': limits,
+        }
+
+    def reset(self):
+        """Vide les seaux et les compteurs."""
+        self.storage.clear()
+        with self._lock:
+            self._stats.clear()
+
+    @staticmethod
+    def _too_many_requests(error):
+        response = current_app.make_response((render_template('429.html'), 429))
+        if error.retry_after is not None:
+            response.headers['Retry-After'] = str(error.retry_after)
+        return response
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,138 @@
+"""
+Arrivées, départs et rétention des membres des serveurs Discord.
+
+Le cog `analytics` enregistre chaque arrivée et chaque départ dans la table
+member_events (écritures groupées). La rétention est calculée par cohortes
+hebdomadaires: les membres arrivés la même semaine (du lundi au dimanche, UTC)
+forment une cohorte, et la rétention à k semaines est la part d'entre eux qui
+n'étaient pas repartis au début de la k-ième semaine suivante.
+
+Le regroupement est fait par la base: chaque arrivée est rangée dans sa
+semaine et dans celle de son premier départ (expressions CASE sur les débuts
+de semaine, portables entre SQLite et PostgreSQL), puis comptée par couple
+de semaines. Seule une petite matrice cohortes x semaines revient en Python.
+"""
+import datetime
+
+from sqlalchemy import Date, and_, case, func, select
+from sqlalchemy.orm import aliased
+
+# Semaines de rétention calculées et nombre de cohortes prises en compte
+RETENTION_WEEKS = 4
+RETENTION_COHORTS = 12
+
+
+def week_start(moment):
+    """Lundi 00:00 de la semaine de `moment`"""
+    return datetime.datetime.combine(moment.date() - datetime.timedelta(days=moment.weekday()), datetime.time())
+
+
+def member_counts(session, since, guild_id=None):
+    """
+    Arrivées et départs depuis `since`.
+
+    Returns:
+        Tuple (arrivées, départs)
+    """
+    from models import MemberEvent
+
+    query = session.query(MemberEvent.kind, func.count(MemberEvent.id)).filter(MemberEvent.occurred_at >= since)
+    if guild_id is not None:
+        query = query.filter(MemberEvent.guild_id == str(guild_id))
+    counts = dict(query.group_by(MemberEvent.kind).all())
+    return counts.get('join', 0), counts.get('leave', 0)
+
+
+def daily_joins(session, days=30, now=None, guild_id=None):
+    """
+    Arrivées par jour sur les `days` derniers jours (aujourd'hui compris).
+
+    Returns:
+        Liste de (date, arrivées), du plus ancien au plus récent
+    """
+    from models import MemberEvent
+
+    today = (now or datetime.datetime.utcnow()).date()
+    first = today - datetime.timedelta(days=days - 1)
+    day = func.date(MemberEvent.occurred_at, type_=Date)
+    query = session.query(day, func.count(MemberEvent.id)).filter(
+        MemberEvent.kind == 'join',
+        MemberEvent.occurred_at >= datetime.datetime.combine(first, datetime.time()))
+    if guild_id is not None:
+        query = query.filter(MemberEvent.guild_id == str(guild_id))
+    per_day = {}
+    for value, count in query.group_by(day):
+        # SQLite renvoie la date sous forme de texte
+        if isinstance(value, str):
+            value = datetime.date.fromisoformat(value)
+        per_day[value] = count
+    return [(first + datetime.timedelta(days=offset), per_day.get(first + datetime.timedelta(days=offset), 0))
+            for offset in range(days)]
+
+
+def cohort_retention(session, guild_id=None, weeks=RETENTION_WEEKS, cohorts=RETENTION_COHORTS, now=None):
+    """
+    Rétention hebdomadaire des cohortes d'arrivées des `cohorts` dernières semaines.
+
+    Returns:
+        Dict {
+            'cohorts': [{'week': lundi, 'size': arrivées, 'retention': [% à 1..k semaines]}],
+            'curve': [% à 1..weeks semaines, toutes cohortes assez anciennes confondues, ou None],
+        }
+    """
+    from models import MemberEvent
+
+    now = now or datetime.datetime.utcnow()
+    current = week_start(now)
+    starts = [current - datetime.timedelta(weeks=index) for index in range(cohorts - 1, -1, -1)]
+    never = cohorts + weeks  # Semaine fictive des membres jamais repartis
+
+    def week_index(column):
+        return case(*[(column >= start, index) for index, start in reversed(list(enumerate(starts)))],
+                    else_=-1)
+
+    join, leave = aliased(MemberEvent), aliased(MemberEvent)
+    first_leave = select(func.min(leave.occurred_at)).where(and_(
+        leave.guild_id == join.guild_id,
+        leave.user_id == join.user_id,
+        leave.kind == 'leave',
+        leave.occurred_at >= join.occurred_at,
+    )).scalar_subquery()
+    conditions = [join.kind == 'join', join.occurred_at >= starts[0]]
+    if guild_id is not None:
+        conditions.append(join.guild_id == str(guild_id))
+    per_member = select(
+        week_index(join.occurred_at).label('cohort'),
+        case((first_leave.is_(None), never), else_=week_index(first_leave)).label('left_week'),
+    ).where(*conditions).subquery()
+    matrix = session.execute(
+        select(per_member.c.cohort, per_member.c.left_week, func.count())
+        .group_by(per_member.c.cohort, per_member.c.left_week)
+    ).all()
+
+    sizes = [0] * cohorts
+    remaining = [[0] * (weeks + 1) for _ in range(cohorts)]  # [cohorte][k]: encore là au début de la semaine cohorte + k
+    for cohort, left_week, count in matrix:
+        if cohort < 0:
+            continue
+        sizes[cohort] += count
+        for k in range(1, weeks + 1):
+            if left_week >= cohort + k:
+                remaining[cohort][k] += count
+
+    result, eligible, retained = [], [0] * (weeks + 1), [0] * (weeks + 1)
+    for cohort, start in enumerate(starts):
+        if not sizes[cohort]:
+            continue
+        # Une cohorte n'a de rétention à k semaines qu'une fois la semaine cohorte + k commencée
+        horizon = min(weeks, cohorts - 1 - cohort)
+        result.append({
+            'week': start,
+            'size': sizes[cohort],
+            'retention': [round(remaining[cohort][k] / sizes[cohort] * 100, 1) for k in range(1, horizon + 1)],
+        })
+        for k in range(1, horizon + 1):
+            eligible[k] += sizes[cohort]
+            retained[k] += remaining[cohort][k]
+    curve = [round(retained[k] / eligible[k] * 100, 1) if eligible[k] else None for k in range(1, weeks + 1)]
+    return {'cohorts': result, 'curve': curve}
@@ -0,0 +1,34 @@
+"""
+Enregistrement différé des routes de l'application web LeSéminaire[BOT].
+
+Les vues sont déclarées au niveau du module (`@web.route(...)`) sans application
+Flask existante, puis rejouées sur l'application créée par `create_app`. Contrairement
+à un Blueprint, les noms d'endpoints ne sont pas préfixés: `url_for('index')` reste
+valable dans tous les templates.
+"""
+
+
+class RouteRegistry:
+    """Collecte les décorateurs de routes et de gestionnaires d'erreurs."""
+
+    def __init__(self):
+        self._deferred = []  # [(méthode de Flask, args, kwargs, fonction)]
+
+    def _record(self, method, *args, **kwargs):
+        def decorator(func):
+            self._deferred.append((method, args, kwargs, func))
+            return func
+        return decorator
+
+    def route(self, rule, **options):
+        """Équivalent différé de `Flask.route`."""
+        return self._record('route', rule, **options)
+
+    def errorhandler(self, code_or_exception):
+        """Équivalent différé de `Flask.errorhandler`."""
+        return self._record('errorhandler', code_or_exception)
+
+    def init_app(self, app):
+        """Enregistre toutes les vues collectées sur `app`."""
+        for method, args, kwargs, func in self._deferred:
+            getattr(app, method)(*args, **kwargs)(func)
@@ -0,0 +1,281 @@
+"""
+Index de recherche par préfixe pour l'autocomplétion du site LeSéminaire[BOT].
+
+Les titres des ressources approuvées et des samples, ainsi que leurs tags et
+genres, sont conservés en mémoire dans une liste triée de clés normalisées
+(minuscules, sans accents). Une suggestion se résume à une recherche
+dichotomique (bisect) suivie d'un parcours des clés qui commencent par le
+préfixe saisi: quelques microsecondes, sans accès à la base.
+
+L'index est construit au démarrage (warm_up) puis mis à jour entrée par entrée
+par les vues d'administration. Les écritures faites ailleurs (autres workers,
+bot) incrémentent le compteur SEARCH_VERSION_COUNTER: chaque processus compare
+au plus toutes les `SEARCH_INDEX_REFRESH` secondes sa version à ce compteur et
+se reconstruit s'il a pris du retard.
+"""
+import time
+import bisect
+import logging
+import threading
+import unicodedata
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Compteur (table counters) incrémenté à chaque modification des ressources ou des samples
+SEARCH_VERSION_COUNTER = 'search_index_version'
+
+DEFAULT_REFRESH = 5.0
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Nombre maximal de clés parcourues pour un préfixe très court (classement des tags/genres)
+MAX_SCAN = 500
+
+
+def normalize(text):
+    """Forme de recherche d'un texte: minuscules, sans accents ni espaces superflus."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def split_tags(tags):
+    """Tags séparés par des virgules -> liste de tags non vides"""
+    return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+
+def mark_changed(session):
+    """
+    Signale une modification des ressources ou des samples aux autres processus,
+    dans la transaction de `session` (à appeler avant le commit).
+    """
+    from models import Counter
+    Counter.adjust(session, SEARCH_VERSION_COUNTER, 1)
+
+
+def resource_document(resource):
+    """Document indexé pour une ressource (None si elle n'est pas publique)"""
+    if not resource.approved:
+        return None
+    return {
+        'type': 'resource',
+        'id': resource.id,
+        'title': resource.title,
+        'url': resource.url,
+        'category': resource.category.value if resource.category else None,
+        'tags': split_tags(resource.tags),
+        'genres': [],
+    }
+
+
+def sample_document(sample):
+    """Document indexé pour un sample"""
+    return {
+        'type': 'sample',
+        'id': sample.id,
+        'title': sample.title,
+        'url': sample.url,
+        'genre': sample.genre,
+        'bpm': sample.bpm,
+        'tags': split_tags(sample.tags),
+        'genres': [sample.genre] if sample.genre else [],
+    }
+
+
+class SearchIndex:
+    """
+    Index trié (par processus) des titres, tags et genres.
+
+    Clés de `_keys`, triées:
+        (terme, 'title', (type, id, position))  un titre, à partir de son mot n° position
+        (terme, 'tag' | 'genre', terme)         un tag ou un genre, présent une seule fois
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._reset()
+        self.version = None
+        self._checked_at = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Enregistre l'index auprès de l'application Flask."""
+        app.config.setdefault('SEARCH_INDEX_REFRESH', DEFAULT_REFRESH)
+        app.extensions['search_index'] = self
+
+    def _reset(self):
+        self._keys = []
+        self._documents = {}  # {(type, id): document}
+        self._labels = {}     # {('tag' | 'genre', terme): [libellé, nombre de documents]}
+
+    # Construction et mises à jour ------------------------------------------
+
+    def build(self, session):
+        """Reconstruit entièrement l'index depuis la base."""
+        from models import Resource, MusicSample, Counter
+
+        version = Counter.get(session, SEARCH_VERSION_COUNTER)
+        documents = [resource_document(resource) for resource in session.query(Resource).filter(Resource.approved.is_(True))]
+        documents += [sample_document(sample) for sample in session.query(MusicSample)]
+
+        with self._lock:
+            self._reset()
+            keys = []
+            for document in documents:
+                keys.extend(self._add_document(document, collect=True))
+            keys.sort()
+            self._keys = keys
+            self.version = version
+            self._checked_at = time.monotonic()
+        logger.info(f"Index de recherche construit: {len(documents)} entrées, {len(keys)} clés")
+
+    def _title_keys(self, document):
+        words = normalize(document['title']).split()
+        ref = (document['type'], document['id'])
+        return [(' '.join(words[position:]), 'title', ref + (position,)) for position in range(len(words))]
+
+    def _add_document(self, document, collect=False):
+        """Ajoute un document (verrou tenu); avec `collect`, renvoie les clés au lieu de les insérer."""
+        new_keys = self._title_keys(document)
+        for kind in ('tag', 'genre'):
+            for label in document[kind + 's']:
+                term = normalize(label)
+                if not term:
+                    continue
+                entry = self._labels.get((kind, term))
+                if entry is None:
+                    self._labels[(kind, term)] = [label, 1]
+                    new_keys.append((term, kind, term))
+                else:
+                    entry[1] += 1
+        self._documents[(document['type'], document['id'])] = document
+        if collect:
+            return new_keys
+        for key in new_keys:
+            bisect.insort(self._keys, key)
+        return []
+
+    def _remove_key(self, key):
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def _remove_document(self, doc_type, doc_id):
+        document = self._documents.pop((doc_type, doc_id), None)
+        if document is None:
+            return
+        for key in self._title_keys(document):
+            self._remove_key(key)
+        for kind in ('tag', 'genre'):
+            for label in document[kind + 's']:
+                term = normalize(label)
+                entry = self._labels.get((kind, term))
+                if entry is None:
+                    continue
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._labels[(kind, term)]
+                    self._remove_key((term, kind, term))
+
+    def upsert(self, document, doc_type=None, doc_id=None):
+        """
+        Remplace (ou ajoute) un document. Un document None retire l'entrée
+        `doc_type`/`doc_id` (ex: ressource qui n'est plus approuvée).
+        """
+        with self._lock:
+            if document is None:
+                self._remove_document(doc_type, doc_id)
+            else:
+                self._remove_document(document['type'], document['id'])
+                self._add_document(document)
+
+    def remove(self, doc_type, doc_id):
+        """Retire un document de l'index."""
+        with self._lock:
+            self._remove_document(doc_type, doc_id)
+
+    def changed(self, session, *updates):
+        """
+        Applique des mises à jour locales après un commit qui a appelé mark_changed():
+        `updates` sont des tuples (type, id, document ou None pour une suppression).
+        La version locale n'avance que si aucune autre écriture ne s'est intercalée;
+        sinon la prochaine vérification reconstruira l'index.
+        """
+        from models import Counter
+
+        for doc_type, doc_id, document in updates:
+            self.upsert(document, doc_type, doc_id)
+        current = Counter.get(session, SEARCH_VERSION_COUNTER)
+        with self._lock:
+            if self.version is not None and current == self.version + 1:
+                self.version = current
+
+    def ensure_fresh(self, session):
+        """Construit l'index au premier appel, ou le reconstruit si la base a changé ailleurs."""
+        from models import Counter
+
+        now = time.monotonic()
+        refresh = current_app.config.get('SEARCH_INDEX_REFRESH', DEFAULT_REFRESH)
+        if self.version is not None and now - self._checked_at < refresh:
+            return
+        if self.version is None or Counter.get(session, SEARCH_VERSION_COUNTER) != self.version:
+            self.build(session)
+        else:
+            self._checked_at = now
+
+    # Requêtes -------------------------------------------------------------
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        Suggestions pour un préfixe: titres (début de titre d'abord, puis début
+        d'un mot du titre), tags et genres (les plus utilisés d'abord).
+
+        Returns:
+            Dict {'titles': [...], 'tags': [...], 'genres': [...]}
+        """
+        term = normalize(prefix)
+        result = {'titles': [], 'tags': [], 'genres': []}
+        if not term:
+            return result
+
+        titles, labels = {}, {'tag': [], 'genre': []}
+        with self._lock:
+            keys = self._keys
+            position = bisect.bisect_left(keys, (term,))
+            end = min(len(keys), position + MAX_SCAN)
+            while position < end and keys[position][0].startswith(term):
+                key_term, kind, ref = keys[position]
+                position += 1
+                if kind == 'title':
+                    doc_ref, word = ref[:2], ref[2]
+                    document = self._documents[doc_ref]
+                    rank = (word > 0, len(document['title']), key_term)
+                    if doc_ref not in titles or rank < titles[doc_ref][0]:
+                        titles[doc_ref] = (rank, document)
+                else:
+                    label, count = self._labels[(kind, ref)]
+                    labels[kind].append((-count, key_term, label))
+
+        for _, document in sorted(titles.values(), key=lambda item: item[0])[:limit]:
+            entry = {name: value for name, value in document.items() if name not in ('tags', 'genres')}
+            result['titles'].append(entry)
+        for kind in ('tag', 'genre'):
+            result[kind + 's'] = [{'name': label, 'count': -count}
+                                  for count, _, label in sorted(labels[kind])[:limit]]
+        return result
+
+    def metrics(self):
+        """Taille de l'index"""
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'keys': len(self._keys),
+                'labels': len(self._labels),
+                'version': self.version,
+            }
+
+
+search_index = SearchIndex()
@@ -0,0 +1,184 @@
+"""
+Esquisses probabilistes de taille fixe pour l'analytique de LeSéminaire[BOT].
+
+HyperLogLog estime le nombre d'éléments distincts (ici, de membres actifs) vus
+dans un flux, avec une mémoire constante: 2**precision registres d'un octet,
+pour une erreur type de 1.04 / sqrt(2**precision) (1.6 % à la précision 12).
+Deux esquisses de même précision se fusionnent registre par registre: l'union
+de n'importe quelles heures ou journées s'obtient sans relire les événements.
+
+SpaceSaving suit les éléments les plus fréquents (emojis, salons) avec au plus
+`capacity` compteurs. Un élément absent remplace le moins compté, dont il hérite
+du nombre: chaque compte est un majorant, d'au plus `error` de trop. Tout
+élément plus fréquent que N / capacity (N: total du flux) est retenu. Les
+résumés de plusieurs heures se fusionnent en un résumé de même taille.
+"""
+import math
+import zlib
+
+MASK64 = (1 << 64) - 1
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+DEFAULT_PRECISION = 12
+
+# Compteurs par défaut d'un résumé SpaceSaving
+DEFAULT_CAPACITY = 50
+
+# 2 ** -rang, précalculé pour l'estimation
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+def hash64(value):
+    """Hachage 64 bits d'un entier (finaliseur splitmix64), réparti uniformément même pour des identifiants proches"""
+    x = (value + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class HyperLogLog:
+    """Esquisse HyperLogLog d'identifiants entiers (identifiants Discord)."""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"Précision HyperLogLog invalide: {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision) if registers is None else bytearray(registers)
+        if len(self.registers) != 1 << precision:
+            raise ValueError("Nombre de registres incohérent avec la précision")
+        self._shift = 64 - precision
+        self._mask = (1 << self._shift) - 1
+
+    def add(self, value):
+        """Ajoute un identifiant."""
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed):
+        """Ajoute un identifiant déjà haché par hash64 (un seul hachage pour plusieurs esquisses)."""
+        index = hashed >> self._shift
+        rank = self._shift - (hashed & self._mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, other):
+        """Fusionne `other` (même précision) dans cette esquisse."""
+        if other.precision != self.precision:
+            raise ValueError("Fusion d'esquisses HyperLogLog de précisions différentes")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Nombre estimé d'identifiants distincts"""
+        registers = self.registers
+        size = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(map(_INVERSE_POWERS.__getitem__, registers))
+        if estimate <= 2.5 * size:
+            # Petites cardinalités: comptage linéaire sur les registres vides
+            zeros = registers.count(0)
+            if zeros:
+                estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+    def __bool__(self):
+        return any(self.registers)
+
+    def to_bytes(self):
+        """Forme compacte (précision puis registres, compressés) pour la base"""
+        return zlib.compress(bytes([self.precision]) + bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        raw = zlib.decompress(blob)
+        return cls(raw[0], raw[1:])
+
+    @classmethod
+    def merged(cls, sketches, precision=DEFAULT_PRECISION):
+        """Union d'esquisses (objets ou formes compactes); vide si `sketches` l'est"""
+        result = None
+        for sketch in sketches:
+            if isinstance(sketch, (bytes, bytearray, memoryview)):
+                sketch = cls.from_bytes(bytes(sketch))
+            if result is None:
+                result = cls(sketch.precision, sketch.registers)
+            else:
+                result.update(sketch)
+        return result if result is not None else cls(precision)
+
+
+class SpaceSaving:
+    """Éléments les plus fréquents d'un flux (algorithme Space-Saving)."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}  # {élément: nombre (majorant)}
+        self.errors = {}  # {élément: surestimation maximale}
+
+    def add(self, item, count=1):
+        """Compte `count` occurrences de `item`."""
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Remplacer l'élément le moins compté (plein: au plus `capacity` comparaisons)
+            victim = min(counts, key=counts.__getitem__)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[item] = floor + count
+            self.errors[item] = floor
+
+    def floor(self):
+        """Majorant du nombre d'occurrences d'un élément non suivi"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def update(self, other):
+        """
+        Fusionne `other` dans ce résumé: un élément absent de l'un des deux y
+        compte pour le plancher de celui-ci (floor()), puis seuls les `capacity`
+        éléments les plus comptés sont conservés.
+        """
+        own_floor, other_floor = self.floor(), other.floor()
+        merged = {}
+        for item in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(item, own_floor) + other.counts.get(item, other_floor)
+            error = (self.errors[item] if item in self.counts else own_floor) + \
+                    (other.errors[item] if item in other.counts else other_floor)
+            merged[item] = (count, error)
+        kept = sorted(merged.items(), key=lambda entry: entry[1][0], reverse=True)[:self.capacity]
+        self.counts = {item: count for item, (count, _) in kept}
+        self.errors = {item: error for item, (_, error) in kept}
+        return self
+
+    def top(self, limit=None):
+        """Éléments les plus comptés: liste de (élément, nombre, surestimation maximale)"""
+        ranked = sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)[:limit]
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def to_list(self):
+        """Forme JSON: [[élément, nombre, surestimation], ...]"""
+        return [list(entry) for entry in self.top()]
+
+    @classmethod
+    def from_list(cls, entries, capacity=DEFAULT_CAPACITY):
+        summary = cls(capacity)
+        for item, count, error in entries or ():
+            summary.counts[item] = count
+            summary.errors[item] = error
+        return summary
+
+    @classmethod
+    def merged(cls, summaries, capacity=DEFAULT_CAPACITY):
+        """Fusion de résumés (objets ou formes JSON)"""
+        result = cls(capacity)
+        for summary in summaries:
+            if not isinstance(summary, cls):
+                summary = cls.from_list(summary, capacity)
+            result.update(summary)
+        return result
@@ -1,3 +1,6 @@
 #!/bin/bash
+# Génération des fichiers statiques empreintés et précompressés
+python static_assets.py
+
 echo "Démarrage de l'application web sur le port 8080..."
 python main.py web8080
\ No newline at end of file
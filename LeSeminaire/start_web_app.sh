@@ -1,5 +1,8 @@
 #!/bin/bash
 # Script pour démarrer l'application web Flask
 
+# Génération des fichiers statiques empreintés et précompressés
+python static_assets.py
+
 echo "Démarrage de l'application web sur le port 8080..."
-gunicorn --bind 0.0.0.0:8080 --reuse-port --reload main:app
\ No newline at end of file
+gunicorn --bind 0.0.0.0:8080 --reuse-port 'app:create_app()'
\ No newline at end of file
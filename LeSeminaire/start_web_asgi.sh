@@ -0,0 +1,10 @@
+#!/bin/bash
+
+# Script pour démarrer l'application web en mode ASGI (uvicorn, port 8080)
+# Dépendances: pip install .[asgi]
+
+# Génération des fichiers statiques empreintés et précompressés
+python static_assets.py
+
+echo "Démarrage de l'application web (ASGI) sur le port 8080..."
+uvicorn asgi:app --http asgi:H11NoDelayProtocol --host 0.0.0.0 --port 8080 --workers 2
@@ -0,0 +1,160 @@
+"""
+Pipeline des fichiers statiques pour l'interface web de LeSéminaire[BOT].
+
+Étape de build: les fichiers de static/css et static/js sont copiés dans
+static/dist sous un nom contenant l'empreinte de leur contenu, accompagnés de
+variantes précompressées (gzip, et brotli si le module est installé).
+
+À l'exécution, url_for('static', ...) est réécrit vers les noms empreintés et
+ces fichiers sont servis avec des en-têtes de cache immuables.
+
+Utilisation:
+    python static_assets.py
+"""
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import mimetypes
+
+from flask import request, send_from_directory, abort
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_DIRS = ('css', 'js')
+HASH_LENGTH = 12
+
+# Un an: les noms de fichiers changent à chaque modification du contenu
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Encodages précompressés, par ordre de préférence
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _fingerprint(path):
+    """Calcule l'empreinte SHA-256 (tronquée) du contenu d'un fichier."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def build(static_dir=STATIC_DIR):
+    """
+    Génère les fichiers empreintés, leurs variantes compressées et le manifeste.
+
+    Args:
+        static_dir: Dossier static de l'application
+
+    Returns:
+        Le manifeste {chemin source: chemin empreinté}, relatif à static_dir
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        root_dir = os.path.join(static_dir, source_dir)
+        for dirpath, _, filenames in os.walk(root_dir):
+            for filename in sorted(filenames):
+                source_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+
+                stem, ext = os.path.splitext(rel_path)
+                hashed_rel = f"{DIST_DIRNAME}/{stem}.{_fingerprint(source_path)}{ext}"
+                target_path = os.path.join(static_dir, *hashed_rel.split('/'))
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copyfile(source_path, target_path)
+
+                with open(source_path, 'rb') as f:
+                    content = f.read()
+                # mtime=0 pour des archives reproductibles d'un build à l'autre
+                with open(target_path + '.gz', 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target_path + '.br', 'wb') as f:
+                        f.write(brotli.compress(content, quality=11))
+
+                manifest[rel_path] = hashed_rel
+
+    os.makedirs(dist_dir, exist_ok=True)
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        logger.warning("Module brotli non installé: seules les variantes gzip ont été générées")
+    logger.info(f"{len(manifest)} fichiers statiques empreintés dans {dist_dir}")
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Charge le manifeste généré par build(), ou un manifeste vide s'il est absent."""
+    path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    """
+    Branche le pipeline sur l'application: réécriture des URLs statiques et
+    service des fichiers empreintés avec négociation de l'encodage.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions['static_assets'] = manifest
+    if not manifest:
+        logger.info("Aucun manifeste de fichiers statiques: les fichiers sources sont servis tels quels")
+
+    @app.url_defaults
+    def fingerprinted_static_url(endpoint, values):
+        """Remplace le nom de fichier par sa version empreintée dans url_for('static', ...)"""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.get(values['filename'], values['filename'])
+
+    dist_folder = os.path.join(app.static_folder, DIST_DIRNAME)
+
+    @app.route(f"{app.static_url_path}/{DIST_DIRNAME}/<path:filename>", endpoint='static_dist')
+    def static_dist(filename):
+        """Sert un fichier empreinté, précompressé si le client l'accepte"""
+        if filename == MANIFEST_NAME:
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        served_name, encoding = filename, None
+        for candidate, suffix in ENCODINGS:
+            if accepted[candidate] and os.path.isfile(os.path.join(dist_folder, filename + suffix)):
+                served_name, encoding = filename + suffix, candidate
+                break
+
+        response = send_from_directory(dist_folder, served_name, mimetype=mimetype,
+                                       max_age=31536000)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    result = build()
+    for source, target in sorted(result.items()):
+        print(f"{source} -> {target}")
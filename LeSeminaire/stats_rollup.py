@@ -0,0 +1,245 @@
+"""
+Agrégation périodique des statistiques publiques de LeSéminaire[BOT].
+
+Les événements bruts (CommandStat, lectures de PlaylistEntry) sont d'abord
+résumés par jour dans `daily_rollups`, de façon incrémentale: seuls les derniers
+jours sont recalculés à chaque passage. La table `stat_summaries` est ensuite
+reconstruite à partir de ces agrégats; la page /stats n'y lit qu'une soixantaine
+de lignes au lieu de parcourir les événements.
+
+Le bot exécute le rollup toutes les 15 minutes (cog d'analytique); il peut aussi
+être lancé à la main ou depuis une tâche cron: `python stats_rollup.py`.
+"""
+import json
+import datetime
+import logging
+
+from sqlalchemy import Date, func, insert, true
+
+from models import (CommandStat, DailyRollup, PlaylistEntry, Resource, ResourceCategory,
+                    ServerStat, StatSummary, UserStat)
+
+logger = logging.getLogger(__name__)
+
+# Nombre de jours déjà agrégés recalculés à chaque passage (événements arrivés en retard)
+ROLLUP_OVERLAP_DAYS = 1
+
+WEEKDAYS = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+
+TOP_COMMANDS_LIMIT = 10
+TOP_SONGS_LIMIT = 5
+LATEST_RESOURCES_LIMIT = 5
+
+
+def _rollup_start(session):
+    """Premier jour à recalculer (None: aucun agrégat, tout l'historique est traité)"""
+    last_day = session.query(func.max(DailyRollup.day)).scalar()
+    if last_day is None:
+        return None
+    return last_day - datetime.timedelta(days=ROLLUP_OVERLAP_DAYS)
+
+
+def roll_up_events(session):
+    """
+    Recalcule les agrégats journaliers depuis le dernier jour agrégé (moins le
+    recouvrement), dans la transaction de `session`.
+
+    Returns:
+        Nombre de lignes d'agrégats écrites
+    """
+    start = _rollup_start(session)
+
+    command_day = func.date(CommandStat.used_at, type_=Date).label('day')
+    commands = session.query(
+        command_day, CommandStat.command_name, func.max(CommandStat.category), func.count(CommandStat.id)
+    ).filter(CommandStat.used_at.isnot(None))
+
+    song_day = func.date(PlaylistEntry.played_at, type_=Date).label('day')
+    songs = session.query(
+        song_day, PlaylistEntry.url, func.max(PlaylistEntry.title), func.count(PlaylistEntry.id),
+        func.coalesce(func.sum(PlaylistEntry.duration), 0)
+    ).filter(PlaylistEntry.played_at.isnot(None))
+
+    if start is not None:
+        since = datetime.datetime.combine(start, datetime.time.min)
+        commands = commands.filter(CommandStat.used_at >= since)
+        songs = songs.filter(PlaylistEntry.played_at >= since)
+        session.query(DailyRollup).filter(DailyRollup.day >= start).delete(synchronize_session=False)
+
+    rows = []
+    for day, name, category, uses in commands.group_by(command_day, CommandStat.command_name):
+        rows.append({'day': day, 'metric': 'commands', 'key': name, 'label': name,
+                     'category': category, 'value': uses})
+
+    music_seconds = {}
+    for day, url, title, plays, seconds in songs.group_by(song_day, PlaylistEntry.url):
+        rows.append({'day': day, 'metric': 'songs', 'key': url, 'label': title,
+                     'category': None, 'value': plays})
+        music_seconds[day] = music_seconds.get(day, 0) + int(seconds)
+    for day, seconds in music_seconds.items():
+        rows.append({'day': day, 'metric': 'music_seconds', 'key': '*', 'label': None,
+                     'category': None, 'value': seconds})
+
+    if rows:
+        session.execute(insert(DailyRollup), rows)
+    return len(rows)
+
+
+def _format_duration(seconds):
+    if not seconds:
+        return '-'
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def _summary(metric, position, label, value, extra=None):
+    return {
+        'metric': metric,
+        'position': position,
+        'label': label,
+        'value': int(value or 0),
+        'extra': json.dumps(extra, ensure_ascii=False) if extra is not None else None,
+    }
+
+
+def refresh_summaries(session, now=None, extra_totals=None):
+    """
+    Reconstruit `stat_summaries` à partir des agrégats journaliers et des
+    ressources, dans la transaction de `session`.
+
+    Args:
+        now: Instant de référence (UTC) pour « aujourd'hui » et les 7 derniers jours
+        extra_totals: Totaux supplémentaires connus de l'appelant ({'ping': ms, ...})
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    now = now or datetime.datetime.utcnow()
+    today = now.date()
+    week = [today - datetime.timedelta(days=offset) for offset in range(6, -1, -1)]
+    rows = []
+
+    # Activité des 7 derniers jours
+    per_day = {}
+    recent = session.query(DailyRollup.day, DailyRollup.metric, func.sum(DailyRollup.value)).filter(
+        DailyRollup.day >= week[0], DailyRollup.metric.in_(('commands', 'songs'))
+    ).group_by(DailyRollup.day, DailyRollup.metric)
+    for day, metric, total in recent:
+        per_day[(metric, day)] = total
+    for position, day in enumerate(week):
+        label = WEEKDAYS[day.weekday()]
+        rows.append(_summary('commands_by_day', position, label, per_day.get(('commands', day))))
+        rows.append(_summary('songs_by_day', position, label, per_day.get(('songs', day))))
+
+    # Commandes les plus utilisées et répartition par catégorie
+    uses = func.sum(DailyRollup.value)
+    top_commands = session.query(DailyRollup.key, func.max(DailyRollup.category), uses).filter(
+        DailyRollup.metric == 'commands'
+    ).group_by(DailyRollup.key).order_by(uses.desc(), DailyRollup.key).limit(TOP_COMMANDS_LIMIT).all()
+    for position, (name, category, total) in enumerate(top_commands):
+        rows.append(_summary('top_commands', position, name, total, {'category': category or 'general'}))
+
+    categories = session.query(func.coalesce(DailyRollup.category, 'general'), uses).filter(
+        DailyRollup.metric == 'commands'
+    ).group_by(func.coalesce(DailyRollup.category, 'general')).order_by(uses.desc()).all()
+    for position, (category, total) in enumerate(categories):
+        rows.append(_summary('command_categories', position, category, total))
+
+    # Morceaux les plus joués, avec la durée et l'auteur de leur dernier ajout
+    top_songs = session.query(DailyRollup.key, func.max(DailyRollup.label), uses).filter(
+        DailyRollup.metric == 'songs'
+    ).group_by(DailyRollup.key).order_by(uses.desc(), DailyRollup.key).limit(TOP_SONGS_LIMIT).all()
+    latest_entries = {}
+    if top_songs:
+        entries = session.query(PlaylistEntry.url, PlaylistEntry.duration, PlaylistEntry.added_by).filter(
+            PlaylistEntry.url.in_([url for url, _, _ in top_songs])
+        ).order_by(PlaylistEntry.added_at)
+        for url, duration, added_by in entries:
+            latest_entries[url] = (duration, added_by)
+    for position, (url, title, plays) in enumerate(top_songs):
+        duration, added_by = latest_entries.get(url, (None, None))
+        rows.append(_summary('top_songs', position, title or url, plays, {
+            'url': url, 'duration': _format_duration(duration), 'added_by': added_by or 'Inconnu'}))
+
+    # Ressources approuvées par catégorie (toutes les catégories, même vides)
+    per_category = dict(session.query(Resource.category, func.count(Resource.id)).filter(
+        Resource.approved == true()
+    ).group_by(Resource.category).all())
+    for position, category in enumerate(ResourceCategory):
+        rows.append(_summary('resources_by_category', position, category.value, per_category.get(category)))
+
+    latest_resources = session.query(Resource).filter(Resource.approved == true()).order_by(
+        Resource.added_at.desc(), Resource.id.desc()).limit(LATEST_RESOURCES_LIMIT).all()
+    for position, resource in enumerate(latest_resources):
+        rows.append(_summary('latest_resources', position, resource.title, resource.id, {
+            'description': resource.description,
+            'category': resource.category.value if resource.category else None,
+            'added_by': resource.added_by or 'Inconnu',
+            'added_at': resource.added_at.strftime('%d/%m/%Y') if resource.added_at else None,
+        }))
+
+    # Totaux
+    totals = dict(session.query(DailyRollup.metric, uses).group_by(DailyRollup.metric).all())
+    commands_today = session.query(uses).filter(
+        DailyRollup.metric == 'commands', DailyRollup.day == today).scalar()
+    totals = {
+        'command_count': totals.get('commands'),
+        'commands_today': commands_today,
+        'songs_played': totals.get('songs'),
+        'music_hours': (totals.get('music_seconds') or 0) // 3600,
+        'servers': session.query(func.count(func.distinct(ServerStat.guild_id))).scalar(),
+        'total_users': session.query(func.count(func.distinct(UserStat.user_id))).scalar(),
+        **(extra_totals or {}),
+    }
+    for position, (name, value) in enumerate(totals.items()):
+        rows.append(_summary('totals', position, name, value))
+
+    for row in rows:
+        row['computed_at'] = now
+    session.query(StatSummary).delete(synchronize_session=False)
+    session.execute(insert(StatSummary), rows)
+    return len(rows)
+
+
+def run_rollup(session, now=None, extra_totals=None):
+    """
+    Agrège les nouveaux événements puis reconstruit les résumés, en une seule
+    transaction: la page /stats voit soit l'ancien, soit le nouveau jeu de lignes.
+
+    Returns:
+        Dict {'rollups': lignes d'agrégats écrites, 'summaries': lignes de résumé}
+    """
+    try:
+        rolled = roll_up_events(session)
+        summarized = refresh_summaries(session, now, extra_totals)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    logger.info(f"Rollup des statistiques: {rolled} agrégats journaliers, {summarized} résumés")
+    return {'rollups': rolled, 'summaries': summarized}
+
+
+def load_summaries(session):
+    """
+    Lit les résumés précalculés.
+
+    Returns:
+        Tuple ({metric: [(libellé, valeur, données complémentaires)]}, date de calcul ou None)
+    """
+    summaries = {}
+    computed_at = None
+    for row in session.query(StatSummary).order_by(StatSummary.metric, StatSummary.position):
+        extra = json.loads(row.extra) if row.extra else {}
+        summaries.setdefault(row.metric, []).append((row.label, row.value, extra))
+        computed_at = row.computed_at
+    return summaries, computed_at
+
+
+if __name__ == "__main__":
+    from app import create_app, db
+
+    logging.basicConfig(level=logging.INFO)
+    with create_app().app_context():
+        result = run_rollup(db.session)
+    print(f"{result['rollups']} agrégats journaliers, {result['summaries']} résumés écrits")
@@ -0,0 +1,130 @@
+"""Sauvegarde horaire de l'analytique: rien n'est perdu si l'écriture en base échoue."""
+import os
+import json
+import types
+
+import pytest
+
+from analytics_journal import AnalyticsJournal
+from analytics_store import AnalyticsStore, Bucket
+from app import create_app, db
+from cogs.analytics import ServerAnalytics
+from models import ServerStat
+from voice_sessions import VoiceSessionTracker
+
+BUCKET = Bucket(None, 739000, 2, 14, 2 * 24 + 14)
+
+
+class FlakySession:
+    """Session réelle dont les `failures` premiers commit échouent."""
+
+    def __init__(self, session, failures):
+        self._session = session
+        self.failures = failures
+
+    def commit(self):
+        if self.failures:
+            self.failures -= 1
+            self._session.rollback()
+            raise RuntimeError("base indisponible")
+        self._session.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'analytics.db'}",
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def make_cog(journal, failures):
+    cog = ServerAnalytics.__new__(ServerAnalytics)
+    cog.bot = None
+    cog.journal = journal
+    cog.detector = None
+    cog.store = AnalyticsStore(journal=journal)
+    cog.voice_sessions = VoiceSessionTracker()
+    session = FlakySession(db.session(), failures)
+    cog.db = types.SimpleNamespace(get_session=lambda: session)
+    return cog
+
+
+def saved_messages():
+    return sum(json.loads(stat.data)['message_count'] for stat in db.session.query(ServerStat))
+
+
+def test_journal_segments(tmp_path):
+    path = str(tmp_path / 'journal.log')
+    journal = AnalyticsJournal(path)
+    journal.append(['m', 1])
+    assert journal.rotate() == 1
+    journal.append(['m', 2])
+    # Rien de nouveau: pas de segment vide, le dernier segment clos est renvoyé
+    journal.flush()
+    assert journal.rotate() == 2
+    assert journal.rotate() == 2
+    journal.append(['m', 3])
+    journal.close()
+
+    # Après un redémarrage: segments puis fichier en cours, dans l'ordre
+    journal = AnalyticsJournal(path)
+    assert journal.replay() == [['m', 1], ['m', 2], ['m', 3]]
+    journal.discard(1)
+    assert journal.replay() == [['m', 2], ['m', 3]]
+    assert journal.rotate() == 3
+    journal.discard(3)
+    assert journal.replay() == []
+    journal.close()
+
+
+def test_failed_save_keeps_counters_and_journal(app, tmp_path):
+    journal = AnalyticsJournal(str(tmp_path / 'journal.log'))
+    cog = make_cog(journal, failures=1)
+    for user_id in range(3):
+        cog.store.message(1, BUCKET, user_id, 10)
+
+    cog._save_analytics()
+    assert saved_messages() == 0
+    assert cog.store.guilds[1].message_count == 3
+    assert len(journal.replay()) == 3
+
+    # Événements arrivés après l'échec: écrits dans le segment suivant
+    cog.store.message(1, BUCKET, 7, 10)
+    cog._save_analytics()
+    assert saved_messages() == 4
+    assert cog.store.guilds[1].message_count == 0
+    assert cog.store.guilds[1].hour_users == {}
+    assert journal.replay() == []
+
+    cog.store.message(1, BUCKET, 8, 10)
+    journal.flush()
+    assert len(journal.replay()) == 1
+    journal.close()
+
+
+def test_unload_cleans_up_when_database_is_down(app, tmp_path):
+    journal = AnalyticsJournal(str(tmp_path / 'journal.log'))
+    cog = make_cog(journal, failures=1)
+    cog.member_events = [{'guild_id': '1', 'user_id': '2', 'kind': 'join'}]
+    cog.db.Session = lambda: (_ for _ in ()).throw(RuntimeError("base indisponible"))
+    cog.charts = types.SimpleNamespace(close=lambda: closed.append('charts'))
+    cog.metrics_path = str(tmp_path / 'metrics.json')
+    open(cog.metrics_path, 'w').close()
+    closed = []
+    cog.store.message(1, BUCKET, 1, 10)
+
+    cog.cog_unload()
+    assert closed == ['charts']
+    assert not os.path.exists(cog.metrics_path)
+    # Dernier événement écrit sur disque à la fermeture, rejoué au prochain démarrage
+    assert AnalyticsJournal(journal.path).replay() == [['m', 1, BUCKET.day, BUCKET.week_hour, 1, 10]]
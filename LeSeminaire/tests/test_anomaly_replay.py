@@ -0,0 +1,49 @@
+"""Rejeu de l'historique dans le détecteur d'anomalies: alignement et continuité des heures."""
+import json
+import datetime
+
+import pytest
+
+from anomaly_replay import load_hours
+from app import create_app, db
+from models import MemberEvent, ServerStat
+
+
+@pytest.fixture
+def session(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'replay.db'}",
+    })
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.engine.dispose()
+
+
+def at(hour, minute=0, second=0):
+    return datetime.datetime(2026, 3, 2, hour, minute, second)
+
+
+def test_load_hours_aligns_and_fills(session):
+    # Sauvegarde de 14h00: messages de 13h; arrivées datées de leur heure réelle
+    session.add(ServerStat(timestamp=at(14, 0, 2), guild_id='1', type='hourly',
+                           data=json.dumps({'message_count': 42, 'channel_topk': [[10, 30, 0]]})))
+    # Sauvegarde partielle au déchargement du cog à 16h30, puis sauvegarde de 17h00: toutes deux de 16h
+    session.add(ServerStat(timestamp=at(16, 30), guild_id='1', type='hourly', data=json.dumps({'message_count': 2})))
+    session.add(ServerStat(timestamp=at(17, 0, 1), guild_id='1', type='hourly', data=json.dumps({'message_count': 5})))
+    session.add_all([MemberEvent(guild_id='1', user_id=str(n), kind='join', occurred_at=at(13, 5 * n))
+                     for n in range(3)])
+    session.add(MemberEvent(guild_id='1', user_id='9', kind='leave', occurred_at=at(13, 30)))
+    session.commit()
+
+    hours = load_hours(session, at(12, 10), channels=True, now=at(18, 20))
+    assert [hour for hour, _ in hours] == [at(hour) for hour in range(12, 18)]
+    by_hour = dict(hours)
+    assert set(by_hour[at(13)]) == {('joins', '1', None, 3), ('messages', '1', None, 42),
+                                    ('messages', '1', '10', 30)}
+    # Heures sans sauvegarde ni arrivée: fenêtres vides, pas absentes
+    assert by_hour[at(12)] == by_hour[at(14)] == by_hour[at(15)] == []
+    assert sorted(by_hour[at(16)]) == [('messages', '1', None, 2), ('messages', '1', None, 5)]
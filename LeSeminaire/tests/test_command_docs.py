@@ -0,0 +1,27 @@
+"""Export hors ligne de la documentation des commandes."""
+import asyncio
+
+import discord
+from discord.ext import commands
+
+from command_docs import build_command_docs, docs_only_cogs
+from cogs.analytics import ServerAnalytics
+
+
+def test_docs_only_cogs_skip_init(monkeypatch):
+    def forbidden(self, bot):
+        raise AssertionError("__init__ du cog exécuté pendant l'export")
+
+    monkeypatch.setattr(ServerAnalytics, '__init__', forbidden)
+    monkeypatch.setattr(ServerAnalytics, 'cog_unload', forbidden)
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+
+    async def build():
+        for cog in docs_only_cogs(['cogs.analytics']):
+            await bot.add_cog(cog)
+        return build_command_docs(bot)
+
+    docs = asyncio.run(build())
+    assert 'analytics' in docs['commands']
+    assert 'analytics retention' in docs['commands']
+    assert docs['categories'][0]['name'] == 'ServerAnalytics'
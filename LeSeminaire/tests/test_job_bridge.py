@@ -0,0 +1,90 @@
+"""Passerelle site -> bot: soumission d'un lot, consommation et suivi."""
+import asyncio
+
+import pytest
+from sqlalchemy import event, update
+
+import job_bridge
+from app import create_app, db
+from models import BotJob
+
+
+@pytest.fixture
+def session(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'jobs.db'}",
+    })
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(params=[True, False], ids=['returning', 'per-row'])
+def update_returning(request, session, monkeypatch):
+    """Les deux façons de réclamer: UPDATE ... RETURNING, ou une mise à jour gardée par tâche."""
+    monkeypatch.setattr(session.get_bind().dialect, 'update_returning', request.param)
+    return request.param
+
+
+def test_run_once_completes_batch(session, update_returning):
+    batch_id = job_bridge.submit_jobs(session, 'dm', [
+        {'user_id': 1, 'message': 'bonjour'},
+        {'user_id': 2, 'message': 'échec'},
+        {'user_id': 3, 'message': 'bonsoir'},
+    ], created_by='admin')
+    other_batch = job_bridge.submit_jobs(session, 'resource_broadcast', [{'resource_id': 7}])
+    session.commit()
+
+    status = job_bridge.batch_status(session, batch_id)
+    assert status['total'] == 3
+    assert status['counts']['pending'] == 3
+    assert not status['finished']
+
+    async def send_dm(payload):
+        if payload['message'] == 'échec':
+            raise RuntimeError("Messages privés fermés")
+        return f"Envoyé à {payload['user_id']}"
+
+    consumer = job_bridge.JobConsumer(lambda: session, {'dm': send_dm})
+    assert asyncio.run(consumer.run_once()) == 4
+    assert asyncio.run(consumer.run_once()) == 0
+
+    status = job_bridge.batch_status(session, batch_id)
+    assert status['finished']
+    assert status['counts'] == {'pending': 0, 'running': 0, 'done': 2, 'failed': 1}
+    assert [job['result'] for job in status['jobs']] == [
+        "Envoyé à 1", "Messages privés fermés", "Envoyé à 3"]
+    assert all(job['finished_at'] for job in status['jobs'])
+
+    # Aucun gestionnaire pour ce type: la tâche échoue au lieu de rester en attente
+    other = job_bridge.batch_status(session, other_batch)
+    assert other['counts']['failed'] == 1
+    assert other['jobs'][0]['result'].startswith("Type de tâche non pris en charge")
+    assert job_bridge.batch_status(session, 'inconnu') is None
+
+
+def test_claim_skips_jobs_taken_concurrently(session, update_returning):
+    job_bridge.submit_jobs(session, 'dm', [{'user_id': n, 'message': 'x'} for n in range(4)])
+    session.commit()
+    ids = [job.id for job in session.query(BotJob).order_by(BotJob.id)]
+
+    # Un autre consommateur réclame la 2e tâche entre la lecture et la mise à jour
+    def steal(state):
+        if state.is_update and not stolen:
+            stolen.append(ids[1])
+            state.session.execute(update(BotJob).where(BotJob.id == ids[1]).values(status='running', attempts=1))
+
+    stolen = []
+    event.listen(session(), 'do_orm_execute', steal)
+    try:
+        claimed = job_bridge.claim_jobs(session)
+    finally:
+        event.remove(session(), 'do_orm_execute', steal)
+
+    assert [job_id for job_id, _, _ in claimed] == [ids[0], ids[2], ids[3]]
+    attempts = {job.id: job.attempts for job in session.query(BotJob)}
+    assert attempts == dict.fromkeys(ids, 1)
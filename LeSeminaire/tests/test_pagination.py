@@ -0,0 +1,65 @@
+"""Pagination par curseur: parcours complet sur une clé composite avec égalités."""
+import datetime
+
+import pytest
+
+from app import create_app, db
+from models import ContactMessage
+from pagination import paginate_keyset
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'METRICS_DIR': None,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def walk(query, sort_expr, id_expr, descending, per_page=3):
+    """
+    Parcourt toutes les pages en avant, puis revient en arrière depuis la dernière:
+    renvoie les ids vus dans chaque sens, dans l'ordre de la liste.
+    """
+    forward, pages, cursor = [], [], None
+    while True:
+        page = paginate_keyset(query, sort_expr, id_expr, descending, after=cursor, per_page=per_page)
+        forward.extend(message.id for message in page)
+        pages.append(page)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    backward, page = [message.id for message in pages[-1]], pages[-1]
+    while page.has_prev:
+        page = paginate_keyset(query, sort_expr, id_expr, descending, before=page.prev_cursor, per_page=per_page)
+        backward[:0] = [message.id for message in page]
+    return forward, backward
+
+
+def test_triage_walk_visits_every_message_once(app):
+    start = datetime.datetime(2024, 1, 1)
+    for index in range(10):
+        # Priorités et dates répétées pour exercer le départage par id
+        db.session.add(ContactMessage(name='n', email='e@x.org', subject='s', message='m',
+                                      priority=index % 3, created_at=start + datetime.timedelta(days=index % 4)))
+    db.session.commit()
+    messages = ContactMessage.query.all()
+    query = db.session.query(ContactMessage)
+    sort_expr = (ContactMessage.priority, ContactMessage.created_at)
+
+    for descending in (True, False):
+        expected = [m.id for m in sorted(messages, key=lambda m: (m.priority, m.created_at, m.id),
+                                         reverse=descending)]
+        forward, backward = walk(query, sort_expr, ContactMessage.id, descending)
+        assert forward == expected
+        assert backward == expected
+
+
+def test_nullable_sort_column_is_rejected(app):
+    with pytest.raises(ValueError):
+        paginate_keyset(db.session.query(ContactMessage), ContactMessage.responded_at, ContactMessage.id)
@@ -0,0 +1,102 @@
+"""Limitation de débit: rafales, recharge et isolation par adresse IP (horloge simulée)."""
+import pytest
+
+from app import create_app
+from rate_limit import rate_limiter
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'clock', clock)
+    yield clock
+    rate_limiter.reset()
+
+
+def make_client(**config):
+    config = {
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'RATE_LIMIT_STORAGE_URL': None,
+        'METRICS_DIR': None,
+        # 3 requêtes en rafale, puis 1 toutes les 10 secondes
+        'RATE_LIMITS': {'test': (3, 30)},
+        **config,
+    }
+    app = create_app(config)
+    app.add_url_rule('/limited', 'limited', rate_limiter.limit('test')(lambda: 'ok'), methods=['GET', 'POST'])
+    return app.test_client()
+
+
+def post(client, ip='203.0.113.1', **kwargs):
+    return client.post('/limited', environ_base={'REMOTE_ADDR': ip}, **kwargs)
+
+
+def test_burst_then_reject(clock):
+    client = make_client()
+    assert [post(client).status_code for _ in range(3)] == [200, 200, 200]
+    response = post(client)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
+    assert rate_limiter.metrics()['limits']['test'] == {'allowed': 3, 'rejected': 1}
+
+
+def test_refill(clock):
+    client = make_client()
+    for _ in range(3):
+        post(client)
+    clock.advance(9)
+    assert post(client).status_code == 429
+    clock.advance(1)
+    assert post(client).status_code == 200
+    assert post(client).status_code == 429
+    # Seau de nouveau plein après une période complète, sans dépasser la capacité
+    clock.advance(300)
+    assert [post(client).status_code for _ in range(4)] == [200, 200, 200, 429]
+
+
+def test_other_methods_not_limited(clock):
+    client = make_client()
+    for _ in range(3):
+        post(client)
+    assert client.get('/limited', environ_base={'REMOTE_ADDR': '203.0.113.1'}).status_code == 200
+
+
+def test_per_ip_isolation(clock):
+    client = make_client()
+    for _ in range(3):
+        post(client, ip='203.0.113.1')
+    assert post(client, ip='203.0.113.1').status_code == 429
+    assert post(client, ip='203.0.113.2').status_code == 200
+
+
+def test_forwarded_for_ignored_without_trusted_proxy(clock):
+    client = make_client()
+    for index in range(3):
+        post(client, ip='10.0.0.1', headers={'X-Forwarded-For': f'198.51.100.{index}'})
+    # Un client ne peut pas changer de seau en forgeant l'en-tête
+    assert post(client, ip='10.0.0.1', headers={'X-Forwarded-For': '198.51.100.9'}).status_code == 429
+
+
+def test_trusted_proxy_keys_on_client_ip(clock):
+    client = make_client(TRUSTED_PROXIES=1)
+    for _ in range(3):
+        post(client, ip='10.0.0.1', headers={'X-Forwarded-For': '198.51.100.1'})
+    assert post(client, ip='10.0.0.1', headers={'X-Forwarded-For': '198.51.100.1'}).status_code == 429
+    # Même proxy, autre client
+    assert post(client, ip='10.0.0.1', headers={'X-Forwarded-For': '198.51.100.2'}).status_code == 200
+    # Seule la dernière adresse (ajoutée par le proxy de confiance) compte
+    spoofed = post(client, ip='10.0.0.1', headers={'X-Forwarded-For': '1.2.3.4, 198.51.100.1'})
+    assert spoofed.status_code == 429
@@ -0,0 +1,70 @@
+"""Sessions vocales: seules les sessions modifiées sont écrites, les sessions closes supprimées."""
+import datetime
+
+import pytest
+
+from app import create_app, db
+from models import VoiceSessionRecord
+from voice_sessions import VoiceSessionTracker, load_sessions, save_sessions
+
+START = datetime.datetime(2026, 3, 2, 14, 0)
+
+
+@pytest.fixture
+def session(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'voice.db'}",
+        'METRICS_DIR': None,
+    })
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.engine.dispose()
+
+
+def persist(session, tracker):
+    changes = tracker.changes()
+    save_sessions(session, changes)
+    session.commit()
+    tracker.mark_saved(changes)
+    return changes
+
+
+def stored(session):
+    return {(row.guild_id, row.user_id): (row.channel_id, row.accrued_until)
+            for row in session.query(VoiceSessionRecord)}
+
+
+def test_only_changed_sessions_are_written(session):
+    tracker = VoiceSessionTracker()
+    for user_id in (1, 2, 3):
+        tracker.join(10, user_id, 100, START)
+    assert len(persist(session, tracker).upserts) == 3
+
+    # Rien n'a bougé: rien à écrire
+    assert persist(session, tracker) == ([], [])
+
+    later = START + datetime.timedelta(minutes=5)
+    tracker.move(10, 1, 200, later)
+    tracker.leave(10, 2, later)
+    changes = persist(session, tracker)
+    assert [(row['guild_id'], row['user_id']) for row in changes.upserts] == [('10', '1')]
+    assert changes.deletes == [('10', '2')]
+    assert stored(session) == {('10', '1'): ('200', later), ('10', '3'): ('100', START)}
+
+
+def test_loaded_sessions_are_not_rewritten(session):
+    session.add_all([
+        VoiceSessionRecord(guild_id='10', user_id='1', channel_id='100', started_at=START, accrued_until=START),
+        VoiceSessionRecord(guild_id='10', user_id='abc', channel_id='100', started_at=START, accrued_until=START),
+    ])
+    session.commit()
+
+    tracker = VoiceSessionTracker()
+    load_sessions(session, tracker)
+    # Ligne illisible, non reprise: supprimée au premier enregistrement
+    assert persist(session, tracker) == ([], [('10', 'abc')])
+    assert stored(session) == {('10', '1'): ('100', START)}
@@ -0,0 +1,75 @@
+"""Route /metrics: accès restreint et agrégation des instantanés des autres processus."""
+import os
+import json
+import time
+
+import pytest
+
+import web_metrics
+from app import create_app
+from web_metrics import Registry, snapshot_path, write_snapshot
+
+
+@pytest.fixture
+def app(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'INITIALIZE_DB': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'METRICS_DIR': str(tmp_path / 'metrics'),
+        'METRICS_ALLOW': '127.0.0.1,::1,10.1.0.0/16',
+        'METRICS_TOKEN': 'secret',
+    })
+
+
+def get(app, ip, headers=None):
+    return app.test_client().get('/metrics', environ_base={'REMOTE_ADDR': ip}, headers=headers or {})
+
+
+def test_access_restricted(app):
+    assert get(app, '127.0.0.1').status_code == 200
+    assert get(app, '10.1.2.3').status_code == 200
+    assert get(app, '203.0.113.5').status_code == 403
+    assert get(app, '203.0.113.5', {'Authorization': 'Bearer nope'}).status_code == 403
+    assert get(app, '203.0.113.5', {'Authorization': 'Bearer secret'}).status_code == 200
+    # Relayée par un proxy local non déclaré: l'adresse locale ne vaut pas autorisation
+    assert get(app, '127.0.0.1', {'X-Forwarded-For': '203.0.113.5'}).status_code == 403
+
+
+def test_empty_allow_list_requires_token():
+    app = create_app({'TESTING': True, 'INITIALIZE_DB': False, 'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+                      'METRICS_DIR': None, 'METRICS_ALLOW': '', 'METRICS_TOKEN': None})
+    assert get(app, '127.0.0.1').status_code == 403
+
+
+def other_snapshot(directory, name, requests, age=0):
+    registry = Registry()
+    registry.inc('requests_total', (('endpoint', 'index'), ('method', 'GET'), ('status', '2xx')), requests)
+    path = os.path.join(directory, name)
+    write_snapshot(registry, path)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_collect_merges_recent_snapshots_only(app):
+    directory = app.config['METRICS_DIR']
+    os.makedirs(directory)
+    # Même PID que ce processus mais autre jeton (autre conteneur): bien additionné
+    same_pid = other_snapshot(directory, f"{os.getpid()}-0123456789ab.json", 3)
+    stale = other_snapshot(directory, "41-aaaaaaaaaaaa.json", 100, age=web_metrics.SNAPSHOT_TTL + 60)
+    abandoned = other_snapshot(directory, "42-bbbbbbbbbbbb.json", 1000, age=web_metrics.SNAPSHOT_PURGE_AFTER + 60)
+
+    body = get(app, '127.0.0.1').get_data(as_text=True)
+    assert 'lebot_http_requests_total{endpoint="index",method="GET",status="2xx"} 3' in body
+    # Les fichiers des autres processus ne sont supprimés qu'une fois très anciens
+    assert os.path.exists(same_pid) and os.path.exists(stale)
+    assert not os.path.exists(abandoned)
+
+    # Instantané de ce processus, avec son identité
+    with app.app_context():
+        own = snapshot_path(directory)
+    with open(own) as f:
+        process = json.load(f)['process']
+    assert process['pid'] == os.getpid()
+    assert os.path.basename(own) == f"{os.getpid()}-{process['instance']}.json"
@@ -0,0 +1,198 @@
+"""
+Sessions vocales en cours, suivies par le cog `analytics`.
+
+Chaque membre présent dans un salon vocal a une session (serveur, membre,
+salon, début, minutes comptées jusqu'à `accrued_until`). Une tâche périodique
+compte les minutes écoulées de toutes les sessions: une longue session est
+ainsi répartie sur les heures où elle a eu lieu au lieu d'être comptée d'un
+bloc à la déconnexion. Un changement de salon clôt la portion passée dans
+l'ancien salon sans interrompre la session.
+
+Les sessions sont enregistrées dans la table voice_sessions à chaque passage:
+seules les lignes modifiées depuis l'enregistrement précédent sont écrites
+(INSERT ... ON CONFLICT DO UPDATE), et celles des sessions closes supprimées
+par leur clé (serveur, membre). Au démarrage, elles sont confrontées aux états vocaux des serveurs: un membre
+toujours connecté reprend sa session (l'interruption est comptée si elle est
+courte), une session dont le membre est parti est close, et un membre connecté
+sans session en ouvre une.
+"""
+import datetime
+from collections import namedtuple
+
+# Interruption maximale (redémarrage du bot) comptée comme passée en vocal
+RESUME_GAP = datetime.timedelta(minutes=10)
+
+# Écart entre les sessions suivies et la table: lignes à écrire, clés (serveur, membre) à supprimer
+SessionChanges = namedtuple('SessionChanges', 'upserts deletes')
+
+
+class VoiceSession:
+    """Session vocale d'un membre."""
+
+    __slots__ = ('guild_id', 'user_id', 'channel_id', 'name', 'started_at', 'accrued_until')
+
+    def __init__(self, guild_id, user_id, channel_id, started_at, accrued_until=None, name=None):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.name = name
+        self.started_at = started_at
+        self.accrued_until = accrued_until or started_at
+
+    def accrue(self, now):
+        """Minutes écoulées depuis le dernier décompte, jusqu'à `now`"""
+        minutes = max(0.0, (now - self.accrued_until).total_seconds() / 60)
+        self.accrued_until = max(self.accrued_until, now)
+        return minutes
+
+
+class VoiceSessionTracker:
+    """Sessions vocales en cours: {(serveur, membre): VoiceSession}."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.saved = {}  # Lignes enregistrées en base: {(serveur, membre) en texte: ligne}
+
+    def join(self, guild_id, user_id, channel_id, now, name=None):
+        """Ouvre la session d'un membre qui se connecte."""
+        self.sessions[(guild_id, user_id)] = VoiceSession(guild_id, user_id, channel_id, now, name=name)
+
+    def move(self, guild_id, user_id, channel_id, now, name=None):
+        """
+        Changement de salon: renvoie les minutes passées dans l'ancien salon
+        (0 si le membre n'avait pas de session, qui est alors ouverte).
+        """
+        session = self.sessions.get((guild_id, user_id))
+        if session is None:
+            self.join(guild_id, user_id, channel_id, now, name)
+            return 0.0
+        minutes = session.accrue(now)
+        session.channel_id = channel_id
+        session.name = name or session.name
+        return minutes
+
+    def leave(self, guild_id, user_id, now):
+        """Clôt la session d'un membre qui se déconnecte; renvoie ses minutes pas encore comptées."""
+        session = self.sessions.pop((guild_id, user_id), None)
+        return session.accrue(now) if session is not None else 0.0
+
+    def accrue(self, now):
+        """Décompte de toutes les sessions: liste de (session, minutes) depuis le décompte précédent."""
+        return [(session, session.accrue(now)) for session in self.sessions.values()]
+
+    def reconcile(self, present, now, resume_gap=RESUME_GAP):
+        """
+        Confronte les sessions aux membres réellement connectés.
+
+        Args:
+            present: {(serveur, membre): (salon, nom)} des membres en vocal
+            now: Instant de la confrontation (UTC)
+            resume_gap: Interruption maximale comptée pour une session reprise
+
+        Returns:
+            Liste de (session, minutes) des interruptions comptées
+        """
+        accrued = []
+        for key in list(self.sessions):
+            if key not in present:
+                # Parti pendant l'interruption: heure de départ inconnue, rien de plus n'est compté
+                del self.sessions[key]
+        for key, (channel_id, name) in present.items():
+            session = self.sessions.get(key)
+            if session is None:
+                self.join(key[0], key[1], channel_id, now, name)
+                continue
+            if now - session.accrued_until <= resume_gap:
+                accrued.append((session, session.accrue(now)))
+            else:
+                session.accrued_until = now
+            session.channel_id = channel_id
+            session.name = name or session.name
+        return accrued
+
+    def rows(self):
+        """Sessions au format de la table voice_sessions"""
+        return [{
+            'guild_id': str(session.guild_id),
+            'user_id': str(session.user_id),
+            'channel_id': str(session.channel_id),
+            'started_at': session.started_at,
+            'accrued_until': session.accrued_until,
+        } for session in self.sessions.values()]
+
+    def changes(self):
+        """
+        Lignes à écrire et à supprimer pour que la table reflète les sessions
+        suivies. Le relevé ne partage rien avec le suivi: il peut être écrit hors
+        de la boucle d'événements, puis confirmé par mark_saved().
+
+        Returns:
+            SessionChanges
+        """
+        current = {(row['guild_id'], row['user_id']): row for row in self.rows()}
+        upserts = [row for key, row in current.items() if self.saved.get(key) != row]
+        deletes = [key for key in self.saved if key not in current]
+        return SessionChanges(upserts, deletes)
+
+    def mark_saved(self, changes):
+        """Prend note de l'enregistrement de `changes` (relevé de changes())."""
+        for row in changes.upserts:
+            self.saved[(row['guild_id'], row['user_id'])] = row
+        for key in changes.deletes:
+            self.saved.pop(key, None)
+
+    def load(self, rows):
+        """Reprend des sessions enregistrées (objets VoiceSessionRecord)."""
+        for row in rows:
+            # Une ligne illisible est gardée ici pour être supprimée au prochain enregistrement
+            self.saved[(row.guild_id, row.user_id)] = {
+                'guild_id': row.guild_id,
+                'user_id': row.user_id,
+                'channel_id': row.channel_id,
+                'started_at': row.started_at,
+                'accrued_until': row.accrued_until,
+            }
+            if not (row.guild_id.isdigit() and row.user_id.isdigit() and row.channel_id.isdigit()):
+                continue
+            session = VoiceSession(int(row.guild_id), int(row.user_id), int(row.channel_id),
+                                   row.started_at, row.accrued_until)
+            self.sessions[(session.guild_id, session.user_id)] = session
+
+
+def save_sessions(session, changes):
+    """
+    Enregistre `changes` (VoiceSessionTracker.changes()) dans la transaction de
+    `session`: suppression des sessions closes par leur clé, puis écriture des
+    sessions nouvelles ou modifiées.
+    """
+    from sqlalchemy import delete, tuple_
+    from models import VoiceSessionRecord
+
+    key = tuple_(VoiceSessionRecord.guild_id, VoiceSessionRecord.user_id)
+    if changes.deletes:
+        session.execute(delete(VoiceSessionRecord).where(key.in_(changes.deletes)))
+    if not changes.upserts:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # Autres moteurs: suppression des lignes remplacées puis insertion
+        from sqlalchemy import insert
+        replaced = [(row['guild_id'], row['user_id']) for row in changes.upserts]
+        session.execute(delete(VoiceSessionRecord).where(key.in_(replaced)))
+        session.execute(insert(VoiceSessionRecord), changes.upserts)
+        return
+    statement = insert(VoiceSessionRecord).values(changes.upserts)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[VoiceSessionRecord.guild_id, VoiceSessionRecord.user_id],
+        set_={name: statement.excluded[name] for name in ('channel_id', 'started_at', 'accrued_until')}))
+
+
+def load_sessions(session, tracker):
+    """Charge dans `tracker` les sessions enregistrées."""
+    from models import VoiceSessionRecord
+
+    tracker.load(session.query(VoiceSessionRecord).all())
@@ -0,0 +1,426 @@
+"""
+Métriques des requêtes de l'application web LeSéminaire[BOT], au format Prometheus.
+
+Pour chaque requête, les hooks Flask mesurent la durée totale, le temps passé en
+base (événements SQLAlchemy), le temps de rendu des templates (signaux Flask) et
+la taille de la réponse. Les histogrammes ne portent que le nom de l'endpoint
+(une valeur par vue déclarée, 'unmatched' pour les 404): la cardinalité reste
+bornée quel que soit le trafic.
+
+Chaque worker gunicorn tient ses propres compteurs et en dépose un instantané
+dans METRICS_DIR au plus une fois par seconde (et au moins toutes les
+SNAPSHOT_REFRESH secondes); /metrics additionne les instantanés récents, de sorte
+que le résultat ne dépend pas du worker interrogé. Le bot dépose de la même façon
+ses propres métriques (BOT_METRICS, détection d'anomalies du cog `analytics`),
+exposées par /metrics quand il partage METRICS_DIR.
+
+Un instantané non rafraîchi depuis SNAPSHOT_TTL secondes est ignoré (processus
+arrêté), sans que /metrics ait à savoir si son auteur vit encore: le PID seul ne
+le dit pas entre conteneurs, ni une fois réutilisé. Chaque processus supprime
+son fichier en s'arrêtant; ceux laissés par un arrêt brutal sont supprimés après
+SNAPSHOT_PURGE_AFTER secondes.
+
+/metrics n'est servie qu'aux adresses de METRICS_ALLOW (par défaut la machine
+elle-même) ou sur présentation du jeton METRICS_TOKEN.
+
+    scrape_configs:
+      - job_name: leseminaire-web
+        static_configs: [{targets: ['localhost:8080']}]
+"""
+import os
+import hmac
+import json
+import time
+import uuid
+import atexit
+import logging
+import ipaddress
+import threading
+import functools
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(BASE_DIR, 'instance', 'web_metrics')
+
+PREFIX = 'lebot_http_'
+
+# Bornes des histogrammes (secondes, octets)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# {nom: (type, aide, bornes)}
+METRICS = {
+    'requests_total': ('counter', "Requêtes traitées, par endpoint, méthode et classe de statut", None),
+    'request_duration_seconds': ('histogram', "Durée de traitement des requêtes", LATENCY_BUCKETS),
+    'db_duration_seconds': ('histogram', "Temps passé en base de données par requête", LATENCY_BUCKETS),
+    'db_queries_total': ('counter', "Requêtes SQL exécutées", None),
+    'template_render_seconds': ('histogram', "Temps de rendu des templates par requête", LATENCY_BUCKETS),
+    'response_size_bytes': ('histogram', "Taille du corps des réponses", SIZE_BUCKETS),
+}
+
+# Métriques du bot, préfixe lebot_bot_ (anomaly_detector.py)
+BOT_PREFIX = 'lebot_bot_'
+SCORE_BUCKETS = (-8.0, -4.0, -2.0, -1.0, 0.0, 1.0, 2.0, 4.0, 8.0)
+BOT_METRICS = {
+    'anomaly_alerts_total': ('counter', "Alertes d'activité anormale, par métrique, portée et sens", None),
+    'anomaly_score': ('histogram', "Écart des fenêtres d'activité à leur moyenne (écarts types)", SCORE_BUCKETS),
+}
+
+# Intervalle minimal entre deux instantanés déposés par un worker (secondes)
+DUMP_INTERVAL = 1.0
+# Rafraîchissement d'un instantané en l'absence de trafic (secondes)
+SNAPSHOT_REFRESH = 60
+# Âge au-delà duquel un instantané est ignoré, puis supprimé (secondes).
+# SNAPSHOT_TTL doit dépasser l'intervalle de dépôt du bot (anomaly_detector.WINDOW_SECONDS).
+SNAPSHOT_TTL = 900
+SNAPSHOT_PURGE_AFTER = 86400
+
+# Adresses autorisées à lire /metrics sans jeton
+DEFAULT_ALLOW = '127.0.0.1,::1'
+
+
+class Registry:
+    """Compteurs et histogrammes d'un processus: {(nom, étiquettes): valeurs}."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}    # {(nom, étiquettes): total}
+        self.histograms = {}  # {(nom, étiquettes): [compte par borne..., +Inf, somme]}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = (METRICS.get(name) or BOT_METRICS[name])[2]
+        key = (name, labels)
+        with self._lock:
+            values = self.histograms.get(key)
+            if values is None:
+                values = self.histograms[key] = [0] * (len(buckets) + 2)
+            for position, bound in enumerate(buckets):
+                if value <= bound:
+                    values[position] += 1
+                    break
+            else:
+                values[len(buckets)] += 1
+            values[-1] += value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), total] for (name, labels), total in self.counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def merge(self, data):
+        """Ajoute les valeurs d'un instantané (to_dict) à ce registre."""
+        with self._lock:
+            for name, labels, total in data['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self.counters[key] = self.counters.get(key, 0) + total
+            for name, labels, values in data['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                current = self.histograms.setdefault(key, [0] * len(values))
+                for position, value in enumerate(values):
+                    current[position] += value
+
+    def render(self):
+        """Exposition au format texte Prometheus (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for prefix, metrics in ((PREFIX, METRICS), (BOT_PREFIX, BOT_METRICS)):
+                for name, (kind, help_text, buckets) in metrics.items():
+                    full_name = f"{prefix}{name}"
+                    lines.append(f"# HELP {full_name} {help_text}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    if kind == 'counter':
+                        for (metric, labels), total in sorted(self.counters.items()):
+                            if metric == name:
+                                lines.append(f"{full_name}{_format_labels(labels)} {_format_value(total)}")
+                        continue
+                    for (metric, labels), values in sorted(self.histograms.items()):
+                        if metric != name:
+                            continue
+                        cumulative = 0
+                        for bound, count in zip(buckets + ('+Inf',), values):
+                            cumulative += count
+                            le = bound if bound == '+Inf' else _format_value(bound)
+                            lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                        lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+                        lines.append(f"{full_name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+@functools.lru_cache(maxsize=8)
+def _networks(allow):
+    """Réseaux d'une liste d'adresses ou de plages CIDR séparées par des virgules"""
+    networks = []
+    for item in allow.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"METRICS_ALLOW: adresse ignorée: {item}")
+    return tuple(networks)
+
+
+class WebMetrics:
+    """Extension Flask: mesure des requêtes et route /metrics."""
+
+    def __init__(self, app=None):
+        self.registry = Registry()
+        self._dumped_at = 0.0
+        self._refresh_pid = None
+        self._refresh_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Installe les hooks de mesure et la route /metrics sur l'application."""
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DIR', os.environ.get('METRICS_DIR', DEFAULT_DIR))
+        # /metrics est servie aux adresses ou plages de METRICS_ALLOW (séparées par des
+        # virgules, vide = aucune), ou à qui présente METRICS_TOKEN (Authorization: Bearer ...)
+        app.config.setdefault('METRICS_ALLOW', os.environ.get('METRICS_ALLOW', DEFAULT_ALLOW))
+        app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+        app.config.setdefault('METRICS_SNAPSHOT_TTL', SNAPSHOT_TTL)
+        app.extensions['web_metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        _listen_to_queries()
+
+    # Mesures --------------------------------------------------------------
+
+    @staticmethod
+    def _start():
+        g._metrics = {'started': time.perf_counter(), 'db': 0.0, 'queries': 0,
+                      'templates': 0.0, 'template_started': []}
+
+    @staticmethod
+    def _template_started(sender, template, context, **extra):
+        state = g.get('_metrics')
+        if state is not None:
+            state['template_started'].append(time.perf_counter())
+
+    @staticmethod
+    def _template_finished(sender, template, context, **extra):
+        state = g.get('_metrics')
+        if state is not None and state['template_started']:
+            state['templates'] += time.perf_counter() - state['template_started'].pop()
+
+    def _finish(self, response):
+        state = g.pop('_metrics', None)
+        if state is None or request.endpoint == 'metrics':
+            return response
+
+        endpoint = request.url_rule.endpoint if request.url_rule is not None else 'unmatched'
+        labels = (('endpoint', endpoint),)
+        registry = self.registry
+        registry.inc('requests_total', labels + (('method', request.method),
+                                                 ('status', f"{response.status_code // 100}xx")))
+        registry.observe('request_duration_seconds', labels, time.perf_counter() - state['started'])
+        registry.observe('db_duration_seconds', labels, state['db'])
+        if state['queries']:
+            registry.inc('db_queries_total', labels, state['queries'])
+        if state['templates']:
+            registry.observe('template_render_seconds', labels, state['templates'])
+        size = response.content_length
+        if size is None and not (response.is_streamed or response.direct_passthrough):
+            size = len(response.get_data())
+        if size is not None:
+            registry.observe('response_size_bytes', labels, size)
+
+        self._maybe_dump()
+        return response
+
+    # Partage entre workers -----------------------------------------------
+
+    def _dump_path(self):
+        directory = current_app.config['METRICS_DIR']
+        return snapshot_path(directory) if directory else None
+
+    def _maybe_dump(self, force=False):
+        """Dépose l'instantané de ce processus (au plus une fois par DUMP_INTERVAL)."""
+        now = time.monotonic()
+        path = self._dump_path()
+        if path is None or (not force and now - self._dumped_at < DUMP_INTERVAL):
+            return
+        self._dumped_at = now
+        self._start_refresh(path)
+        write_snapshot(self.registry, path)
+
+    def _start_refresh(self, path):
+        """
+        Rafraîchit l'instantané de ce worker même sans trafic (pour qu'il ne soit pas
+        pris pour celui d'un processus arrêté) et le supprime à l'arrêt du processus.
+        Démarré dans chaque worker, les threads ne survivant pas au fork.
+        """
+        with self._refresh_lock:
+            if self._refresh_pid == os.getpid():
+                return
+            self._refresh_pid = os.getpid()
+
+        def refresh():
+            while True:
+                time.sleep(SNAPSHOT_REFRESH)
+                write_snapshot(self.registry, path)
+
+        threading.Thread(target=refresh, name='web-metrics-snapshot', daemon=True).start()
+        atexit.register(remove_snapshot, path)
+
+    def collect(self):
+        """Registre additionnant ce processus et les instantanés récents des autres processus."""
+        directory = current_app.config['METRICS_DIR']
+        combined = Registry()
+        combined.merge(self.registry.to_dict())
+        if not directory or not os.path.isdir(directory):
+            return combined
+        own = os.path.basename(snapshot_path(directory))
+        ttl = current_app.config['METRICS_SNAPSHOT_TTL']
+        now = time.time()
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == own:
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                age = now - os.path.getmtime(path)
+                if age > ttl:
+                    # Processus arrêté sans supprimer son fichier: ses compteurs disparaissent
+                    # (remise à zéro vue par rate()), le fichier après SNAPSHOT_PURGE_AFTER
+                    if age > SNAPSHOT_PURGE_AFTER:
+                        os.remove(path)
+                    continue
+                with open(path) as f:
+                    combined.merge(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        return combined
+
+    @staticmethod
+    def _authorized():
+        """Jeton METRICS_TOKEN valide, ou client dans METRICS_ALLOW."""
+        config = current_app.config
+        token = config.get('METRICS_TOKEN')
+        if token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return True
+        if request.headers.get('X-Forwarded-For') and not config.get('TRUSTED_PROXIES'):
+            # Requête relayée par un proxy non déclaré (TRUSTED_PROXIES): remote_addr
+            # est l'adresse du proxy, pas celle du client
+            return False
+        try:
+            address = ipaddress.ip_address(request.remote_addr or '')
+        except ValueError:
+            return False
+        allow = config.get('METRICS_ALLOW') or ''
+        if not isinstance(allow, str):
+            allow = ','.join(allow)
+        return any(address in network for network in _networks(allow))
+
+    def metrics_view(self):
+        """Route /metrics (format texte Prometheus)"""
+        if not self._authorized():
+            abort(403)
+        self._maybe_dump(force=True)
+        return Response(self.collect().render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+_process = (None, None, None)
+
+
+def snapshot_path(directory):
+    """
+    Fichier d'instantané de ce processus dans `directory`: <pid>-<jeton>.json. Le
+    jeton, tiré une fois par processus (après un fork compris), distingue deux
+    processus de même PID (PID réutilisé, conteneurs partageant le dossier).
+    """
+    global _process
+    pid = os.getpid()
+    if _process[0] != pid:
+        _process = (pid, uuid.uuid4().hex[:12], time.time())
+    return os.path.join(directory, f"{pid}-{_process[1]}.json")
+
+
+def write_snapshot(registry, path):
+    """
+    Dépose l'instantané de `registry` dans `path` (voir snapshot_path), remplacé
+    d'un bloc, avec l'identité du processus qui l'écrit.
+    """
+    data = registry.to_dict()
+    if _process[0] == os.getpid():
+        data['process'] = {'pid': _process[0], 'instance': _process[1], 'started_at': _process[2]}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning(f"Instantané des métriques non écrit: {e}")
+
+
+def remove_snapshot(path):
+    """Supprime l'instantané de ce processus (à son arrêt)."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_listening = False
+
+
+def _listen_to_queries():
+    """Chronomètre toutes les requêtes SQL exécutées pendant une requête HTTP."""
+    global _listening
+    if _listening:
+        return
+    _listening = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if has_request_context():
+            state = g.get('_metrics')
+            if state is not None:
+                state['db'] += elapsed
+                state['queries'] += 1
+
+
+web_metrics = WebMetrics()